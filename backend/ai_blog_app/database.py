@@ -0,0 +1,55 @@
+"""
+Connection tuning for the default database, applied by settings.py.
+
+SQLite runs in WAL mode, so readers never wait for the writer, with
+synchronous=NORMAL (durable at checkpoints, no fsync per commit), a busy
+timeout so concurrent writers queue instead of failing with "database is
+locked", and memory-mapped reads. Transactions start IMMEDIATE, taking the
+write lock up front. A deferred transaction that reads and then writes can
+otherwise hit SQLITE_BUSY at once, without waiting out the busy timeout.
+
+PostgreSQL connections are health-checked before reuse. With psycopg 3 and
+psycopg_pool installed, Django's native connection pool replaces
+persistent per-thread connections (DB_POOL_MAX_SIZE=0 turns it off).
+"""
+import importlib.util
+
+
+def sqlite_options(busy_timeout, mmap_bytes):
+    return {
+        "timeout": busy_timeout,  # seconds; sets sqlite's busy timeout
+        "transaction_mode": "IMMEDIATE",
+        "init_command": ";".join(
+            [
+                "PRAGMA journal_mode=WAL",
+                "PRAGMA synchronous=NORMAL",
+                f"PRAGMA mmap_size={mmap_bytes}",
+                "PRAGMA temp_store=MEMORY",
+            ]
+        ),
+    }
+
+
+def pool_available():
+    return bool(importlib.util.find_spec("psycopg") and importlib.util.find_spec("psycopg_pool"))
+
+
+def tune(database, sqlite_busy_timeout=20, sqlite_mmap_bytes=256 << 20,
+         pool_min_size=2, pool_max_size=10, pool_timeout=10):
+    """
+    Add the tuning options for `database`'s engine to its settings dict.
+    """
+    engine = database.get("ENGINE", "")
+    options = database.setdefault("OPTIONS", {})
+    if engine.endswith("sqlite3"):
+        options.update(sqlite_options(sqlite_busy_timeout, sqlite_mmap_bytes))
+    elif engine.endswith(("postgresql", "postgis")):
+        database["CONN_HEALTH_CHECKS"] = True
+        if pool_max_size and pool_available():
+            database["CONN_MAX_AGE"] = 0  # the pool owns connection lifetimes
+            options["pool"] = {
+                "min_size": min(pool_min_size, pool_max_size),
+                "max_size": pool_max_size,
+                "timeout": pool_timeout,
+            }
+    return database
@@ -11,10 +11,15 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import hashlib
 import os
+import sys
+import tempfile
 from dotenv import load_dotenv
 import dj_database_url
 
+from .database import tune as tune_database
+
 load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -101,9 +106,56 @@ if DATABASE_URL:
     DATABASES["default"] = dj_database_url.parse(
         DATABASE_URL,
         conn_max_age=600,
+        conn_health_checks=True,
         ssl_require=True,
     )
 
+# WAL/busy timeout on SQLite, health checks and pooling on PostgreSQL
+# (see ai_blog_app/database.py)
+tune_database(
+    DATABASES["default"],
+    sqlite_busy_timeout=float(os.getenv("DB_SQLITE_BUSY_TIMEOUT", "20")),  # seconds a writer waits for the lock
+    sqlite_mmap_bytes=int(os.getenv("DB_SQLITE_MMAP_BYTES", str(256 << 20))),
+    pool_min_size=int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+    pool_max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),  # per process; 0 = persistent connections instead
+    pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),  # seconds to wait for a free connection
+)
+
+# Cache: shared through Redis when REDIS_URL is set (needs the redis package),
+# otherwise Django's default per-process memory cache
+REDIS_URL = os.getenv("REDIS_URL")
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+if REDIS_URL:
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+
+# Sessions and login throttling counters (see blog_generator/auth.py) go in the
+# "auth" cache, which every process must see: Redis, else files on this host
+# ("locmem" only suits a single process, like the test runner)
+TESTING = sys.argv[1:2] == ["test"]
+AUTH_CACHE = os.getenv("AUTH_CACHE", "locmem" if TESTING else "redis" if REDIS_URL else "file")
+# One directory per checkout, so two apps on a host never share counters
+_AUTH_CACHE_DIR = f"ai-blog-auth-cache-{hashlib.sha256(str(BASE_DIR).encode()).hexdigest()[:12]}"
+CACHES["auth"] = {
+    "redis": CACHES["default"],
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("AUTH_CACHE_DIR", os.path.join(tempfile.gettempdir(), _AUTH_CACHE_DIR)),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "20000"))},
+    },
+    "locmem": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "auth"},
+}[AUTH_CACHE]
+
+# "cached_db": sessions are read from the auth cache and written through to the
+# database, so an authenticated request needs no session query; "signed_cookies":
+# no server-side state at all, but logging out can't revoke a copied cookie;
+# "db": Django's default, one session query per request
+SESSION_MODE = os.getenv("SESSION_MODE", "cached_db")
+SESSION_ENGINE = f"django.contrib.sessions.backends.{SESSION_MODE}"
+SESSION_CACHE_ALIAS = "auth"
+
 # DATABASES = {
 #     'default': {
 #         'ENGINE': 'django.db.backends.postgresql',
@@ -116,6 +168,18 @@ if DATABASE_URL:
 # }
 
 
+AUTHENTICATION_BACKENDS = ["blog_generator.auth.PooledHashingBackend"]
+
+# Password hashing pool and login throttling (see blog_generator/auth.py)
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", "2"))  # password hashes at once per process
+AUTH_HASH_QUEUE = int(os.getenv("AUTH_HASH_QUEUE", "16"))  # more than this waiting: "busy, try again"
+AUTH_THROTTLE_WINDOW = int(os.getenv("AUTH_THROTTLE_WINDOW", "300"))  # seconds
+AUTH_LOGIN_IP_LIMIT = int(os.getenv("AUTH_LOGIN_IP_LIMIT", "30"))  # login attempts per client IP per window
+AUTH_LOGIN_USER_LIMIT = int(os.getenv("AUTH_LOGIN_USER_LIMIT", "5"))  # failed logins per username per window
+AUTH_SIGNUP_IP_LIMIT = int(os.getenv("AUTH_SIGNUP_IP_LIMIT", "10"))  # signups per client IP per window
+# Proxies in front of the app that append to X-Forwarded-For (Render has one)
+AUTH_TRUSTED_PROXIES = int(os.getenv("AUTH_TRUSTED_PROXIES", "1" if RENDER_EXTERNAL_HOSTNAME else "0"))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -173,3 +237,120 @@ LOGIN_URL = 'login'
 # ASSEMBLYAI_API_KEY = os.getenv("ASSEMBLYAI_API_KEY", "")
 ASSEMBLYAI_API_KEY = os.getenv("ASSEMBLYAI_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+
+# Background generation jobs (see blog_generator/jobs.py)
+BLOG_WORKERS = int(os.getenv("BLOG_WORKERS", "2"))
+BLOG_ASYNC_CONCURRENCY = int(os.getenv("BLOG_ASYNC_CONCURRENCY", "0"))  # >0: one asyncio worker
+BLOG_JOB_STALE_SECONDS = int(os.getenv("BLOG_JOB_STALE_SECONDS", "900"))
+BLOG_JOB_HEARTBEAT_SECONDS = float(os.getenv("BLOG_JOB_HEARTBEAT_SECONDS", "30"))  # running jobs refresh heartbeat_at
+BLOG_JOB_REQUEUE_SECONDS = float(os.getenv("BLOG_JOB_REQUEUE_SECONDS", "60"))  # how often workers look for stale jobs
+BLOG_JOB_MAX_ATTEMPTS = int(os.getenv("BLOG_JOB_MAX_ATTEMPTS", "2"))
+BLOG_JOB_EVENTS_POLL = float(os.getenv("BLOG_JOB_EVENTS_POLL", "0.5"))
+BLOG_JOB_EVENTS_TIMEOUT = int(os.getenv("BLOG_JOB_EVENTS_TIMEOUT", "900"))
+# Under WSGI a stream holds a worker thread; the page polls once it ends
+BLOG_JOB_EVENTS_WSGI_TIMEOUT = int(os.getenv("BLOG_JOB_EVENTS_WSGI_TIMEOUT", "30"))
+BLOG_STREAM_FLUSH_SECONDS = float(os.getenv("BLOG_STREAM_FLUSH_SECONDS", "0.25"))  # streamed text -> job row
+
+# Transcript cache (see blog_generator/transcript_cache.py)
+TRANSCRIPT_CACHE_TTL = int(os.getenv("TRANSCRIPT_CACHE_TTL", str(30 * 24 * 3600)))  # 0 = never expire
+TRANSCRIPT_CACHE_MAX_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", "5000"))
+TRANSCRIPT_CACHE_LRU_SIZE = int(os.getenv("TRANSCRIPT_CACHE_LRU_SIZE", "128"))
+
+# Single-flight coalescing of per-video work (see blog_generator/singleflight.py)
+SINGLEFLIGHT_LEASE = int(os.getenv("SINGLEFLIGHT_LEASE", "600"))  # leader's lease, seconds; renewed while it works
+SINGLEFLIGHT_WAIT = int(os.getenv("SINGLEFLIGHT_WAIT", "600"))  # max follower wait before doing it itself
+SINGLEFLIGHT_RESULT_TTL = int(os.getenv("SINGLEFLIGHT_RESULT_TTL", "300"))
+SINGLEFLIGHT_POLL = float(os.getenv("SINGLEFLIGHT_POLL", "1.0"))
+
+# Video metadata from the single yt-dlp probe (see pipeline.resolve_video)
+VIDEO_META_CACHE_TTL = int(os.getenv("VIDEO_META_CACHE_TTL", "3600"))
+VIDEO_INFO_REUSE_SECONDS = int(os.getenv("VIDEO_INFO_REUSE_SECONDS", "1800"))  # format URLs expire
+
+# Transcript acquisition (see pipeline.acquire_video)
+PIPELINE_BACKGROUND_THREADS = int(os.getenv("PIPELINE_BACKGROUND_THREADS", "8"))
+# Start the audio download while captions are looked up; wasted bandwidth when captions exist
+TRANSCRIPT_SPECULATIVE_AUDIO = os.getenv("TRANSCRIPT_SPECULATIVE_AUDIO") == "True"
+
+# yt-dlp admission control (see blog_generator/scheduler.py)
+YT_MAX_CONCURRENT = int(os.getenv("YT_MAX_CONCURRENT", "2"))  # yt-dlp operations per process
+YT_MAX_CONCURRENT_TOTAL = int(os.getenv("YT_MAX_CONCURRENT_TOTAL", "4"))  # across all processes; 0 = off
+YT_SLOT_LEASE_SECONDS = int(os.getenv("YT_SLOT_LEASE_SECONDS", "1800"))  # a dead process's slot comes back after this
+YT_REQUESTS_PER_MINUTE = float(os.getenv("YT_REQUESTS_PER_MINUTE", "30"))  # shared by all processes; 0 = off
+YT_REQUEST_BURST = int(os.getenv("YT_REQUEST_BURST", "5"))
+YT_BREAKER_COOLDOWN = int(os.getenv("YT_BREAKER_COOLDOWN", "600"))  # captions-only seconds after a 429
+YT_RETRIES = int(os.getenv("YT_RETRIES", "5"))
+YT_SLEEP_REQUESTS = float(os.getenv("YT_SLEEP_REQUESTS", "1.0"))
+
+# YouTube cookie jars (see blog_generator/cookie_jars.py). Besides the files in
+# YTDLP_COOKIES_DIR, jars come from the YTDLP_COOKIES and YTDLP_COOKIES_<n> env vars.
+YTDLP_COOKIES_DIR = os.getenv("YTDLP_COOKIES_DIR", "")  # one Netscape cookies.txt per jar
+YT_COOKIE_RELOAD_SECONDS = int(os.getenv("YT_COOKIE_RELOAD_SECONDS", "60"))
+YT_COOKIE_QUARANTINE = int(os.getenv("YT_COOKIE_QUARANTINE", "900"))  # seconds out after a 429, doubling on repeats
+YT_COOKIE_MIN_HEALTH = float(os.getenv("YT_COOKIE_MIN_HEALTH", "0.5"))  # quarantine below this success average
+
+# Audio fallback (see blog_generator/audio_stream.py)
+ASSEMBLYAI_BASE_URL = os.getenv("ASSEMBLYAI_BASE_URL", "https://api.assemblyai.com")
+# Pipe audio from YouTube straight into the AssemblyAI upload instead of a temp file
+TRANSCRIPT_STREAM_AUDIO = os.getenv("TRANSCRIPT_STREAM_AUDIO", "True") == "True"
+AUDIO_STREAM_CHUNK_BYTES = int(os.getenv("AUDIO_STREAM_CHUNK_BYTES", str(1 << 20)))
+AUDIO_STREAM_BUFFER_CHUNKS = int(os.getenv("AUDIO_STREAM_BUFFER_CHUNKS", "4"))  # max chunks held in memory
+AUDIO_MAX_BYTES = int(os.getenv("AUDIO_MAX_BYTES", str(500 << 20)))  # refuse longer audio
+AUDIO_DISK_RESERVE_BYTES = int(os.getenv("AUDIO_DISK_RESERVE_BYTES", str(256 << 20)))  # keep free in /tmp
+# Long audio is transcribed as overlapping windows in parallel (see blog_generator/long_audio.py)
+TRANSCRIPT_SEGMENT_SECONDS = int(os.getenv("TRANSCRIPT_SEGMENT_SECONDS", "600"))  # 0 = one job per video
+TRANSCRIPT_SEGMENT_OVERLAP = int(os.getenv("TRANSCRIPT_SEGMENT_OVERLAP", "15"))
+TRANSCRIPT_SEGMENT_PARALLELISM = int(os.getenv("TRANSCRIPT_SEGMENT_PARALLELISM", "4"))  # windows at once per video
+
+# Generated-article cache (see blog_generator/article_cache.py)
+ARTICLE_CACHE_TTL = int(os.getenv("ARTICLE_CACHE_TTL", str(30 * 24 * 3600)))  # 0 = never expire
+ARTICLE_CACHE_MAX_ENTRIES = int(os.getenv("ARTICLE_CACHE_MAX_ENTRIES", "5000"))
+
+# Map-reduce condensing of long transcripts (see blog_generator/summarize.py)
+SUMMARY_DIRECT_MAX_TOKENS = int(os.getenv("SUMMARY_DIRECT_MAX_TOKENS", "5000"))  # llama3-8b has 8192
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "2500"))
+SUMMARY_MAX_PARALLEL = int(os.getenv("SUMMARY_MAX_PARALLEL", "4"))
+SUMMARY_MAX_ROUNDS = int(os.getenv("SUMMARY_MAX_ROUNDS", "3"))  # notes-of-notes passes before giving up
+SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", str(7 * 24 * 3600)))
+
+# LLM backend (see blog_generator/llm.py): "groq", or "stub" to run offline
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3-8b-8192")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))  # seconds per call
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))  # pooled HTTP connections
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+LLM_RATE_PER_MINUTE = float(os.getenv("LLM_RATE_PER_MINUTE", "30"))  # 0 disables the limiter
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "5"))
+LLM_STUB_LATENCY = float(os.getenv("LLM_STUB_LATENCY", "0"))
+LLM_STUB_TOKEN_LATENCY = float(os.getenv("LLM_STUB_TOKEN_LATENCY", "0"))
+
+# Batch generation (see blog_generator/batch.py)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))  # videos per batch/playlist
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))  # threads for `manage.py generate_batch`
+
+# Blog list (see blog_generator/listing.py)
+# Per-user post totals. The signals that drop them fire in the process that saved
+# the post (often a worker), so without a shared cache keep them briefly.
+BLOG_COUNT_CACHE_TTL = int(os.getenv("BLOG_COUNT_CACHE_TTL", "3600" if REDIS_URL else "30"))
+
+# Conditional GET and per-user page cache for blog_list/blog_details (see blog_generator/page_cache.py)
+BLOG_PAGE_CACHE_TTL = int(os.getenv("BLOG_PAGE_CACHE_TTL", "300"))  # rendered list pages; 0 = off
+# How long "posts changed" markers are trusted from the cache. Workers save posts
+# in other processes, so only cache them when the cache is shared (REDIS_URL).
+BLOG_VERSION_CACHE_TTL = int(os.getenv("BLOG_VERSION_CACHE_TTL", "3600" if REDIS_URL else "0"))
+
+# Metrics (see blog_generator/metrics.py)
+METRICS_JSON_LOGS = os.getenv("METRICS_JSON_LOGS") == "True"  # one JSON log line per pipeline stage
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")  # /metrics needs "Authorization: Bearer <token>"; unset: DEBUG only
+METRICS_WORKER_PORT = int(os.getenv("METRICS_WORKER_PORT", "0"))  # run_blog_workers /metrics port; 0 = off
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {"message": {"format": "%(message)s"}},
+    "handlers": {"metrics": {"class": "logging.StreamHandler", "formatter": "message"}},
+    "loggers": {
+        "blog_generator.metrics": {"handlers": ["metrics"], "level": "INFO", "propagate": False},
+    },
+}
@@ -1,5 +1,24 @@
 from django.contrib import admin
-from .models import BlogPost
+from .models import BlogPost, GenerationBatch, GenerationJob, PostTranscript
 
 # Register your models here.
 admin.site.register(BlogPost)
+
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "state", "stage", "attempts", "batch", "created_at", "finished_at")
+    list_filter = ("state", "stage")
+    readonly_fields = ("timings",)
+
+
+@admin.register(GenerationBatch)
+class GenerationBatchAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "source", "created_at")
+
+
+@admin.register(PostTranscript)
+class PostTranscriptAdmin(admin.ModelAdmin):
+    list_display = ("post", "source", "language", "codec", "segment_count", "raw_bytes", "stored_bytes")
+    list_filter = ("source", "codec")
+    exclude = ("data",)
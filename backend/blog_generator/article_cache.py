@@ -0,0 +1,69 @@
+"""
+Persistent cache of generated articles.
+
+Entries are keyed by a hash of everything that determines the completion:
+the transcript, the article prompt's version and the model. A second
+generation from the same video is then one indexed lookup instead of an LLM
+call, whoever asks for it. Entries expire after ARTICLE_CACHE_TTL seconds
+and the ArticleCacheEntry table is trimmed to ARTICLE_CACHE_MAX_ENTRIES,
+dropping the least recently used articles first.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ArticleCacheEntry
+
+
+def make_key(transcription, prompt_version, model):
+    return hashlib.sha256(f"{prompt_version}\0{model}\0{transcription}".encode()).hexdigest()
+
+
+def _fresh(qs):
+    ttl = settings.ARTICLE_CACHE_TTL
+    return qs.filter(created_at__gte=timezone.now() - timedelta(seconds=ttl)) if ttl else qs
+
+
+def get(key):
+    """
+    The cached article for `key`, or None.
+    """
+    content = _fresh(ArticleCacheEntry.objects.filter(key=key)).values_list("content", flat=True).first()
+    if content is not None:
+        ArticleCacheEntry.objects.filter(key=key).update(last_used_at=timezone.now(), hits=F("hits") + 1)
+    return content
+
+
+def put(key, model, content):
+    """
+    Store `content` under `key`, replacing any previous article.
+    """
+    now = timezone.now()
+    ArticleCacheEntry.objects.update_or_create(
+        key=key, defaults={"model": model, "content": content, "created_at": now, "last_used_at": now}
+    )
+    prune()
+
+
+def prune():
+    """
+    Drop expired entries and trim the table to ARTICLE_CACHE_MAX_ENTRIES.
+    Returns the number of rows deleted.
+    """
+    deleted = 0
+    ttl = settings.ARTICLE_CACHE_TTL
+    if ttl:
+        cutoff = timezone.now() - timedelta(seconds=ttl)
+        deleted += ArticleCacheEntry.objects.filter(created_at__lt=cutoff).delete()[0]
+
+    limit = settings.ARTICLE_CACHE_MAX_ENTRIES
+    if limit:
+        overflow = list(
+            ArticleCacheEntry.objects.order_by("-last_used_at", "-pk").values_list("pk", flat=True)[limit:]
+        )
+        if overflow:
+            deleted += ArticleCacheEntry.objects.filter(pk__in=overflow).delete()[0]
+    return deleted
@@ -0,0 +1,167 @@
+"""
+Streaming audio transcription: audio goes from YouTube's media server
+straight into AssemblyAI's upload endpoint, never landing in /tmp.
+
+yt-dlp still picks the format and signs its URL. A producer thread then
+fetches the bytes in Range-request chunks of AUDIO_STREAM_CHUNK_BYTES (as
+yt-dlp's http_chunk_size does, which avoids YouTube's throttling of long
+single requests) and hands them to the upload through a bounded queue. At
+most AUDIO_STREAM_BUFFER_CHUNKS chunks are in memory at once and a slow
+upload stalls the download, while a fast one overlaps it completely.
+
+Formats that aren't plain HTTP(S) (HLS/DASH manifests) raise NotStreamable;
+the caller then falls back to downloading a file.
+"""
+import queue
+import re
+import threading
+
+from django.conf import settings
+
+from . import lazy, long_audio, metrics, transcripts
+
+aai = lazy.module("assemblyai")
+httpx = lazy.module("httpx")
+
+
+class NotStreamable(Exception):
+    """The selected format can't be fetched with plain range requests."""
+
+
+class AudioTooLarge(RuntimeError):
+    """The audio exceeds AUDIO_MAX_BYTES or the free disk space."""
+
+
+MEDIA_TIMEOUT = 30.0  # seconds per chunk request
+
+_CONTENT_RANGE_TOTAL = re.compile(r"/(\d+)$")
+
+
+def stream_source(info):
+    """
+    (url, headers, size or None) for a yt-dlp info dict whose format has
+    been selected (process_ie_result(..., download=False)).
+    """
+    if info.get("protocol") not in ("http", "https") or not info.get("url"):
+        raise NotStreamable(info.get("protocol"))
+    size = info.get("filesize") or info.get("filesize_approx")
+    return info["url"], dict(info.get("http_headers") or {}), size
+
+
+def check_size(size):
+    if size and size > settings.AUDIO_MAX_BYTES:
+        raise AudioTooLarge(
+            f"The audio is too long to transcribe ({size >> 20} MiB, limit "
+            f"{settings.AUDIO_MAX_BYTES >> 20} MiB)."
+        )
+
+
+def iter_media(url, headers=None, chunk_size=None, client=None):
+    """
+    Yield the resource at `url` as chunks of at most `chunk_size` bytes,
+    one Range request each. Stops at AUDIO_MAX_BYTES.
+    """
+    chunk_size = chunk_size or settings.AUDIO_STREAM_CHUNK_BYTES
+    own_client = client is None
+    client = client or httpx.Client(follow_redirects=True, timeout=MEDIA_TIMEOUT)
+    start, total = 0, None
+    try:
+        while total is None or start < total:
+            response = client.get(
+                url, headers={**(headers or {}), "Range": f"bytes={start}-{start + chunk_size - 1}"}
+            )
+            if response.status_code == 416:  # asked past the end of an unsized resource
+                break
+            response.raise_for_status()
+            data = response.content
+            if not data:
+                break
+            start += len(data)
+            check_size(start)
+            metrics.AUDIO_BYTES.inc(len(data), path="stream")
+            yield data
+            if response.status_code == 200:
+                break  # the server ignored Range and sent everything
+            match = _CONTENT_RANGE_TOTAL.search(response.headers.get("content-range", ""))
+            if match:
+                total = int(match.group(1))
+            elif len(data) < chunk_size:
+                break
+    finally:
+        if own_client:
+            client.close()
+
+
+_DONE = object()
+
+
+class ChunkPipe:
+    """
+    Iterate `source` on a background thread, buffering at most `maxsize`
+    chunks. Producer errors are re-raised to the consumer; a consumer that
+    stops early (e.g. the upload failed) stops the producer too.
+    """
+
+    def __init__(self, source, maxsize):
+        self._source = source
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._produce, name="audio-stream", daemon=True)
+
+    def _put(self, item):
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        try:
+            for chunk in self._source:
+                if not self._put(chunk):
+                    return
+            self._put(_DONE)
+        except Exception as e:
+            self._put(e)
+        finally:
+            close = getattr(self._source, "close", None)
+            if close is not None:
+                close()
+
+    def __iter__(self):
+        self._thread.start()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self._closed.set()
+
+
+def transcribe_stream(info):
+    """
+    Transcribe the audio format selected in `info` by streaming it into
+    AssemblyAI's upload. Return (text, timed segments). Long audio is
+    transcribed in parallel windows (see long_audio.py).
+    """
+    url, headers, size = stream_source(info)
+    check_size(size)
+    aai.settings.api_key = settings.ASSEMBLYAI_API_KEY
+    aai.settings.base_url = settings.ASSEMBLYAI_BASE_URL
+    chunks = ChunkPipe(iter_media(url, headers), settings.AUDIO_STREAM_BUFFER_CHUNKS)
+    with metrics.span("transcription", path="stream"):
+        # httpx sends an iterable body with chunked transfer encoding
+        upload_url = aai.api.upload_file(aai.Client.get_default().http_client, chunks)
+        if long_audio.should_split(info.get("duration")):
+            return long_audio.transcribe(upload_url, info["duration"])
+        config = aai.TranscriptionConfig(speech_model=aai.SpeechModel.best)
+        tr = aai.Transcriber(config=config).transcribe(upload_url)
+        if tr.status == "error":
+            raise RuntimeError(f"Transcription failed: {tr.error}")
+    return tr.text, transcripts.word_segments(tr.words)
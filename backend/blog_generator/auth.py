@@ -0,0 +1,160 @@
+"""
+The login and signup hot path: bounded password hashing and throttling.
+
+A password hash is deliberately expensive CPU work. Run on request threads,
+a burst of sign-ins takes every core the process has, generation included.
+Here hashing goes through a pool of AUTH_HASH_WORKERS threads; at most
+AUTH_HASH_QUEUE more hashes may wait for it, and beyond that the view
+answers "busy" straight away (Busy). The database work stays on the
+request thread, so only pure hashing crosses threads.
+
+Before any hashing, logins are throttled per client IP (all attempts) and
+per username (failed attempts), and signups per IP, in fixed windows of
+AUTH_THROTTLE_WINDOW seconds. Counters live in the "auth" cache, which is
+shared by the processes of a host (or all hosts, with Redis); an increment
+there isn't strictly atomic, so limits are approximate under races.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import caches
+from django.core.exceptions import PermissionDenied
+
+from . import metrics
+
+
+class Busy(Exception):
+    """Too many password hashes are already running or queued."""
+
+
+_pool = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+def _hashing_pool():
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=settings.AUTH_HASH_WORKERS, thread_name_prefix="auth-hash")
+            _slots = threading.BoundedSemaphore(settings.AUTH_HASH_WORKERS + settings.AUTH_HASH_QUEUE)
+    return _pool, _slots
+
+
+def hashing(fn, *args):
+    """
+    fn(*args) on the hashing pool; raises Busy when the pool is full.
+    """
+    pool, slots = _hashing_pool()
+    if not slots.acquire(blocking=False):
+        metrics.ERRORS.inc(stage="auth_hash", error="Busy")
+        raise Busy()
+    future = pool.submit(fn, *args)
+    future.add_done_callback(lambda _: slots.release())
+    return future.result()
+
+
+def hash_password(password):
+    return hashing(make_password, password)
+
+
+def was_busy(request):
+    """
+    Whether authenticate() just failed because the hashing pool was full.
+    """
+    return getattr(request, "auth_busy", False)
+
+
+class PooledHashingBackend(ModelBackend):
+    """
+    ModelBackend with the password check run on the hashing pool. A full
+    pool fails the login with PermissionDenied (so the admin and any other
+    authenticate() caller see a failed login, not a 500) and marks the
+    request, so the app's login view can answer 503 instead.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        try:
+            return self._authenticate(username, password, **kwargs)
+        except Busy:
+            if request is not None:
+                request.auth_busy = True
+            raise PermissionDenied("The server is busy signing other people in.")
+
+    def _authenticate(self, username, password, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway, so an unknown username takes as long as a wrong password
+            hash_password(password)
+            return None
+        outdated = []
+        if not hashing(check_password, password, user.password, outdated.append):
+            return None
+        if outdated:  # stored with an older hasher or fewer iterations
+            user.password = hash_password(password)
+            user.save(update_fields=["password"])
+        return user if self.user_can_authenticate(user) else None
+
+
+def client_ip(request):
+    """
+    The client's address, taken from X-Forwarded-For when
+    AUTH_TRUSTED_PROXIES proxies (e.g. Render's) sit in front of the app.
+    """
+    proxies = settings.AUTH_TRUSTED_PROXIES
+    if proxies:
+        forwarded = [p.strip() for p in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if p.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _cache():
+    return caches["auth"]
+
+
+def _count(key):
+    return _cache().get(key) or 0
+
+
+def _hit(key):
+    cache = _cache()
+    if cache.add(key, 1, settings.AUTH_THROTTLE_WINDOW):
+        return 1
+    try:
+        return cache.incr(key)
+    except ValueError:  # expired between add() and incr()
+        cache.set(key, 1, settings.AUTH_THROTTLE_WINDOW)
+        return 1
+
+
+def login_allowed(request, username):
+    """
+    Count a login attempt; False when the client or the account is over its
+    limit and no password should be checked.
+    """
+    attempts = _hit(f"login-ip:{client_ip(request)}")
+    failures = _count(f"login-user:{username.lower()}")
+    return attempts <= settings.AUTH_LOGIN_IP_LIMIT and failures < settings.AUTH_LOGIN_USER_LIMIT
+
+
+def login_failed(username):
+    _hit(f"login-user:{username.lower()}")
+
+
+def login_succeeded(username):
+    _cache().delete(f"login-user:{username.lower()}")
+
+
+def signup_allowed(request):
+    return _hit(f"signup-ip:{client_ip(request)}") <= settings.AUTH_SIGNUP_IP_LIMIT
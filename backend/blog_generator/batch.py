@@ -0,0 +1,201 @@
+"""
+Batch generation: many videos from one playlist URL or a list of links.
+
+`expand(source)` turns the request into video links; a playlist costs one
+flat yt-dlp extraction (entry ids only, no per-video probing). From there
+the batch either
+
+- goes on the job queue (`enqueue_batch`, used by POST /generate-batch):
+  one GenerationJob per video under a GenerationBatch, so the existing
+  worker pool bounds the concurrency and `batch_payload` reports per-item
+  status, or
+- runs in this process (`generate_many`, used by `manage.py generate_batch`):
+  transcript and LLM stages fan out over BATCH_WORKERS threads, and the
+  finished posts are written with one `bulk_create`.
+
+Either way the items share the video metadata, transcript, summary and
+article caches, so repeated videos cost nothing after the first.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from . import jobs, lazy, listing, metrics, page_cache, pipeline, rendering, search, transcripts
+from .models import BlogPost, GenerationBatch, GenerationJob, PostTranscript
+
+yt_dlp = lazy.module("yt_dlp")
+
+
+class BatchError(ValueError):
+    """The batch request can't be expanded; the message is user-safe."""
+
+
+def is_playlist(url):
+    """
+    True for playlist URLs. A watch URL that also names a playlist is
+    treated as the single video, as noplaylist does.
+    """
+    parsed = urlparse(url)
+    return "list" in parse_qs(parsed.query) and not pipeline._youtube_video_id(url)
+
+
+def expand_playlist(url, limit=None):
+    """
+    Watch URLs of a playlist's videos, from one flat extraction.
+    """
+    limit = limit or settings.BATCH_MAX_ITEMS
+    opts = {"skip_download": True, "noplaylist": False, "extract_flat": "in_playlist", "playlistend": limit}
+    try:
+        with metrics.span("playlist_expand"):
+            info = pipeline.with_youtube(opts, lambda ydl: ydl.extract_info(url, download=False))
+    except yt_dlp.utils.DownloadError as e:
+        raise BatchError("Couldn't read that playlist. Check the link and try again.") from e
+    entries = [entry for entry in info.get("entries") or [] if entry and entry.get("id")]
+    return [f"https://www.youtube.com/watch?v={entry['id']}" for entry in entries][:limit]
+
+
+def expand(source):
+    """
+    Video links for a playlist URL, or a list of links (deduplicated, in
+    order). Raises BatchError if nothing usable is left.
+    """
+    if isinstance(source, str):
+        source = [source]
+    links = []
+    for item in source:
+        item = str(item).strip()
+        if not item:
+            continue
+        links.extend(expand_playlist(item) if is_playlist(item) else [item])
+    links = list(dict.fromkeys(links))
+    if not links:
+        raise BatchError("No videos to generate from.")
+    if len(links) > settings.BATCH_MAX_ITEMS:
+        raise BatchError(f"A batch can have at most {settings.BATCH_MAX_ITEMS} videos.")
+    return links
+
+
+# Queued batches --------------------------------------------------------------
+
+
+@transaction.atomic
+def enqueue_batch(user, links, source="", regenerate=False):
+    batch = GenerationBatch.objects.create(user=user, source=source[:500])
+    GenerationJob.objects.bulk_create(
+        [GenerationJob(user=user, youtube_link=link, batch=batch, regenerate=regenerate) for link in links]
+    )
+    return batch
+
+
+def batch_payload(batch):
+    """
+    JSON-friendly progress of a queued batch, one entry per video.
+    """
+    items = list(
+        batch.jobs.order_by("id").values("id", "youtube_link", "state", "stage", "error", "blog_post_id")
+    )
+    counts = dict(batch.jobs.values_list("state").annotate(n=Count("id")).order_by())
+    return {
+        "batch_id": batch.pk,
+        "source": batch.source or None,
+        "total": len(items),
+        "counts": {state: counts.get(state, 0) for state in GenerationJob.State.values},
+        "finished": all(item["state"] in (jobs.State.SUCCEEDED, jobs.State.FAILED) for item in items),
+        "items": [
+            {
+                "job_id": item["id"],
+                "link": item["youtube_link"],
+                "state": item["state"],
+                "stage": item["stage"],
+                "error": item["error"] or None,
+                "post_id": item["blog_post_id"],
+            }
+            for item in items
+        ],
+    }
+
+
+# In-process batches ----------------------------------------------------------
+
+
+def _generate(link, regenerate=False):
+    title, transcription = pipeline.acquire_video(link)
+    if not transcription:
+        raise jobs.JobError(jobs.NO_TRANSCRIPT)
+    content = pipeline.generate_blog_from_transcription(transcription, regenerate)
+    if not content:
+        raise jobs.JobError("Failed to generate blog article")
+    return title, transcription, content
+
+
+def _save_posts(posts, transcriptions):
+    """
+    bulk_create skips save() and the post_save signals, so render, index
+    and invalidate here instead. Each post's transcript goes in alongside.
+    """
+    for post in posts:
+        rendering.render_post(post)
+    with transaction.atomic():
+        posts = BlogPost.objects.bulk_create(posts)
+        PostTranscript.objects.bulk_create(
+            [
+                transcripts.build(post, text, pipeline.cached_transcript(post.youtube_link))
+                for post, text in zip(posts, transcriptions)
+            ]
+        )
+        for post in posts:
+            search.index_post(post)
+    for user_id in {post.user_id for post in posts}:
+        listing.forget_post_count(user_id)
+        page_cache.forget(user_id)
+    return posts
+
+
+def generate_many(user, links, workers=None, on_item=None, regenerate=False):
+    """
+    Generate a post per link over a pool of `workers` threads and save them
+    all at once. Returns one status dict per link, in order; `on_item` is
+    called with each as soon as its video is done.
+    """
+    workers = max(1, min(workers or settings.BATCH_WORKERS, len(links)))
+
+    def run(link):
+        try:
+            title, transcription, content = _generate(link, regenerate)
+        except Exception as e:
+            item = {"link": link, "state": jobs.State.FAILED, "error": jobs.failure_message(e, f"Batch item {link}")}
+        else:
+            item = {
+                "link": link,
+                "state": jobs.State.SUCCEEDED,
+                "title": title,
+                "transcription": transcription,
+                "content": content,
+            }
+        if on_item:
+            on_item(item)
+        return item
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+        items = list(pool.map(lambda link: pipeline._in_thread(run, link), links))
+
+    done = [item for item in items if item["state"] == jobs.State.SUCCEEDED]
+    posts = _save_posts(
+        [
+            BlogPost(
+                user=user,
+                youtube_title=item["title"],
+                youtube_link=item["link"],
+                generated_content=item["content"],
+            )
+            for item in done
+        ],
+        [item["transcription"] for item in done],
+    )
+    for item, post in zip(done, posts):
+        item["post_id"] = post.pk
+        del item["content"], item["transcription"]
+    return items
@@ -0,0 +1,1108 @@
+"""
+Offline benchmark scenarios, run with `python manage.py benchmark <name>`.
+
+Every scenario drives the real pipeline code against the fakes in
+fakes.py and returns a JSON-friendly dict of results. Latencies are in
+milliseconds.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import resource
+import shutil
+import threading
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.paginator import Paginator
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection, connections
+from django.db.models import Count, Q
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import auth, cookie_jars, jobs, listing, llm, long_audio, metrics, pipeline, scheduler, search, transcript_cache
+from . import summarize as summarize_module
+from .fakes import FakeAsyncGroq, FakeGroq, FakeTranscriptApi, FakeTranscriptionServer, FakeYoutubeDL, spoken_words
+from .models import BlogPost, GenerationJob
+
+SCENARIOS = {}
+
+
+def scenario(func):
+    SCENARIOS[func.__name__.removeprefix("bench_")] = func
+    return func
+
+
+def summarize(samples):
+    """
+    Latency summary (ms) for a list of durations in seconds.
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 2)
+
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.fmean(ordered) * 1000, 2),
+        "p50": pct(50),
+        "p95": pct(95),
+        "p99": pct(99),
+        "max": round(ordered[-1] * 1000, 2),
+    }
+
+
+def _timed(func, items):
+    samples = []
+    for item in items:
+        started = time.perf_counter()
+        func(item)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _reset_caches():
+    cache.clear()
+    pipeline._video_infos.clear()
+    transcript_cache.clear_memory()
+
+
+def _links(prefix, count):
+    return [f"https://youtu.be/{prefix}{i:0{11 - len(prefix)}d}" for i in range(count)]
+
+
+@scenario
+def bench_metadata(iterations, latency):
+    """
+    Title probe + audio download per request: separate extractions (the
+    old behaviour) versus one resolve_video() extraction reused by the
+    download.
+    """
+    fake = FakeYoutubeDL.configured(extract_latency=latency, download_latency=latency / 4)
+
+    def title_then_download(link, reuse):
+        pipeline.yt_title(link)
+        if not reuse:
+            pipeline._video_infos.clear()
+        path = pipeline.download_audio(link)
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+    results = {}
+    with mock.patch("yt_dlp.YoutubeDL", fake):
+        for name, reuse in (("separate", False), ("merged", True)):
+            _reset_caches()
+            fake.calls.clear()
+            samples = _timed(lambda link: title_then_download(link, reuse), _links(name[0], iterations))
+            results[name] = summarize(samples)
+            results[name]["extractions_per_request"] = fake.calls["extract_info"] / iterations
+
+    results["saved_per_request_ms"] = round(results["separate"]["mean"] - results["merged"]["mean"], 2)
+    return results
+
+
+@scenario
+def bench_acquisition(iterations, latency):
+    """
+    Title + transcript per request. "sequential" probes, then looks up
+    captions, then downloads audio; acquire_video overlaps the probe with
+    the caption lookup and can prefetch audio speculatively.
+    """
+    ydl = FakeYoutubeDL.configured(extract_latency=latency, download_latency=latency)
+
+    def transcribe(path, duration=None):
+        time.sleep(latency)
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+        return "transcribed audio", []
+
+    def sequential(link):
+        pipeline.yt_title(link)
+        pipeline.get_transcription(link)
+
+    cases = {
+        "captions": FakeTranscriptApi.configured(list_latency=latency, fetch_latency=latency),
+        "no_captions": FakeTranscriptApi.configured(list_latency=latency, tracks=()),
+    }
+    results = {}
+    with mock.patch("yt_dlp.YoutubeDL", ydl), mock.patch.object(pipeline, "transcribe_via_assemblyai", transcribe):
+        for case, api in cases.items():
+            results[case] = {}
+            runs = (
+                ("sequential", sequential, False),
+                ("concurrent", pipeline.acquire_video, False),
+                ("concurrent_speculative", pipeline.acquire_video, True),
+            )
+            with mock.patch.object(pipeline.youtube_transcript_api, "YouTubeTranscriptApi", api):
+                for name, func, speculative in runs:
+                    _reset_caches()
+                    with override_settings(TRANSCRIPT_SPECULATIVE_AUDIO=speculative):
+                        samples = _timed(func, _links(f"{case[0]}{name[-1]}", iterations))
+                    results[case][name] = summarize(samples)
+    return results
+
+
+@scenario
+def bench_summarize(iterations, latency):
+    """
+    Prompt-building latency against transcript length: sequential chunk
+    summaries, parallel ones, and a re-run served from the summary cache.
+    `iterations` is the number of transcripts per length.
+    """
+    backend = llm.GroqBackend(
+        "fake",
+        client=FakeGroq.configured(latency=latency, prompt_token_latency=latency / 2000)(),
+        rate_per_minute=0,
+    )
+    sentence = "The speaker explains one more detail about the topic at hand. "
+    results = {}
+    with mock.patch.object(llm, "_backend", backend):
+        for words in (2_000, 8_000, 32_000, 128_000):
+            row = {}
+            for name, parallel in (("sequential", 1), ("parallel", None)):
+                with override_settings(SUMMARY_MAX_PARALLEL=parallel or settings.SUMMARY_MAX_PARALLEL):
+                    cache.clear()
+                    texts = [f"Video {i}. " + sentence * (words // 11) for i in range(iterations)]
+                    samples = _timed(pipeline._blog_prompt, texts)
+                row[name] = summarize(samples)
+            row["cached_rerun"] = summarize(_timed(pipeline._blog_prompt, texts))
+            condensed = summarize_module.estimate_tokens(texts[0]) > settings.SUMMARY_DIRECT_MAX_TOKENS
+            row["chunks"] = len(summarize_module.chunk_transcript(texts[0])) if condensed else 0
+            if condensed:
+                row["words_per_second"] = round(words / (row["parallel"]["mean"] / 1000))
+            results[f"{words}_words"] = row
+    return results
+
+
+@scenario
+def bench_workers(iterations, latency):
+    """
+    Load test of the generation path: `iterations` jobs whose LLM call takes
+    10x `latency`, each writing a fresh article. Thread workers (the
+    WSGI-era model, one job per thread) against one asyncio worker that
+    keeps every job in flight. Then the same through the views: under WSGI,
+    `threads` clients each submit a video and follow it on the events stream
+    (one thread per open stream) while thread workers run the jobs; under
+    ASGI, every video is submitted and followed at once on one event loop
+    with the asyncio worker.
+    """
+    user, _ = User.objects.get_or_create(username="benchmark")
+    threads = 4
+    links = ["https://youtu.be/dQw4w9WgXcQ"] * iterations
+    submit = {"path": reverse("generate-blog"), "data": json.dumps({"link": links[0], "regenerate": True})}
+
+    def acquire(link, timings=None):
+        time.sleep(latency)
+        return "Video", "transcript text."
+
+    def thread_workers(stop=None, poll_interval=1.0):
+        pool = [
+            threading.Thread(
+                target=jobs.work,
+                args=(f"bench-{i}", stop),
+                kwargs={"once": stop is None, "poll_interval": poll_interval},
+            )
+            for i in range(threads)
+        ]
+        for t in pool:
+            t.start()
+        return pool
+
+    def follow(client, link):
+        response = client.post(**submit, content_type="application/json")
+        for _ in client.get(response.json()["events_url"]).streaming_content:
+            pass
+
+    def wsgi_view():
+        stop = threading.Event()
+        pool = thread_workers(stop, poll_interval=latency)
+        try:
+            return _load(follow, links, threads)
+        finally:
+            stop.set()
+            for t in pool:
+                t.join()
+
+    async def asgi_view():
+        client = AsyncClient()
+        await client.aforce_login(user)
+        stop = threading.Event()
+        worker = asyncio.create_task(
+            jobs.awork("bench-async", iterations, threads, stop_event=stop, poll_interval=latency)
+        )
+
+        async def afollow(link):
+            started = time.perf_counter()
+            response = await client.post(**submit, content_type="application/json")
+            events = await client.get(response.json()["events_url"])
+            async for _ in events.streaming_content:
+                pass
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        try:
+            samples = await asyncio.gather(*(afollow(link) for link in links))
+        finally:
+            stop.set()
+            await worker
+        return samples, time.perf_counter() - started
+
+    results = {}
+    backend = llm.GroqBackend(
+        "fake",
+        client=FakeGroq.configured(latency=latency * 10)(),
+        async_client=FakeAsyncGroq.configured(latency=latency * 10)(),
+        rate_per_minute=0,
+    )
+    with mock.patch.object(
+        pipeline, "acquire_video", acquire
+    ), mock.patch.object(llm, "_backend", backend):
+        for name, run in (
+            ("thread_workers", lambda: [t.join() for t in thread_workers()]),
+            ("async_worker", lambda: asyncio.run(jobs.awork("bench-async", iterations, threads, once=True))),
+        ):
+            for link in links:
+                jobs.enqueue(user, link, regenerate=True)
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+            results[name] = {
+                "jobs": iterations,
+                "threads": threads,
+                "seconds": round(elapsed, 3),
+                "jobs_per_second": round(iterations / elapsed, 2),
+            }
+
+        with override_settings(BLOG_JOB_EVENTS_POLL=latency):
+            for name, run in (("wsgi_view", wsgi_view), ("asgi_view", lambda: asyncio.run(asgi_view()))):
+                samples, elapsed = run()
+                results[name] = {**_phase(samples, elapsed), "threads": threads}
+    return results
+
+
+SEARCH_CORPUS_SIZES = (1_000, 10_000, 100_000)
+
+
+def _synthetic_posts(user, start, count, vocabulary, rng):
+    posts = []
+    for i in range(start, start + count):
+        body = " ".join(rng.choices(vocabulary, k=120))
+        posts.append(
+            BlogPost(
+                user=user,
+                youtube_title=" ".join(rng.choices(vocabulary, k=6)).title(),
+                youtube_link=f"https://youtu.be/{i:011d}",
+                generated_content=body,
+                excerpt=body[:160],
+            )
+        )
+    return posts
+
+
+def _load_posts(user, count, vocabulary, rng, loaded=0):
+    while loaded < count:
+        batch = min(5_000, count - loaded)
+        BlogPost.objects.bulk_create(_synthetic_posts(user, loaded, batch, vocabulary, rng))
+        loaded += batch
+    return loaded
+
+
+@scenario
+def bench_search(iterations, latency):
+    """
+    First page of blog_list search results against corpus size: the old
+    icontains scan (count + page) versus the full-text index. `iterations`
+    is the number of queries per size; `latency` is unused.
+    """
+    user, _ = User.objects.get_or_create(username="benchmark")
+    rng = random.Random(7)
+    vocabulary = [f"{word}{i}" for i, word in enumerate(["topic", "signal", "garden", "vector", "orbit"] * 400)]
+    queries = [rng.choice(vocabulary) for _ in range(iterations)]
+
+    def icontains_page(q):
+        qs = BlogPost.objects.filter(user=user).filter(
+            Q(youtube_title__icontains=q) | Q(generated_content__icontains=q)
+        ).order_by("-created_at")
+        page = Paginator(qs, 10).get_page(1)
+        list(page.object_list)
+        qs.count()
+
+    def fts_page(q):
+        list(Paginator(search.search(user, q), 10).get_page(1).object_list)
+
+    results, loaded = {"engine": search.engine()}, 0
+    for size in SEARCH_CORPUS_SIZES:
+        loaded = _load_posts(user, size, vocabulary, rng, loaded)
+        started = time.perf_counter()
+        search.rebuild()  # bulk_create skips the indexing signals
+        results[f"{size}_posts"] = {
+            "index_rebuild_ms": round((time.perf_counter() - started) * 1000, 2),
+            "icontains": summarize(_timed(icontains_page, queries)),
+            "full_text": summarize(_timed(fts_page, queries)),
+        }
+    return results
+
+
+@scenario
+def bench_blog_list(iterations, latency):
+    """
+    blog_list pages for a user with 100k posts, at increasing depth: OFFSET
+    pagination over full rows plus a second COUNT (the old view) versus
+    keyset pages over the list projection with the cached count. Then
+    the whole view on a repeat visit, with and without the page cache and
+    conditional GET. `iterations` is the number of requests per depth;
+    `latency` is unused.
+    """
+    user, _ = User.objects.get_or_create(username="benchmark")
+    rng = random.Random(7)
+    total = _load_posts(user, 100_000, [f"word{i}" for i in range(2_000)], rng)
+    per_page = 10
+    ordered = BlogPost.objects.filter(user=user).order_by("-created_at", "-id")
+
+    def offset_page(number):
+        qs = BlogPost.objects.filter(user=user).order_by("-created_at")
+        page = Paginator(qs, per_page).get_page(number)
+        list(page.object_list)
+        qs.count()
+
+    results = {"posts": total}
+    for number in (1, 100, 5_000, total // per_page):
+        # The cursor the reader would have followed to reach this page
+        boundary = ordered.only("id", "created_at")[(number - 1) * per_page - 1] if number > 1 else None
+        cursor = listing.encode_cursor(boundary) if boundary else None
+
+        def keyset(_):
+            list(listing.keyset_page(user, after=cursor, per_page=per_page).object_list)
+            listing.post_count(user)
+
+        results[f"page_{number}"] = {
+            "offset": summarize(_timed(offset_page, [number] * iterations)),
+            "keyset": summarize(_timed(keyset, range(iterations))),
+        }
+
+    # The whole view for a repeat visit to page 1: rendered every time, from
+    # the page cache (markers from the rows, or cached), and as a 304
+    client = Client()
+    client.force_login(user)
+    url = reverse("blog-list")
+    etag = client.get(url)["ETag"]
+    views = {
+        "rendered": ({"BLOG_PAGE_CACHE_TTL": 0, "BLOG_VERSION_CACHE_TTL": 0}, {}),
+        "page_cache": ({"BLOG_PAGE_CACHE_TTL": 300, "BLOG_VERSION_CACHE_TTL": 0}, {}),
+        "page_cache_cached_markers": ({"BLOG_PAGE_CACHE_TTL": 300, "BLOG_VERSION_CACHE_TTL": 300}, {}),
+        "not_modified": ({"BLOG_PAGE_CACHE_TTL": 300, "BLOG_VERSION_CACHE_TTL": 300}, {"if_none_match": etag}),
+    }
+    results["repeat_view"] = {}
+    for name, (overrides, headers) in views.items():
+        with override_settings(**overrides):
+            client.get(url)  # warm
+            results["repeat_view"][name] = summarize(
+                _timed(lambda _: client.get(url, headers=headers), range(iterations))
+            )
+    return results
+
+
+@scenario
+def bench_audio(iterations, latency):
+    """
+    Time-to-transcript on the audio fallback for 16 MiB of audio whose
+    download and upload each take `latency` seconds: download to a temp
+    file then upload (the old path) versus streaming the download into the
+    upload. Also reports the temp-disk space each path needs.
+    """
+    audio_bytes = 16 << 20
+    per_mib = latency / (audio_bytes >> 20)
+    results = {"audio_mib": audio_bytes >> 20}
+    with FakeTranscriptionServer(
+        audio_bytes=audio_bytes, media_seconds_per_mib=per_mib, upload_seconds_per_mib=per_mib
+    ) as server, override_settings(ASSEMBLYAI_BASE_URL=server.base_url, ASSEMBLYAI_API_KEY="benchmark"):
+        for name, streaming in (("file", False), ("streamed", True)):
+            fake = FakeYoutubeDL.configured(
+                media_url=server.media_url, audio_bytes=audio_bytes, download_latency=latency
+            )
+            with override_settings(TRANSCRIPT_STREAM_AUDIO=streaming), mock.patch.object(
+                pipeline.yt_dlp, "YoutubeDL", fake
+            ):
+                samples = _timed(
+                    lambda link: (_reset_caches(), pipeline.transcribe_audio(link)), _links("au", iterations)
+                )
+            results[name] = {
+                **summarize(samples),
+                "temp_disk_mib": (audio_bytes >> 20) if fake.calls["download"] else 0,
+            }
+    return results
+
+
+@scenario
+def bench_long_audio(iterations, latency):
+    """
+    AssemblyAI fallback wall time against video length: one job for the
+    whole file versus parallel overlapping windows. A stand-in transcriber
+    takes `latency` per 10 minutes of audio, like a provider whose
+    turnaround grows with the file.
+    """
+    def window(url, start_ms, end_ms):
+        time.sleep(latency * (end_ms - start_ms) / 600_000)
+        words = spoken_words((end_ms + 999) // 1000, start_ms, end_ms)
+        return [long_audio.Word(w["text"], w["start"], w["end"]) for w in words]
+
+    results = {}
+    for minutes in (10, 30, 60, 120):
+        duration = minutes * 60
+        row = {
+            "single_job": summarize(_timed(lambda _: window("upload", 0, duration * 1000), range(iterations))),
+            "segmented": summarize(
+                _timed(lambda _: long_audio.transcribe("upload", duration, window=window), range(iterations))
+            ),
+        }
+        row["windows"] = len(long_audio.plan(
+            duration * 1000, settings.TRANSCRIPT_SEGMENT_SECONDS * 1000, settings.TRANSCRIPT_SEGMENT_OVERLAP * 1000
+        ))
+        row["speedup"] = round(row["single_job"]["mean"] / row["segmented"]["mean"], 2)
+        results[f"{minutes}_minutes"] = row
+    return results
+
+
+@scenario
+def bench_scheduler(iterations, latency):
+    """
+    `iterations` transcript requests for captionless videos, 8 at a time,
+    while YouTube answers every extraction after the third with 429 (each
+    taking `latency`). Without the breaker every request still reaches
+    YouTube; with it, the rest fail fast in captions-only mode.
+    """
+    import yt_dlp
+
+    class RateLimited(FakeYoutubeDL):
+        def extract_info(self, url, download=True, process=True):
+            self._count("extract_info")
+            time.sleep(latency)
+            if self.calls["extract_info"] > 3:
+                raise yt_dlp.utils.DownloadError("HTTP Error 429: Too Many Requests")
+            return super().extract_info(url, download=False)
+
+    def request(link):
+        started = time.perf_counter()
+        try:
+            pipeline._in_thread(pipeline.acquire_video, link)
+        except Exception:
+            pass
+        return time.perf_counter() - started
+
+    results = {}
+    for name, breaker in (("no_breaker", False), ("breaker", True)):
+        _reset_caches()
+        gate = scheduler.HostScheduler(f"bench-{name}")
+        fake = RateLimited.configured(has_captions=False)
+        with mock.patch.object(scheduler, "youtube", gate), mock.patch.object(
+            pipeline.yt_dlp, "YoutubeDL", fake
+        ), mock.patch.object(
+            pipeline.youtube_transcript_api, "YouTubeTranscriptApi", FakeTranscriptApi.configured(tracks=())
+        ), override_settings(YT_MAX_CONCURRENT=8, YT_MAX_CONCURRENT_TOTAL=8):
+            if not breaker:
+                gate.trip = lambda: None
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                samples = list(pool.map(request, _links("sc", iterations)))
+            elapsed = time.perf_counter() - started
+        results[name] = {
+            "youtube_calls": fake.calls["extract_info"],
+            "seconds": round(elapsed, 3),
+            "requests": summarize(samples),
+            "scheduler": gate.metrics(),
+        }
+    return results
+
+
+@scenario
+def bench_cookie_jars(iterations, latency):
+    """
+    4x `iterations` audio downloads, 8 at a time, while YouTube allows each
+    cookie jar one extraction per 2x `latency` (bursts of 2) and answers
+    anything beyond that, or without cookies, with 429. A client that hits
+    the open breaker waits `latency` and tries again. One jar (the old
+    YTDLP_COOKIES) against a pool of four.
+    """
+    import yt_dlp
+
+    rate = 1 / (2 * latency)
+    lock = threading.Lock()
+
+    class PerIdentityLimit(FakeYoutubeDL):
+        buckets = {}
+
+        def _admit(self, identity):
+            now = time.monotonic()
+            with lock:
+                tokens, at = self.buckets.get(identity, (2.0, now))
+                tokens = min(2.0, tokens + (now - at) * rate)
+                allowed = identity != "anonymous" and tokens >= 1
+                self.buckets[identity] = (tokens - allowed, now)
+            if not allowed:
+                raise yt_dlp.utils.DownloadError("HTTP Error 429: Too Many Requests")
+
+    def request(link):
+        started, attempts = time.perf_counter(), 0
+        while True:
+            attempts += 1
+            try:
+                path = pipeline.download_audio(link)
+            except scheduler.CircuitOpen:
+                time.sleep(latency)
+                continue
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+            return time.perf_counter() - started, attempts
+
+    jar = "# Netscape HTTP Cookie File\n.youtube.com\tTRUE\t/\tTRUE\t0\tSID\t{}"
+    results = {}
+    for name, count in (("one_jar", 1), ("four_jars", 4)):
+        _reset_caches()
+        gate = scheduler.HostScheduler(f"bench-{name}")
+        jars = cookie_jars.CookiePool(env={f"YTDLP_COOKIES_{i}": jar.format(f"jar{i}") for i in range(count)})
+        fake = PerIdentityLimit.configured(buckets={}, extract_latency=latency / 4, download_latency=latency / 4)
+        with mock.patch.object(scheduler, "youtube", gate), mock.patch.object(
+            cookie_jars, "pool", jars
+        ), mock.patch.object(pipeline.yt_dlp, "YoutubeDL", fake), override_settings(
+            YT_MAX_CONCURRENT=8,
+            YT_MAX_CONCURRENT_TOTAL=8,
+            YT_REQUESTS_PER_MINUTE=0,
+            YT_BREAKER_COOLDOWN=latency * 4,
+            YT_COOKIE_QUARANTINE=latency * 2,
+        ):
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                samples = list(pool.map(request, _links(f"cj{count}", 4 * iterations)))
+            elapsed = time.perf_counter() - started
+        results[name] = {
+            "downloads_per_second": round(len(samples) / elapsed, 2),
+            "seconds": round(elapsed, 3),
+            "attempts_per_download": round(statistics.mean(a for _, a in samples), 2),
+            "youtube_calls": fake.calls["extract_info"],
+            "downloads": summarize([seconds for seconds, _ in samples]),
+            "breaker_trips": gate.metrics()["trips_total"],
+            "cookies": jars.metrics(),
+        }
+    return results
+
+
+E2E_CLIENTS = 8
+E2E_WORKERS = 4
+E2E_AUDIO_BYTES = 2 << 20
+E2E_ARTICLE = "# Fake article\n\n" + "\n\n".join(
+    f"## Section {i}\n\n" + "The video makes a **clear** point about the subject. " * 12 for i in range(8)
+)
+
+
+def _peak_rss_mib():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)  # KiB on Linux
+
+
+def _stage_means():
+    """
+    Mean milliseconds per pipeline stage, from the span histogram.
+    """
+    sums, counts = {}, {}
+    for name, key, value in metrics.STAGE_SECONDS.samples():
+        stage = dict(key).get("stage")
+        if name.endswith("_sum"):
+            sums[stage] = value
+        elif name.endswith("_count"):
+            counts[stage] = value
+    return {stage: round(sums[stage] / counts[stage] * 1000, 2) for stage in sorted(counts) if counts[stage]}
+
+
+def _load(func, items, clients):
+    """
+    Run func(client, item) for every item from `clients` threads, each with
+    its own logged-in test client. Returns (latencies, elapsed seconds).
+    """
+    local = threading.local()
+    user = User.objects.get(username="benchmark")
+
+    def one(item):
+        if not hasattr(local, "client"):
+            local.client = Client()
+            local.client.force_login(user)
+        started = time.perf_counter()
+        func(local.client, item)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        samples = list(pool.map(one, items))
+    return samples, time.perf_counter() - started
+
+
+def _phase(samples, elapsed):
+    return {**summarize(samples), "requests_per_second": round(len(samples) / elapsed, 2)}
+
+
+@scenario
+def bench_auth(iterations, latency):
+    """
+    The authenticated hot path and sign-in bursts. Per-request queries and
+    latency for each session mode (Django's default "db", "cached_db" on
+    the auth cache, "signed_cookies"). Then 4x `iterations` concurrent
+    logins, with password hashing on the bounded pool (AUTH_HASH_WORKERS)
+    versus one hash per request thread. `latency` is unused.
+    """
+    user, _ = User.objects.get_or_create(username="benchmark")
+    user.set_password("benchmark-password")
+    user.save()
+    post = BlogPost.objects.create(
+        user=user, youtube_title="Bench", youtube_link="https://youtu.be/x", generated_content="# Hello"
+    )
+    job = GenerationJob.objects.create(user=user, youtube_link="https://youtu.be/x")
+    requests = {
+        "index": lambda c: c.get(reverse("index")),
+        "blog_list": lambda c: c.get(reverse("blog-list")),
+        "blog_details": lambda c: c.get(reverse("blog-details", args=[post.pk])),
+        "generation_status": lambda c: c.get(reverse("generation-status", args=[job.pk])),
+        "generate_blog": lambda c: c.post(
+            reverse("generate-blog"), {"link": "https://youtu.be/dQw4w9WgXcQ"}, content_type="application/json"
+        ),
+    }
+    # No collected static files here; index.html only needs their URLs
+    plain_static = {**settings.STORAGES, "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+    }}
+
+    results = {}
+    with override_settings(STORAGES=plain_static, AUTH_LOGIN_IP_LIMIT=1_000_000):
+        for mode in ("db", "cached_db", "signed_cookies"):
+            with override_settings(SESSION_ENGINE=f"django.contrib.sessions.backends.{mode}"):
+                client = Client()
+                client.force_login(user)
+                row = {}
+                for name, send in requests.items():
+                    send(client)  # warm
+                    with CaptureQueriesContext(connection) as queries:
+                        samples = _timed(lambda _: send(client), range(iterations))
+                    row[name] = {
+                        "queries_per_request": round(len(queries) / iterations, 2),
+                        "session_queries": sum("django_session" in q["sql"] for q in queries) // iterations,
+                        **summarize(samples),
+                    }
+                results[mode] = row
+
+        def login(_):
+            started = time.perf_counter()
+            response = Client().post(reverse("login"), {"username": "benchmark", "password": "benchmark-password"})
+            return time.perf_counter() - started, response.status_code
+
+        burst = 4 * iterations
+        idle_rate = _background_rate(lambda: time.sleep(1.0))
+        for name, workers in (("hash_pool", settings.AUTH_HASH_WORKERS), ("per_thread", burst)):
+            caches["auth"].clear()
+            with override_settings(AUTH_HASH_WORKERS=workers, AUTH_HASH_QUEUE=burst), mock.patch.object(
+                auth, "_pool", None
+            ), mock.patch.object(auth, "_slots", None):
+                outcomes = []
+
+                def run_burst():
+                    with ThreadPoolExecutor(max_workers=burst) as pool:
+                        outcomes.extend(pool.map(lambda i: _in_new_connection(login, i), range(burst)))
+
+                started = time.perf_counter()
+                rate = _background_rate(run_burst)
+                results[f"login_burst_{name}"] = {
+                    "hash_threads": workers,
+                    "wall_ms": round((time.perf_counter() - started) * 1000, 1),
+                    "ok": sum(status == 302 for _, status in outcomes),
+                    # CPU left for other work in the process (like a generation worker)
+                    "background_work_pct": round(100 * rate / idle_rate, 1),
+                    **summarize([seconds for seconds, _ in outcomes]),
+                }
+    return results
+
+
+def _background_rate(during):
+    """
+    Hashes per second a separate CPU-bound thread (hashlib, which releases
+    the GIL like the password hashers do) manages while `during()` runs.
+    """
+    stop, done = threading.Event(), [0]
+
+    def spin():
+        block = b"x" * (1 << 16)
+        while not stop.is_set():
+            hashlib.sha256(block).digest()
+            done[0] += 1
+
+    thread = threading.Thread(target=spin)
+    started = time.perf_counter()
+    thread.start()
+    try:
+        during()
+    finally:
+        stop.set()
+        thread.join()
+    return done[0] / (time.perf_counter() - started)
+
+
+def _in_new_connection(fn, *args):
+    try:
+        return fn(*args)
+    finally:
+        connections.close_all()
+
+
+# Run in a fresh interpreter by startup_profile(). Prints one JSON line.
+_STARTUP_PROBE = """
+import gc, importlib, json, os, resource, sys, time
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ai_blog_app.settings")
+mode = sys.argv[1]
+started = time.perf_counter()
+import django
+django.setup()
+from django.conf import settings
+from blog_generator import lazy
+if mode != "lazy":
+    lazy.warm_up(freeze=mode == "preforked")
+if mode == "preforked":
+    if os.fork():
+        os.wait()
+        sys.exit(0)
+    started = time.perf_counter()  # a worker forked from the warmed-up master
+importlib.import_module(settings.ROOT_URLCONF)
+seconds = time.perf_counter() - started
+gc.collect()
+private = None
+if os.path.exists("/proc/self/smaps_rollup"):
+    with open("/proc/self/smaps_rollup") as f:
+        fields = dict(line.split(":", 1) for line in f if ":" in line)
+    private = sum(int(fields.get(k, "0 kB").split()[0]) for k in ("Private_Clean", "Private_Dirty")) / 1024
+print(json.dumps({
+    "seconds": seconds,
+    "rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "private_mib": private,
+    "modules": len(sys.modules),
+    "heavy": [name for name in lazy.HEAVY_MODULES if name in sys.modules],
+}))
+"""
+
+
+def startup_profile(mode="lazy"):
+    """
+    Boot a web worker in a fresh `python -X importtime` process, up to its
+    URLconf being imported. Modes: "lazy" (imports on first use), "eager"
+    (lazy.warm_up() in the worker itself) and "preforked" (a worker forked
+    from a warmed-up master, as with gunicorn's preload_app). Returns the
+    probe's numbers plus the slowest top-level packages by import time.
+    """
+    done = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _STARTUP_PROBE, mode],
+        cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+    )
+    profile = json.loads(done.stdout.strip().splitlines()[-1])
+    by_package = {}
+    for line in done.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            self_us, _, name = line[len("import time:"):].split("|")
+            if self_us.strip().isdigit():
+                package = name.strip().split(".")[0]
+                by_package[package] = by_package.get(package, 0) + int(self_us)
+    slowest = sorted(by_package.items(), key=lambda item: -item[1])[:8]
+    profile["slowest_imports_ms"] = {name: round(us / 1000, 1) for name, us in slowest}
+    return profile
+
+
+@scenario
+def bench_startup(iterations, latency):
+    """
+    Web worker boot: time to an imported URLconf, peak RSS and private
+    (unshared) memory, with lazy imports, with everything imported in the
+    worker, and in a worker forked from a warmed-up master.
+    """
+    results = {}
+    for mode in ("lazy", "eager", "preforked"):
+        profiles = [startup_profile(mode) for _ in range(iterations)]
+        last = profiles[-1]
+        results[mode] = {
+            "boot": summarize([p["seconds"] for p in profiles]),
+            "rss_mib": round(max(p["rss_mib"] for p in profiles), 1),
+            "private_mib": round(last["private_mib"], 1) if last["private_mib"] is not None else None,
+            "modules": last["modules"],
+            "heavy_modules": last["heavy"],
+            "slowest_imports_ms": last["slowest_imports_ms"],
+        }
+    return results
+
+
+@scenario
+def bench_e2e(iterations, latency):
+    """
+    The whole app under concurrent load, through the Django views: E2E_CLIENTS
+    clients each submit videos to generate_blog and poll the job until it
+    finishes while E2E_WORKERS job workers process them, then browse
+    blog_list (pages and searches) and blog_details. Every fourth video has
+    no captions and goes through the streamed AssemblyAI path. Each fake
+    call takes `latency`, the LLM 5x that. `iterations` is the number of
+    videos and of requests per browsing phase.
+    """
+    user, _ = User.objects.get_or_create(username="benchmark")
+    links = _links("e2e", iterations)
+    captionless = frozenset(link.rsplit("/", 1)[-1] for link in links[::4])
+    backend = llm.GroqBackend(
+        "fake",
+        client=FakeGroq.configured(latency=latency * 5, reply=E2E_ARTICLE)(),
+        rate_per_minute=0,
+    )
+    _reset_caches()
+    metrics.reset()
+    rss_before = _peak_rss_mib()
+
+    def generate(client, link):
+        response = client.post(
+            reverse("generate-blog"), data=json.dumps({"link": link}), content_type="application/json"
+        )
+        status_url = response.json()["status_url"]
+        while client.get(status_url).json()["state"] not in ("succeeded", "failed"):
+            time.sleep(0.02)
+
+    per_mib = latency / (E2E_AUDIO_BYTES >> 20)
+    stop = threading.Event()
+    workers = [
+        threading.Thread(target=jobs.work, args=(f"bench-e2e-{i}", stop), kwargs={"poll_interval": 0.05})
+        for i in range(E2E_WORKERS)
+    ]
+    with FakeTranscriptionServer(
+        audio_bytes=E2E_AUDIO_BYTES, media_seconds_per_mib=per_mib, upload_seconds_per_mib=per_mib
+    ) as server, override_settings(
+        ASSEMBLYAI_BASE_URL=server.base_url, ASSEMBLYAI_API_KEY="benchmark"
+    ), mock.patch.object(
+        pipeline.yt_dlp,
+        "YoutubeDL",
+        FakeYoutubeDL.configured(extract_latency=latency, media_url=server.media_url, audio_bytes=E2E_AUDIO_BYTES),
+    ), mock.patch.object(
+        pipeline.youtube_transcript_api,
+        "YouTubeTranscriptApi",
+        FakeTranscriptApi.configured(list_latency=latency, fetch_latency=latency, captionless_ids=captionless),
+    ), mock.patch.object(llm, "_backend", backend):
+        for t in workers:
+            t.start()
+        try:
+            results = {"generate": _phase(*_load(generate, links, E2E_CLIENTS))}
+        finally:
+            stop.set()
+            for t in workers:
+                t.join()
+
+    results["jobs"] = {
+        row["state"]: row["n"] for row in GenerationJob.objects.values("state").annotate(n=Count("id"))
+    }
+    results["stages_mean_ms"] = _stage_means()
+
+    post_ids = list(BlogPost.objects.filter(user=user).values_list("id", flat=True))
+    rng = random.Random(16)
+    queries = [f"?q=section+{i % 8}" if i % 3 == 0 else "" for i in range(iterations)]
+    results["blog_list"] = _phase(
+        *_load(lambda client, query: client.get(reverse("blog-list") + query), queries, E2E_CLIENTS)
+    )
+    results["blog_details"] = _phase(
+        *_load(
+            lambda client, pk: client.get(reverse("blog-details", args=[pk])),
+            [rng.choice(post_ids) for _ in range(iterations)],
+            E2E_CLIENTS,
+        )
+    )
+    peak = _peak_rss_mib()
+    results["memory"] = {"peak_rss_mib": peak, "peak_rss_growth_mib": round(peak - rss_before, 1)}
+    return results
+
+
+
+def _db_workload(user, iterations, writers, readers):
+    """
+    `writers` threads each saving `iterations` posts (plus a transcript
+    cache upsert, which reads before it writes) while `readers` threads
+    page through blog_list. Returns writes/s, failed operations and read
+    latency.
+    """
+    errors, read_errors, reads, done = [], [], [], threading.Event()
+
+    def write(n):
+        try:
+            for i in range(iterations):
+                try:
+                    transcript_cache.put(f"w{n}-{i}", "text", transcript_cache.Source.CAPTIONS)
+                    BlogPost.objects.create(
+                        user=user, youtube_title=f"Post {n}-{i}", youtube_link="https://youtu.be/x",
+                        generated_content="Body text for the concurrency benchmark.",
+                    )
+                except OperationalError as e:
+                    errors.append(str(e))
+        finally:
+            connections.close_all()
+
+    def read():
+        try:
+            while not done.is_set():
+                started = time.perf_counter()
+                try:
+                    list(listing.keyset_page(user).object_list)
+                except OperationalError as e:
+                    read_errors.append(str(e))
+                else:
+                    reads.append(time.perf_counter() - started)
+        finally:
+            connections.close_all()
+
+    reader_threads = [threading.Thread(target=read) for _ in range(readers)]
+    for t in reader_threads:
+        t.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        list(pool.map(write, range(writers)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    for t in reader_threads:
+        t.join()
+    attempted = writers * iterations
+    return {
+        "writes_per_second": round((attempted - len(errors)) / elapsed, 1),
+        "failed_writes": len(errors),
+        "failed_reads": len(read_errors),
+        "reads": summarize(reads),
+    }
+
+
+@scenario
+def bench_db_concurrency(iterations, latency):
+    """
+    Write throughput and read latency with 1, 4 and 16 concurrent writers
+    (and 4 readers). On SQLite, the stock connection settings (rollback
+    journal, deferred transactions, 5s busy timeout) against the tuned ones
+    from ai_blog_app/database.py. Other databases run with their configured
+    settings only. `iterations` is posts per writer; `latency` is unused.
+    """
+    user, _ = User.objects.get_or_create(username="benchmark")
+    options = connections.settings[DEFAULT_DB_ALIAS].setdefault("OPTIONS", {})
+    tuned = dict(options)
+    configs = {"configured": (tuned, None)}
+    if connection.vendor == "sqlite":
+        configs = {"stock": ({"timeout": 5}, "DELETE"), "tuned": (tuned, "WAL")}
+
+    results = {"vendor": connection.vendor}
+    try:
+        for name, (config, journal_mode) in configs.items():
+            options.clear()
+            options.update(config)
+            connections.close_all()  # reconnect with the new options
+            if journal_mode:
+                # Switch the file's journal before any thread connects; it
+                # needs the only connection.
+                with connection.cursor() as cursor:
+                    cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+                connection.close()
+            results[name] = {
+                f"{writers}_writers": _db_workload(user, iterations, writers, readers=4)
+                for writers in (1, 4, 16)
+            }
+    finally:
+        options.clear()
+        options.update(tuned)
+        connections.close_all()
+    return results
+
+# Which way each reported number should move, by its key (or, for keys like
+# stage or module names, the key of the dict holding it). Numbers not listed
+# here (counts, sizes of the workload, gauges) are shown but never regress.
+HIGHER, LOWER = "higher", "lower"
+DIRECTIONS = {
+    # Throughput and savings
+    "requests_per_second": HIGHER,
+    "jobs_per_second": HIGHER,
+    "downloads_per_second": HIGHER,
+    "writes_per_second": HIGHER,
+    "words_per_second": HIGHER,
+    "speedup": HIGHER,
+    "background_work_pct": HIGHER,
+    "saved_per_request_ms": HIGHER,  # time the merged path saves, not a latency
+    "succeeded": HIGHER,
+    "ok": HIGHER,
+    "jars_available": HIGHER,
+    "health_min": HIGHER,
+    # Latency and time
+    "mean": LOWER,
+    "p50": LOWER,
+    "p95": LOWER,
+    "p99": LOWER,
+    "max": LOWER,
+    "seconds": LOWER,
+    "wall_ms": LOWER,
+    "index_rebuild_ms": LOWER,
+    "wait_seconds_total": LOWER,
+    "stages_mean_ms": LOWER,
+    "slowest_imports_ms": LOWER,
+    # Memory and disk
+    "rss_mib": LOWER,
+    "private_mib": LOWER,
+    "peak_rss_mib": LOWER,
+    "peak_rss_growth_mib": LOWER,
+    "temp_disk_mib": LOWER,
+    "modules": LOWER,
+    # Work per request and failures
+    "extractions_per_request": LOWER,
+    "attempts_per_download": LOWER,
+    "queries_per_request": LOWER,
+    "session_queries": LOWER,
+    "youtube_calls": LOWER,
+    "failed_reads": LOWER,
+    "failed_writes": LOWER,
+    "rejected_total": LOWER,
+    "rate_limited_total": LOWER,
+    "quarantines_total": LOWER,
+    "anonymous_total": LOWER,
+    "breaker_trips": LOWER,
+    "trips_total": LOWER,
+}
+
+
+def direction(path):
+    """
+    HIGHER, LOWER or None for a dotted result path such as "generate.p95".
+    """
+    for key in reversed(path.split(".")):
+        if key in DIRECTIONS:
+            return DIRECTIONS[key]
+    return None
+
+
+def _numbers(results, prefix=""):
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _numbers(value, f"{path}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, value
+
+
+def compare(baseline, current, threshold=10.0):
+    """
+    Every numeric result that moved by more than `threshold` percent from
+    `baseline`, as (path, old, new, percent change, regressed) rows.
+    `regressed` is None for results without a direction (see DIRECTIONS).
+    """
+    old = dict(_numbers(baseline))
+    rows = []
+    for path, new in _numbers(current):
+        if path not in old or not old[path]:
+            continue
+        change = (new - old[path]) / abs(old[path]) * 100
+        if abs(change) <= threshold:
+            continue
+        better = direction(path)
+        worse = None if better is None else (change < 0 if better == HIGHER else change > 0)
+        rows.append((path, old[path], new, round(change, 1), worse))
+    return rows
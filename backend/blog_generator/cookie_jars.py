@@ -0,0 +1,271 @@
+"""
+A pool of YouTube identities (cookie jars) for yt-dlp.
+
+Jars come from YTDLP_COOKIES and YTDLP_COOKIES_<n> (Netscape cookies.txt
+content in the environment) and from the *.txt files in YTDLP_COOKIES_DIR,
+which is re-read every YT_COOKIE_RELOAD_SECONDS, so jars can be added or
+replaced without a restart.
+
+Each yt-dlp call leases one jar (`lease()`): the least busy of the jars that
+aren't quarantined, then the healthiest, then the one used longest ago, so
+concurrent downloads go out under different identities. A jar's health is a
+moving average of its outcomes. A 429 quarantines the jar for
+YT_COOKIE_QUARANTINE seconds (doubling while it keeps being rate-limited);
+a bot check or rejected cookies lower its health, and below
+YT_COOKIE_MIN_HEALTH it is quarantined too. Quarantines go through the
+default cache, so with REDIS_URL every process skips the jar.
+
+When a jar is rejected (a 429, a bot check, expired cookies) and another jar
+the call hasn't tried yet is available, the lease raises Rejected and the
+caller retries with that one; only when no jar is left does the 429 reach the
+scheduler's breaker. With no jar available the call goes out without cookies.
+
+A lease hands yt-dlp a private copy of the jar (mkstemp: a new 0600 file
+per call), so yt-dlp writing cookies back when it closes never races another
+download. Cookies refreshed by a successful call are kept for later leases.
+"""
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import lazy, metrics
+from .scheduler import is_rate_limited
+
+yt_dlp = lazy.module("yt_dlp")
+
+# Errors that blame the identity rather than the video ("Sign in to confirm
+# your age" is the video's, and no other jar would get past it either)
+_IDENTITY_ERRORS = re.compile(r"confirm you.re not a bot|cookies are no longer valid", re.I)
+
+_ENV_NAME = re.compile(r"YTDLP_COOKIES(_\d+)?")
+
+# Weight of the newest outcome in a jar's health
+HEALTH_ALPHA = 0.25
+
+
+class Rejected(RuntimeError):
+    """YouTube rejected the leased jar; retry, another jar is available."""
+
+    def __init__(self, message, jar):
+        super().__init__(message)
+        self.jar = jar  # name, for lease(skip=...)
+
+
+class Jar:
+    def __init__(self, name, content, mtime=None):
+        self.name = name
+        self.content = content
+        self.mtime = mtime
+        self.health = 1.0
+        self.in_flight = 0
+        self.last_used = 0.0
+        self.rate_limits = 0  # consecutive 429s
+        self.quarantined_until = 0.0
+
+    def available(self, now):
+        return self.quarantined_until <= now
+
+
+def _quarantine_key(name):
+    return f"yt-cookie-quarantine:{name}"
+
+
+class CookiePool:
+    def __init__(self, env=None, directory=None):
+        self._env = env
+        self._directory = directory
+        self._jars = {}
+        self._loaded_at = float("-inf")
+        self._lock = threading.Lock()
+        self._tmpdir = None  # (pid, path): forked workers make their own
+        self.counters = {
+            "leases_total": 0,
+            "anonymous_total": 0,
+            "rate_limited_total": 0,
+            "rejected_total": 0,
+            "quarantines_total": 0,
+        }
+
+    # Loading -------------------------------------------------------------------
+
+    def _sources(self):
+        env = os.environ if self._env is None else self._env
+        for name in sorted(env):
+            if _ENV_NAME.fullmatch(name) and env[name].strip():
+                yield name, None, lambda name=name: env[name].strip()
+        directory = settings.YTDLP_COOKIES_DIR if self._directory is None else self._directory
+        if directory and os.path.isdir(directory):
+            for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+                if entry.name.endswith(".txt") and entry.is_file():
+                    yield entry.name, entry.stat().st_mtime, lambda path=entry.path: _read(path)
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._loaded_at < settings.YT_COOKIE_RELOAD_SECONDS:
+            return
+        self._loaded_at = now
+        jars = {}
+        for name, mtime, read in self._sources():
+            jar = self._jars.get(name)
+            if jar is None or jar.mtime != mtime:
+                try:
+                    content = read()
+                except OSError:
+                    continue
+                if not content:
+                    continue
+                jar = Jar(name, content, mtime)  # a new or replaced jar starts healthy
+            jars[name] = jar
+        self._jars = jars
+
+    def jars(self):
+        with self._lock:
+            self._refresh()
+            return list(self._jars.values())
+
+    # Leasing -------------------------------------------------------------------
+
+    def _pick(self, skip=()):
+        with self._lock:
+            self._refresh()
+            jars = [jar for jar in self._jars.values() if jar.name not in skip]
+        if not jars:
+            return None
+        # Quarantines from other processes
+        shared = cache.get_many([_quarantine_key(jar.name) for jar in jars])
+        now = time.time()
+        with self._lock:
+            for jar in jars:
+                until = shared.get(_quarantine_key(jar.name))
+                if until and until > jar.quarantined_until:
+                    jar.quarantined_until = until
+            candidates = [jar for jar in jars if jar.available(now)]
+            if not candidates:
+                return None
+            jar = min(candidates, key=lambda j: (j.in_flight, -round(j.health, 1), j.last_used))
+            jar.in_flight += 1
+            jar.last_used = time.monotonic()
+            return jar
+
+    def _private_copy(self, jar):
+        pid = os.getpid()
+        if self._tmpdir is None or self._tmpdir[0] != pid:
+            self._tmpdir = (pid, tempfile.mkdtemp(prefix=f"yt-cookies-{pid}-"))
+        fd, path = tempfile.mkstemp(dir=self._tmpdir[1], suffix=".txt")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(jar.content)
+            f.write("\n")
+        return path
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    @contextmanager
+    def lease(self, skip=()):
+        """
+        Yield a cookie file for one yt-dlp call, or None to go without
+        cookies. Raises Rejected when YouTube turned the jar away and
+        another one, not named in `skip`, is available to retry with.
+        """
+        self._count("leases_total")
+        jar = self._pick(skip)
+        if jar is None:
+            self._count("anonymous_total")
+            yield None
+            return
+        path = self._private_copy(jar)
+        try:
+            yield path
+            try:
+                refreshed = _read(path)
+            except OSError:
+                refreshed = ""
+            with self._lock:
+                if refreshed.startswith(("# Netscape HTTP Cookie File", "# HTTP Cookie File")):
+                    jar.content = refreshed
+                self._record(jar, 1.0)
+        except yt_dlp.utils.DownloadError as e:
+            if is_rate_limited(e):
+                self._count("rate_limited_total")
+                self._rate_limited(jar)
+            elif _IDENTITY_ERRORS.search(str(e)):
+                with self._lock:
+                    self._record(jar, 0.0)
+                    if jar.health < settings.YT_COOKIE_MIN_HEALTH:
+                        self._quarantine(jar, settings.YT_COOKIE_QUARANTINE)
+            else:
+                raise  # not the identity's fault
+            if not self._has_other(jar, skip):
+                raise
+            self._count("rejected_total")
+            raise Rejected(f"YouTube rejected cookie jar {jar.name}", jar.name) from e
+        finally:
+            with self._lock:
+                jar.in_flight -= 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _record(self, jar, outcome):
+        jar.health += HEALTH_ALPHA * (outcome - jar.health)
+        if outcome:
+            jar.rate_limits = 0
+
+    def _rate_limited(self, jar):
+        with self._lock:
+            self._record(jar, 0.0)
+            jar.rate_limits += 1
+            self._quarantine(jar, settings.YT_COOKIE_QUARANTINE * min(2 ** (jar.rate_limits - 1), 16))
+
+    def _quarantine(self, jar, seconds):
+        jar.quarantined_until = time.time() + seconds
+        self.counters["quarantines_total"] += 1
+        cache.set(_quarantine_key(jar.name), jar.quarantined_until, seconds)
+
+    def _has_other(self, jar, skip=()):
+        now = time.time()
+        with self._lock:
+            return any(
+                other is not jar and other.name not in skip and other.available(now) for other in self._jars.values()
+            )
+
+    def metrics(self):
+        jars = self.jars()
+        now = time.time()
+        with self._lock:
+            metrics = dict(self.counters)
+            metrics["jars"] = len(jars)
+            metrics["jars_available"] = sum(jar.available(now) for jar in jars)
+            metrics["health_min"] = round(min((jar.health for jar in jars), default=0.0), 3)
+        return metrics
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().strip()
+
+
+pool = CookiePool()
+
+
+def lease(skip=()):
+    return pool.lease(skip)
+
+
+_GAUGES = {"jars", "jars_available", "health_min"}
+
+
+@metrics.register_collector
+def _cookie_metrics():
+    return [
+        (f"blog_youtube_cookies_{name}", "gauge" if name in _GAUGES else "counter", f"YouTube cookie jars {name}.", value)
+        for name, value in pool.metrics().items()
+    ]
@@ -0,0 +1,404 @@
+"""
+Local stand-ins for the network services the pipeline talks to.
+
+Each fake sleeps for a configurable latency instead of doing network I/O,
+so tests and `python manage.py benchmark` can drive the real pipeline code
+offline. Use `configured(...)` to get a subclass with its own settings and
+call counters.
+"""
+import asyncio
+import itertools
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from youtube_transcript_api import TranscriptsDisabled
+
+
+class _Fake:
+    calls = Counter()
+    _lock = threading.Lock()
+
+    @classmethod
+    def configured(cls, **attrs):
+        attrs.setdefault("calls", Counter())
+        return type(cls.__name__, (cls,), attrs)
+
+    @classmethod
+    def _count(cls, name):
+        with cls._lock:
+            cls.calls[name] += 1
+
+
+class FakeYoutubeDL(_Fake):
+    """
+    Mimics the parts of yt_dlp.YoutubeDL the pipeline uses.
+    """
+
+    extract_latency = 0.0
+    download_latency = 0.0
+    audio_bytes = 16 * 1024
+    duration = 600
+    has_captions = True
+    playlist_size = 5  # entries of a flat playlist extraction
+    media_url = None  # e.g. FakeTranscriptionServer.media_url: formats become streamable
+    rate_limited = ()  # identities (see identity()) answered with HTTP 429
+    bot_checked = ()  # identities asked to confirm they're not a bot
+
+    def __init__(self, params=None):
+        self.params = params or {}
+
+    def identity(self):
+        """
+        The last word of the cookie file, or "anonymous" without one.
+        """
+        path = self.params.get("cookiefile")
+        if not path:
+            return "anonymous"
+        with open(path, encoding="utf-8") as f:
+            return f.read().split()[-1]
+
+    def _admit(self, identity):
+        if identity in self.rate_limited:
+            import yt_dlp
+
+            raise yt_dlp.utils.DownloadError("HTTP Error 429: Too Many Requests")
+        if identity in self.bot_checked:
+            import yt_dlp
+
+            raise yt_dlp.utils.DownloadError("Sign in to confirm you're not a bot")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def _info(self, url):
+        vid = url.rstrip("/").rsplit("/", 1)[-1].split("v=")[-1][:11]
+        captions = {"en": [{"ext": "vtt"}]} if self.has_captions else {}
+        return {
+            "id": vid,
+            "title": f"Video {vid}",
+            "duration": self.duration,
+            "subtitles": captions,
+            "automatic_captions": captions,
+            "format_id": "140",
+            "ext": "m4a",
+            "abr": 128,
+            "filesize": self.audio_bytes,
+            **({"url": f"{self.media_url}/{vid}.m4a", "protocol": "http"} if self.media_url else {}),
+        }
+
+    def _playlist(self, url):
+        pid = url.split("list=")[-1].split("&")[0]
+        return {
+            "_type": "playlist",
+            "id": pid,
+            "title": f"Playlist {pid}",
+            "entries": [
+                {"_type": "url", "id": f"{pid[:5]}{i:06d}", "title": f"Video {i}",
+                 "url": f"https://www.youtube.com/watch?v={pid[:5]}{i:06d}"}
+                for i in range(self.playlist_size)
+            ],
+        }
+
+    def extract_info(self, url, download=True, process=True):
+        self._count("extract_info")
+        identity = self.identity()
+        self._count(f"as:{identity}")
+        time.sleep(self.extract_latency)
+        self._admit(identity)
+        if self.params.get("extract_flat") and "list=" in url:
+            return self._playlist(url)
+        info = self._info(url)
+        if download:
+            self._download(info)
+        return info
+
+    def process_ie_result(self, info, download=True, extra_info=None):
+        self._count("process_ie_result")
+        if download:
+            self._download(info)
+        return info
+
+    def prepare_filename(self, info):
+        return self.params.get("outtmpl", "%(id)s.%(ext)s") % info
+
+    def _download(self, info):
+        self._count("download")
+        time.sleep(self.download_latency)
+        with open(self.prepare_filename(info), "wb") as f:
+            f.write(b"\0" * self.audio_bytes)
+
+
+class FakeTranscriptApi(_Fake):
+    """
+    Mimics youtube_transcript_api.YouTubeTranscriptApi (instance API).
+    `tracks` lists (language_code, is_generated) pairs; empty means the
+    video has captions disabled.
+    """
+
+    list_latency = 0.0
+    fetch_latency = 0.0
+    tracks = (("en", False),)
+    words = 1500
+    captionless_ids = frozenset()  # these videos have captions disabled whatever `tracks` says
+
+    def list(self, video_id):
+        self._count("list")
+        time.sleep(self.list_latency)
+        if not self.tracks or video_id in self.captionless_ids:
+            raise TranscriptsDisabled(video_id)
+        return [FakeTranscript(self, lang, generated) for lang, generated in self.tracks]
+
+
+class FakeTranscript:
+    def __init__(self, api, language_code, is_generated, is_translatable=True):
+        self.api = api
+        self.language_code = language_code
+        self.is_generated = is_generated
+        self.is_translatable = is_translatable
+
+    def translate(self, language_code):
+        return FakeTranscript(self.api, language_code, self.is_generated, False)
+
+    def fetch(self):
+        self.api._count("fetch")
+        time.sleep(self.api.fetch_latency)
+        return [
+            SimpleNamespace(text=f"word{i} in {self.language_code}.", start=i * 0.5, duration=0.5)
+            for i in range(self.api.words)
+        ]
+
+
+class FakeGroq(_Fake):
+    """
+    Mimics groq.Groq's chat completions, streaming or not. `latency` is the
+    time to first token, `token_latency` the gap between streamed tokens.
+    """
+
+    latency = 0.0
+    token_latency = 0.0
+    prompt_token_latency = 0.0  # per prompt word, to model long-input cost
+    reply = "# A fake article\n\nWritten offline by the fake LLM backend."
+
+    def __init__(self, api_key=None, **kwargs):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, stream=False, **kwargs):
+        self._count("create")
+        time.sleep(self._wait(messages))
+        return self._stream() if stream else self._completion(messages)
+
+    def _wait(self, messages):
+        prompt_tokens = sum(len(m["content"].split()) for m in messages)
+        return self.latency + prompt_tokens * self.prompt_token_latency
+
+    def _tokens(self):
+        return re.findall(r"\S+\s*|\s+", self.reply)
+
+    def _chunk(self, token):
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+    def _completion(self, messages):
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply))],
+            usage=SimpleNamespace(
+                prompt_tokens=sum(len(m["content"].split()) for m in messages),
+                completion_tokens=len(self.reply.split()),
+            ),
+        )
+
+    def _stream(self):
+        for token in self._tokens():
+            time.sleep(self.token_latency)
+            yield self._chunk(token)
+
+
+class FakeAsyncGroq(FakeGroq):
+    """
+    Mimics groq.AsyncGroq: same behaviour as FakeGroq, but awaitable.
+    """
+
+    async def _create(self, model, messages, stream=False, **kwargs):
+        self._count("create")
+        await asyncio.sleep(self._wait(messages))
+        return self._astream() if stream else self._completion(messages)
+
+    async def _astream(self):
+        for token in self._tokens():
+            await asyncio.sleep(self.token_latency)
+            yield self._chunk(token)
+
+
+def spoken_words(speech_seconds, start_ms=0, end_ms=None):
+    """
+    AssemblyAI-style words heard in [start_ms, end_ms] of audio that says
+    "w<i>" at second i for `speech_seconds` seconds. Words cut by the
+    window's edges come back as fragments ("w7-").
+    """
+    end_ms = speech_seconds * 1000 if end_ms is None else end_ms
+    words = []
+    for i in range(speech_seconds):
+        word_start, word_end = i * 1000, i * 1000 + 600
+        if word_end > start_ms and word_start < end_ms:
+            whole = start_ms <= word_start and word_end <= end_ms
+            words.append({
+                "text": f"w{i}" if whole else f"w{i}-", "start": max(word_start, start_ms),
+                "end": min(word_end, end_ms), "confidence": 1.0,
+            })
+    return words
+
+
+class FakeTranscriptionServer:
+    """
+    A local HTTP server standing in for both ends of the streamed audio
+    path: YouTube's media server (GET /media/<name>, with Range support)
+    and AssemblyAI's upload and transcript endpoints. Point
+    ASSEMBLYAI_BASE_URL at `base_url` and FakeYoutubeDL.media_url at
+    `media_url`.
+
+    `media_seconds_per_mib` and `upload_seconds_per_mib` simulate link
+    speed. `log` records (monotonic time, event) pairs so tests can check
+    that downloading and uploading overlapped.
+
+    Each transcript job stays "processing" for `transcript_seconds`. With
+    `speech_seconds` set, the audio holds one word a second ("w0", "w1",
+    ...) and a job returns the timed words within its audio_start_from /
+    audio_end_at window; a word cut by the window's edge comes back as a
+    fragment ("w7-").
+    """
+
+    def __init__(self, audio_bytes=4 << 20, media_seconds_per_mib=0.0, upload_seconds_per_mib=0.0,
+                 text="Transcribed offline by the fake transcription server.", transcript_seconds=0.0,
+                 speech_seconds=None):
+        self.audio_bytes = audio_bytes
+        self.media_seconds_per_mib = media_seconds_per_mib
+        self.upload_seconds_per_mib = upload_seconds_per_mib
+        self.text = text
+        self.transcript_seconds = transcript_seconds
+        self.speech_seconds = speech_seconds
+        self.uploads = {}  # upload id -> bytes received
+        self.jobs = {}  # transcript id -> (request, monotonic time submitted)
+        self.log = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    @property
+    def media_url(self):
+        return f"{self.base_url}/media"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        return False
+
+    def _record(self, event):
+        with self._lock:
+            self.log.append((time.monotonic(), event))
+
+    def _transcript(self, job_id):
+        request, submitted = self.jobs[job_id]
+        payload = {"id": job_id, "audio_url": request["audio_url"]}
+        if time.monotonic() - submitted < self.transcript_seconds:
+            return {**payload, "status": "processing"}
+        if self.speech_seconds is None:
+            return {**payload, "status": "completed", "text": self.text}
+        words = spoken_words(
+            self.speech_seconds, request.get("audio_start_from") or 0, request.get("audio_end_at")
+        )
+        return {**payload, "status": "completed", "text": " ".join(w["text"] for w in words), "words": words}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, payload, status=200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body_chunks(self):
+                if self.headers.get("Transfer-Encoding", "").lower() != "chunked":
+                    yield self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                    return
+                while True:
+                    size = int(self.rfile.readline().split(b";")[0], 16)
+                    if size == 0:
+                        self.rfile.readline()
+                        return
+                    data = self.rfile.read(size)
+                    self.rfile.readline()
+                    yield data
+
+            def do_GET(self):
+                if self.path.startswith("/media/"):
+                    return self._media()
+                match = re.fullmatch(r"/v2/transcript/(\w+)", self.path)
+                if match and match.group(1) in server.jobs:
+                    return self._json(server._transcript(match.group(1)))
+                self._json({"error": "not found"}, 404)
+
+            def _media(self):
+                start, end = 0, server.audio_bytes - 1
+                match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+                if match:
+                    start = int(match.group(1))
+                    end = min(end, int(match.group(2) or end))
+                if start >= server.audio_bytes:
+                    self.send_response(416)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                length = end - start + 1
+                time.sleep(server.media_seconds_per_mib * length / (1 << 20))
+                server._record("media")
+                self.send_response(206 if match else 200)
+                if match:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{server.audio_bytes}")
+                self.send_header("Content-Length", str(length))
+                self.end_headers()
+                self.wfile.write(b"\0" * length)
+
+            def do_POST(self):
+                if self.path == "/v2/upload":
+                    upload_id = str(next(server._ids))
+                    received = 0
+                    for data in self._body_chunks():
+                        time.sleep(server.upload_seconds_per_mib * len(data) / (1 << 20))
+                        received += len(data)
+                        server._record("upload")
+                    server.uploads[upload_id] = received
+                    return self._json({"upload_url": f"{server.base_url}/uploads/{upload_id}"})
+                if self.path == "/v2/transcript":
+                    request = json.loads(b"".join(self._body_chunks()))
+                    job_id = f"t{next(server._ids)}"
+                    server.jobs[job_id] = (request, time.monotonic())
+                    server._record("transcript")
+                    return self._json({"id": job_id, "status": "queued", "audio_url": request["audio_url"]})
+                self._json({"error": "not found"}, 404)
+
+        return Handler
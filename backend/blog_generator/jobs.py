@@ -0,0 +1,432 @@
+"""
+Database-backed job queue for blog generation.
+
+`generate_blog` only inserts a GenerationJob row. Workers started with
+`python manage.py run_blog_workers` claim queued rows with a compare-and-swap
+UPDATE, so any number of worker threads/processes can share the queue
+without an outside broker.
+
+Workers come in two flavours: `work` runs one job at a time per thread, and
+`awork` runs many jobs concurrently on an asyncio loop, with the blocking
+extractors confined to a bounded thread pool.
+"""
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import F
+from django.utils import timezone
+
+from . import audio_stream, lazy, metrics, pipeline, scheduler, singleflight, transcripts
+from .models import BlogPost, GenerationJob
+
+yt_dlp = lazy.module("yt_dlp")
+
+logger = logging.getLogger(__name__)
+
+State = GenerationJob.State
+Stage = GenerationJob.Stage
+
+
+class JobError(Exception):
+    """A failure whose message is safe to show to the user."""
+
+
+def enqueue(user, link, regenerate=False):
+    return GenerationJob.objects.create(user=user, youtube_link=link, regenerate=regenerate)
+
+
+async def aenqueue(user, link, regenerate=False):
+    return await GenerationJob.objects.acreate(user=user, youtube_link=link, regenerate=regenerate)
+
+
+def job_payload(job):
+    """
+    JSON-friendly view of a job for the status/events endpoints.
+    """
+    payload = {
+        "job_id": job.pk,
+        "state": job.state,
+        "stage": job.stage,
+        "stage_label": Stage(job.stage).label,
+        "timings": job.timings,
+        "error": job.error or None,
+    }
+    if job.state == State.SUCCEEDED and job.blog_post_id:
+        payload["post_id"] = job.blog_post_id
+        payload["content"] = job.blog_post.generated_content
+    elif job.partial_content:
+        payload["partial_content"] = job.partial_content
+    return payload
+
+
+def default_worker_name(index=0):
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+def claim_next(worker_name):
+    """
+    Claim the oldest queued job for `worker_name`, or return None.
+    The conditional UPDATE is the lock: only one worker can flip a given
+    row from queued to running, so this is safe on SQLite and Postgres alike.
+    """
+    for _ in range(5):
+        pk = (
+            GenerationJob.objects.filter(state=State.QUEUED)
+            .order_by("created_at", "id")
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if pk is None:
+            return None
+        now = timezone.now()
+        claimed = GenerationJob.objects.filter(pk=pk, state=State.QUEUED).update(
+            state=State.RUNNING,
+            worker=worker_name,
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            return GenerationJob.objects.get(pk=pk)
+        # Another worker won the race for this row; try the next one.
+    return None
+
+
+def requeue_stale():
+    """
+    Put back jobs whose worker died mid-run (no heartbeat for
+    BLOG_JOB_STALE_SECONDS). Jobs that already used all attempts fail.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.BLOG_JOB_STALE_SECONDS)
+    stale = GenerationJob.objects.filter(state=State.RUNNING, heartbeat_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=settings.BLOG_JOB_MAX_ATTEMPTS).update(
+        state=State.FAILED,
+        error="The worker processing this job stopped responding.",
+        finished_at=timezone.now(),
+    )
+    requeued = stale.update(state=State.QUEUED, stage=Stage.QUEUED, worker="")
+    return requeued, failed
+
+
+_requeue_lock = threading.Lock()
+_requeued_at = float("-inf")
+
+
+def requeue_stale_periodically():
+    """
+    requeue_stale() and singleflight.prune(), at most once every
+    BLOG_JOB_REQUEUE_SECONDS per process; worker loops call it between jobs.
+    """
+    global _requeued_at
+    with _requeue_lock:
+        if time.monotonic() - _requeued_at < settings.BLOG_JOB_REQUEUE_SECONDS:
+            return
+        _requeued_at = time.monotonic()
+    requeued, failed = requeue_stale()
+    if requeued or failed:
+        logger.warning("Recovered stale jobs: %s requeued, %s failed", requeued, failed)
+    singleflight.prune()
+
+
+def _owned(job):
+    """
+    `job`'s row while this claim still holds it: requeue_stale may have
+    taken it back and handed it to another worker (or the same one again,
+    with another attempt).
+    """
+    return GenerationJob.objects.filter(pk=job.pk, state=State.RUNNING, worker=job.worker, attempts=job.attempts)
+
+
+def _touch(job):
+    _owned(job).update(heartbeat_at=timezone.now())
+
+
+@contextmanager
+def _heartbeat(job):
+    """
+    Refresh the job's heartbeat every BLOG_JOB_HEARTBEAT_SECONDS from a side
+    thread while the block runs, so a long transcription or LLM call doesn't
+    look like a dead worker to requeue_stale().
+    """
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(settings.BLOG_JOB_HEARTBEAT_SECONDS):
+                try:
+                    _touch(job)
+                except Exception:
+                    logger.warning("Heartbeat of job %s failed", job.pk, exc_info=True)
+        finally:
+            connections.close_all()  # this thread's connections only
+
+    thread = threading.Thread(target=beat, name=f"heartbeat-{job.pk}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+@contextmanager
+def _stage(job, stage):
+    job.stage = stage
+    job.heartbeat_at = timezone.now()
+    job.save(update_fields=["stage", "heartbeat_at"])
+    started = time.perf_counter()
+    try:
+        with metrics.span(f"job_{stage}", job_id=job.pk):
+            yield
+    finally:
+        job.timings[stage] = round(time.perf_counter() - started, 3)
+        job.save(update_fields=["timings"])
+
+
+def _stream_into(job, deltas):
+    """
+    Collect streamed article text, flushing it to job.partial_content every
+    BLOG_STREAM_FLUSH_SECONDS so the events endpoint can forward it.
+    """
+    parts = []
+    flushed_at = time.monotonic()
+    for delta in deltas:
+        parts.append(delta)
+        if time.monotonic() - flushed_at >= settings.BLOG_STREAM_FLUSH_SECONDS:
+            GenerationJob.objects.filter(pk=job.pk).update(
+                partial_content="".join(parts), heartbeat_at=timezone.now()
+            )
+            flushed_at = time.monotonic()
+    return "".join(parts).strip()
+
+
+def _finish(job, state, error=""):
+    """
+    Record the outcome, unless the job was taken from this claim in the
+    meantime: then the claim that holds it now writes the outcome.
+    """
+    job.state = state
+    job.error = error
+    job.finished_at = timezone.now()
+    job.partial_content = ""  # the saved post (or the error) supersedes it
+    if state == State.SUCCEEDED:
+        job.stage = Stage.DONE
+    finished = _owned(job).update(
+        state=job.state,
+        stage=job.stage,
+        error=job.error,
+        blog_post=job.blog_post,
+        partial_content="",
+        finished_at=job.finished_at,
+    )
+    if not finished:
+        logger.warning("Job %s was taken over by another worker; dropping this run's %s outcome", job.pk, state)
+        return
+    metrics.JOBS.inc(state=state)
+
+
+NO_TRANSCRIPT = (
+    "Failed to get transcript. The video may not have captions "
+    "and the audio path was blocked or failed."
+)
+
+
+def failure_message(exc, what):
+    """
+    The user-facing error for `exc`; unexpected errors are logged as a
+    failure of `what` and hidden behind a generic message.
+    """
+    metrics.ERRORS.inc(stage="job", error=type(exc).__name__)
+    if isinstance(exc, (JobError, audio_stream.AudioTooLarge, scheduler.CircuitOpen)):
+        return str(exc)
+    if isinstance(exc, yt_dlp.utils.DownloadError):
+        # This is the common “YouTube challenged the request” case
+        return (
+            "YouTube blocked the request. If the video has no captions, "
+            "set YTDLP_COOKIES in your server environment and try again."
+        )
+    # Keep error details out of responses; the traceback goes to the log
+    logger.error("%s failed", what, exc_info=exc)
+    return "Unexpected server error"
+
+
+def run_job(job):
+    """
+    Run every pipeline stage for a claimed job, recording per-stage timings.
+    Never raises; failures are stored on the job.
+    """
+    link = job.youtube_link
+    try:
+        with _heartbeat(job):
+            with _stage(job, Stage.TRANSCRIPT):
+                title, transcription = pipeline.acquire_video(link, job.timings)
+            if not transcription:
+                raise JobError(NO_TRANSCRIPT)
+
+            with _stage(job, Stage.GENERATE):
+                blog_content = _stream_into(
+                    job, pipeline.stream_blog_from_transcription(transcription, job.regenerate)
+                )
+            if not blog_content:
+                raise JobError("Failed to generate blog article")
+
+            with _stage(job, Stage.SAVE):
+                job.blog_post = BlogPost.objects.create(
+                    user_id=job.user_id,
+                    youtube_title=title,
+                    youtube_link=link,
+                    generated_content=blog_content,
+                )
+                transcripts.attach(job.blog_post, transcription, pipeline.cached_transcript(link))
+    except Exception as e:
+        _finish(job, State.FAILED, failure_message(e, f"Generation job {job.pk}"))
+    else:
+        _finish(job, State.SUCCEEDED)
+    return job
+
+
+def work(worker_name, stop_event=None, poll_interval=1.0, once=False):
+    """
+    Worker loop: claim and run jobs until `stop_event` is set.
+    With `once=True` the loop returns as soon as the queue is empty.
+    """
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        close_old_connections()
+        requeue_stale_periodically()
+        job = claim_next(worker_name)
+        if job is None:
+            if once:
+                break
+            stop_event.wait(poll_interval)
+            continue
+        logger.info("%s picked up job %s", worker_name, job.pk)
+        run_job(job)
+    close_old_connections()
+
+
+# Async workers ---------------------------------------------------------------
+
+
+@asynccontextmanager
+async def _astage(job, stage):
+    job.stage = stage
+    job.heartbeat_at = timezone.now()
+    await job.asave(update_fields=["stage", "heartbeat_at"])
+    started = time.perf_counter()
+    try:
+        with metrics.span(f"job_{stage}", job_id=job.pk):
+            yield
+    finally:
+        job.timings[stage] = round(time.perf_counter() - started, 3)
+        await job.asave(update_fields=["timings"])
+
+
+async def _astream_into(job, deltas):
+    parts = []
+    flushed_at = time.monotonic()
+    async for delta in deltas:
+        parts.append(delta)
+        if time.monotonic() - flushed_at >= settings.BLOG_STREAM_FLUSH_SECONDS:
+            await GenerationJob.objects.filter(pk=job.pk).aupdate(
+                partial_content="".join(parts), heartbeat_at=timezone.now()
+            )
+            flushed_at = time.monotonic()
+    return "".join(parts).strip()
+
+
+async def _aheartbeat(job):
+    """
+    Async twin of _heartbeat: refresh the heartbeat until cancelled.
+    """
+    while True:
+        await asyncio.sleep(settings.BLOG_JOB_HEARTBEAT_SECONDS)
+        try:
+            await sync_to_async(_touch)(job)
+        except Exception:
+            logger.warning("Heartbeat of job %s failed", job.pk, exc_info=True)
+
+
+async def arun_job(job, executor):
+    """
+    Async twin of run_job. Blocking extractors run on `executor`; the LLM
+    call and the ORM writes don't hold a thread while they wait.
+    """
+    loop = asyncio.get_running_loop()
+    link = job.youtube_link
+    heartbeat = asyncio.create_task(_aheartbeat(job))
+    try:
+        async with _astage(job, Stage.TRANSCRIPT):
+            title, transcription = await loop.run_in_executor(
+                executor, pipeline._in_thread, pipeline.acquire_video, link, job.timings
+            )
+        if not transcription:
+            raise JobError(NO_TRANSCRIPT)
+
+        async with _astage(job, Stage.GENERATE):
+            blog_content = await _astream_into(
+                job, pipeline.astream_blog_from_transcription(transcription, executor, job.regenerate)
+            )
+        if not blog_content:
+            raise JobError("Failed to generate blog article")
+
+        async with _astage(job, Stage.SAVE):
+            job.blog_post = await BlogPost.objects.acreate(
+                user_id=job.user_id,
+                youtube_title=title,
+                youtube_link=link,
+                generated_content=blog_content,
+            )
+            cached = await sync_to_async(pipeline.cached_transcript)(link)
+            await transcripts.build(job.blog_post, transcription, cached).asave()
+    except Exception as e:
+        await sync_to_async(_finish)(job, State.FAILED, failure_message(e, f"Generation job {job.pk}"))
+    else:
+        await sync_to_async(_finish)(job, State.SUCCEEDED)
+    finally:
+        heartbeat.cancel()
+    return job
+
+
+async def awork(worker_name, concurrency, executor_threads, stop_event=None, poll_interval=1.0, once=False):
+    """
+    Async worker loop: keep up to `concurrency` jobs in flight at once.
+    Only the blocking extractor calls take one of `executor_threads`.
+    """
+    stop_event = stop_event or threading.Event()
+    executor = ThreadPoolExecutor(max_workers=executor_threads, thread_name_prefix="extract")
+    slots = asyncio.Semaphore(concurrency)
+    running = set()
+
+    def done(task):
+        running.discard(task)
+        slots.release()
+
+    try:
+        while not stop_event.is_set():
+            await slots.acquire()
+            await sync_to_async(requeue_stale_periodically)()
+            job = await sync_to_async(claim_next)(worker_name)
+            if job is None:
+                slots.release()
+                if once:
+                    break
+                await asyncio.sleep(poll_interval)
+                continue
+            logger.info("%s picked up job %s", worker_name, job.pk)
+            task = asyncio.create_task(arun_job(job, executor))
+            running.add(task)
+            task.add_done_callback(done)
+        await asyncio.gather(*running)
+    finally:
+        executor.shutdown(wait=False)
@@ -0,0 +1,46 @@
+"""
+Deferred imports of the heavy third-party packages.
+
+yt_dlp, assemblyai (with pydantic), youtube_transcript_api, httpx, bleach
+and markdown together take a few hundred milliseconds and tens of MiB to
+import, and only generation and rendering need them. Modules bind them with
+`module(name)`, which imports the package on first attribute access, so a
+web worker serving the login page or blog_list never loads the extractor
+stack. (Patching attributes of a lazy module patches the real one.)
+
+A preforking server can do the opposite: `warm_up()` imports everything in
+the master process, so every forked worker shares those pages copy-on-write
+instead of importing its own copy (see gunicorn.conf.py).
+"""
+import gc
+import importlib
+
+from django.utils.functional import SimpleLazyObject
+
+HEAVY_MODULES = ("yt_dlp", "assemblyai", "youtube_transcript_api", "httpx", "groq", "bleach", "markdown")
+
+
+def module(name):
+    """
+    A stand-in for `import name` that imports on first use.
+    """
+    return SimpleLazyObject(lambda: importlib.import_module(name))
+
+
+def warm_up(freeze=True):
+    """
+    Import the heavy packages and the app modules that use them now. With
+    `freeze`, move everything allocated so far out of the garbage
+    collector's reach, so collections in forked workers don't write to
+    (and so copy) the shared pages.
+    """
+    for name in HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:  # e.g. an optional backend that isn't installed
+            pass
+    from . import batch, jobs, long_audio, pipeline, rendering  # noqa: F401
+
+    if freeze:
+        gc.collect()
+        gc.freeze()
@@ -0,0 +1,114 @@
+"""
+The browse path of `blog_list`: newest-first keyset pagination over a
+narrow projection of the user's posts.
+
+Pages are addressed by an opaque cursor holding the (created_at, id) of the
+boundary post, so page 500 is one index range scan on
+blogpost_user_created_idx just like page 1, instead of an OFFSET that reads
+and discards every earlier row. The per-user total comes from the cache and
+is dropped by the save/delete signals. Those fire in the process that saved
+the post, so unless the cache is shared (REDIS_URL) the total is only kept
+for a short BLOG_COUNT_CACHE_TTL.
+"""
+import base64
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.dateparse import parse_datetime
+
+from .models import BlogPost
+
+# Everything all-blogs.html needs, and nothing else (no article bodies)
+LIST_FIELDS = ("id", "user_id", "youtube_title", "excerpt", "created_at")
+
+
+def encode_cursor(post):
+    raw = f"{post.created_at.isoformat()}|{post.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    (created_at, id) from a cursor, or None if it is missing or garbled.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.rsplit("|", 1)
+        created_at = parse_datetime(created_at)
+        return (created_at, int(pk)) if created_at else None
+    except ValueError:  # also covers binascii.Error and UnicodeDecodeError
+        return None
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    next_cursor: str = None
+    previous_cursor: str = None
+    paginator = None  # tells the template there are no page numbers
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def list_queryset(user):
+    return BlogPost.objects.filter(user=user).only(*LIST_FIELDS)
+
+
+def keyset_page(user, after=None, before=None, per_page=10):
+    """
+    One page of the user's posts, newest first. `after` is the cursor of
+    the last post on the previous page; `before` the first post on the next.
+    """
+    qs = list_queryset(user)
+    after, before = decode_cursor(after), decode_cursor(before)
+    if before:
+        created_at, pk = before
+        posts = list(
+            qs.filter(created_at__gte=created_at)
+            .exclude(created_at=created_at, id__lte=pk)
+            .order_by("created_at", "id")[: per_page + 1]
+        )
+        more_newer = len(posts) > per_page
+        posts = posts[:per_page][::-1]
+        return KeysetPage(
+            posts,
+            next_cursor=encode_cursor(posts[-1]) if posts else None,
+            previous_cursor=encode_cursor(posts[0]) if posts and more_newer else None,
+        )
+
+    if after:
+        created_at, pk = after
+        qs = qs.filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=pk)
+    posts = list(qs.order_by("-created_at", "-id")[: per_page + 1])
+    more_older = len(posts) > per_page
+    posts = posts[:per_page]
+    return KeysetPage(
+        posts,
+        next_cursor=encode_cursor(posts[-1]) if posts and more_older else None,
+        previous_cursor=encode_cursor(posts[0]) if posts and after else None,
+    )
+
+
+def _count_key(user_id):
+    return f"blog-count:{user_id}"
+
+
+def post_count(user):
+    count = cache.get(_count_key(user.pk))
+    if count is None:
+        count = BlogPost.objects.filter(user=user).count()
+        cache.set(_count_key(user.pk), count, settings.BLOG_COUNT_CACHE_TTL)
+    return count
+
+
+def forget_post_count(user_id):
+    cache.delete(_count_key(user_id))
@@ -0,0 +1,273 @@
+"""
+LLM backends used by the pipeline.
+
+`get_backend()` returns the process-wide backend chosen by LLM_BACKEND:
+
+- "groq": the Groq API over pooled HTTP connections, with per-call
+  timeouts, a token-bucket rate limit and retries with jittered
+  exponential backoff on 429/5xx/connection errors.
+- "stub": a deterministic offline backend for tests and load tests.
+
+Every backend offers complete/stream and their async twins acomplete/astream.
+"""
+import asyncio
+import hashlib
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+
+from . import lazy
+
+httpx = lazy.module("httpx")
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """
+        Take a token; return how long the caller must wait before using it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        if self.rate > 0:
+            time.sleep(self._reserve())
+
+    async def aacquire(self):
+        if self.rate > 0:
+            await asyncio.sleep(self._reserve())
+
+
+def backoff_delay(attempt, base, cap):
+    """
+    "Full jitter" exponential backoff: uniform in [0, min(cap, base * 2**attempt)].
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class LLMBackend:
+    model = None
+
+    def complete(self, prompt):
+        raise NotImplementedError
+
+    def stream(self, prompt):
+        raise NotImplementedError
+
+    async def acomplete(self, prompt):
+        raise NotImplementedError
+
+    async def astream(self, prompt):
+        raise NotImplementedError
+        yield  # pragma: no cover
+
+
+class GroqBackend(LLMBackend):
+    """
+    Groq chat completions. Clients are built lazily (so importing this module
+    needs no API key) and share one pooled HTTP connection pool each.
+    """
+
+    def __init__(self, model, client=None, async_client=None, rate_per_minute=None):
+        self.model = model
+        self._client = client
+        self._async_client = async_client
+        self._lock = threading.Lock()
+        if rate_per_minute is None:
+            rate_per_minute = settings.LLM_RATE_PER_MINUTE
+        self.bucket = TokenBucket(rate_per_minute / 60, settings.LLM_RATE_BURST)
+
+    def _limits(self):
+        return httpx.Limits(
+            max_connections=settings.LLM_POOL_SIZE,
+            max_keepalive_connections=settings.LLM_POOL_SIZE,
+        )
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                from groq import Groq
+
+                self._client = Groq(
+                    api_key=settings.GROQ_API_KEY,
+                    timeout=settings.LLM_TIMEOUT,
+                    max_retries=0,  # retries are ours, with jitter and the rate limiter
+                    http_client=httpx.Client(limits=self._limits(), timeout=settings.LLM_TIMEOUT),
+                )
+            return self._client
+
+    @property
+    def async_client(self):
+        with self._lock:
+            if self._async_client is None:
+                from groq import AsyncGroq
+
+                self._async_client = AsyncGroq(
+                    api_key=settings.GROQ_API_KEY,
+                    timeout=settings.LLM_TIMEOUT,
+                    max_retries=0,
+                    http_client=httpx.AsyncClient(limits=self._limits(), timeout=settings.LLM_TIMEOUT),
+                )
+            return self._async_client
+
+    def _messages(self, prompt):
+        return [{"role": "user", "content": prompt}]
+
+    @staticmethod
+    def _retry_delay(exc, attempt):
+        """
+        Seconds to wait before retrying after `exc`, or None if it is final.
+        """
+        import groq
+
+        if attempt >= settings.LLM_MAX_RETRIES:
+            return None
+        if isinstance(exc, (groq.RateLimitError, groq.InternalServerError)):
+            retry_after = exc.response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return min(float(retry_after), settings.LLM_BACKOFF_MAX)
+                except ValueError:
+                    pass
+        elif not isinstance(exc, groq.APIConnectionError):  # includes timeouts
+            return None
+        return backoff_delay(attempt, settings.LLM_BACKOFF_BASE, settings.LLM_BACKOFF_MAX)
+
+    def _call(self, **kwargs):
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                return self.client.chat.completions.create(model=self.model, **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                logger.warning("LLM call failed (%s); retrying in %.1fs", type(e).__name__, delay)
+                time.sleep(delay)
+                attempt += 1
+
+    async def _acall(self, **kwargs):
+        attempt = 0
+        while True:
+            await self.bucket.aacquire()
+            try:
+                return await self.async_client.chat.completions.create(model=self.model, **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                logger.warning("LLM call failed (%s); retrying in %.1fs", type(e).__name__, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def complete(self, prompt):
+        return self._call(messages=self._messages(prompt)).choices[0].message.content
+
+    def stream(self, prompt):
+        # Retries cover opening the stream; a stream that breaks midway fails the job.
+        for chunk in self._call(messages=self._messages(prompt), stream=True):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def acomplete(self, prompt):
+        return (await self._acall(messages=self._messages(prompt))).choices[0].message.content
+
+    async def astream(self, prompt):
+        async for chunk in await self._acall(messages=self._messages(prompt), stream=True):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class StubBackend(LLMBackend):
+    """
+    Deterministic offline backend: the reply depends only on the prompt.
+    LLM_STUB_LATENCY and LLM_STUB_TOKEN_LATENCY simulate a real model.
+    """
+
+    def __init__(self, model="stub", latency=0.0, token_latency=0.0):
+        self.model = model
+        self.latency = latency
+        self.token_latency = token_latency
+
+    def reply(self, prompt):
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:12]
+        body = prompt.strip().split("\n\n")[-1]
+        excerpt = " ".join(body.split()[:60])
+        return f"# Article {digest}\n\n{excerpt}\n\n## Summary\n\nGenerated offline by the stub LLM backend."
+
+    def _tokens(self, prompt):
+        return [word + " " for word in self.reply(prompt).split(" ")]
+
+    def complete(self, prompt):
+        time.sleep(self.latency)
+        return self.reply(prompt)
+
+    def stream(self, prompt):
+        time.sleep(self.latency)
+        for token in self._tokens(prompt):
+            time.sleep(self.token_latency)
+            yield token
+
+    async def acomplete(self, prompt):
+        await asyncio.sleep(self.latency)
+        return self.reply(prompt)
+
+    async def astream(self, prompt):
+        await asyncio.sleep(self.latency)
+        for token in self._tokens(prompt):
+            await asyncio.sleep(self.token_latency)
+            yield token
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def build_backend():
+    name = settings.LLM_BACKEND
+    if name == "groq":
+        return GroqBackend(settings.LLM_MODEL)
+    if name == "stub":
+        return StubBackend(
+            latency=settings.LLM_STUB_LATENCY, token_latency=settings.LLM_STUB_TOKEN_LATENCY
+        )
+    raise ValueError(f"Unknown LLM_BACKEND {name!r}; expected 'groq' or 'stub'")
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = build_backend()
+        return _backend
+
+
+def set_backend(backend):
+    """
+    Replace the process-wide backend (tests, benchmarks). None resets it.
+    """
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,118 @@
+"""
+Parallel transcription of long audio on the AssemblyAI fallback.
+
+Audio longer than TRANSCRIPT_SEGMENT_SECONDS is uploaded once and cut into
+windows of that length, each overlapping the next by
+TRANSCRIPT_SEGMENT_OVERLAP seconds. Every window is its own transcript job
+over the same upload (AssemblyAI's audio_start_from / audio_end_at), with at
+most TRANSCRIPT_SEGMENT_PARALLELISM running at once, so wall time follows
+the window length instead of the video's.
+
+The app never decodes audio (no ffmpeg), so windows are cut at fixed times.
+Stitching then looks for silence: in each overlap it cuts at the widest gap
+between words, keeping the earlier window's words before that point and the
+later window's from it on. So a word cut off by a window edge is taken from
+the window that heard it whole, and no word is kept twice. Word
+timestamps are those of the whole file, so they need no shifting.
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import lazy, metrics, transcripts
+
+aai = lazy.module("assemblyai")
+
+Word = namedtuple("Word", "text start end")  # times in ms, like AssemblyAI's words
+
+
+def should_split(duration):
+    """
+    Whether `duration` seconds of audio are worth more than one job.
+    """
+    size = settings.TRANSCRIPT_SEGMENT_SECONDS
+    return bool(size and duration and duration > size + settings.TRANSCRIPT_SEGMENT_OVERLAP)
+
+
+def plan(duration_ms, window_ms, overlap_ms):
+    """
+    (start, end) windows in ms covering `duration_ms`, each overlapping the
+    next by `overlap_ms` (at most half a window, so every window moves on).
+    """
+    window_ms = max(window_ms, 1)
+    overlap_ms = max(0, min(overlap_ms, window_ms // 2))
+    windows, start = [], 0
+    while True:
+        end = min(start + window_ms, duration_ms)
+        windows.append((start, end))
+        if end >= duration_ms:
+            return windows
+        start = end - overlap_ms
+
+
+def transcribe_window(audio_url, start_ms, end_ms):
+    """
+    Words AssemblyAI hears in [start_ms, end_ms] of an uploaded file.
+    """
+    config = aai.TranscriptionConfig(
+        speech_model=aai.SpeechModel.best, audio_start_from=start_ms, audio_end_at=end_ms
+    )
+    tr = aai.Transcriber(config=config).transcribe(audio_url)
+    if tr.status == "error":
+        raise RuntimeError(f"Transcription failed: {tr.error}")
+    return [Word(w.text, w.start, w.end) for w in tr.words or ()]
+
+
+def _quiet_point(words, lo, hi):
+    """
+    The middle of the widest gap between `words` within [lo, hi], or the
+    middle of the range when no gap lies there.
+    """
+    inside = [w for w in words if w.end > lo and w.start < hi]
+    gaps = [(b.start - a.end, (a.end + b.start) / 2) for a, b in zip(inside, inside[1:])]
+    gaps = [gap for gap in gaps if lo <= gap[1] <= hi]
+    return max(gaps)[1] if gaps else (lo + hi) / 2
+
+
+def stitch(parts):
+    """
+    One word list from [((start, end), words), ...] of consecutive,
+    overlapping windows.
+    """
+    stitched, previous_end = [], None
+    for (start, end), words in parts:
+        if previous_end is None:
+            stitched = list(words)
+        else:
+            cut = _quiet_point(stitched, start, previous_end)
+            stitched = [w for w in stitched if w.start < cut] + [w for w in words if w.start >= cut]
+        previous_end = end
+    return stitched
+
+
+def transcribe(audio_url, duration, window=transcribe_window):
+    """
+    Transcribe `duration` seconds of uploaded audio as parallel, overlapping
+    windows. Return (text, timed segments). `window(audio_url, start_ms,
+    end_ms)` transcribes one window; a failed window fails the whole call.
+    """
+    windows = plan(
+        int(duration * 1000),
+        settings.TRANSCRIPT_SEGMENT_SECONDS * 1000,
+        settings.TRANSCRIPT_SEGMENT_OVERLAP * 1000,
+    )
+
+    def run(bounds):
+        with metrics.span("transcription_window", start_ms=bounds[0], end_ms=bounds[1]):
+            return window(audio_url, *bounds)
+
+    workers = max(1, min(settings.TRANSCRIPT_SEGMENT_PARALLELISM, len(windows)))
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transcribe")
+    try:
+        results = list(pool.map(run, windows))
+    finally:
+        # After a failure, don't start the windows still queued
+        pool.shutdown(wait=False, cancel_futures=True)
+    words = stitch(zip(windows, results))
+    return " ".join(w.text for w in words), transcripts.word_segments(words)
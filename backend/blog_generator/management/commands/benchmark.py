@@ -0,0 +1,91 @@
+import json
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from blog_generator.benchmarks import SCENARIOS, compare
+
+
+class Command(BaseCommand):
+    help = (
+        "Run an offline pipeline benchmark against local fakes. "
+        "Uses a throwaway test database, never the real one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("scenario", choices=sorted(SCENARIOS))
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.2,
+            help="Simulated latency (seconds) of one fake network call.",
+        )
+        parser.add_argument("--json", dest="json_path", help="Also write the results to this file.")
+        parser.add_argument(
+            "--compare",
+            dest="baseline_path",
+            help="A previous --json file of the same scenario to diff the results against.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=10.0,
+            help="With --compare: percent change below which a result counts as unchanged.",
+        )
+        parser.add_argument(
+            "--fail-on-regression",
+            action="store_true",
+            help="With --compare: exit with an error if any result got worse.",
+        )
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1")
+        baseline = None
+        if options["baseline_path"]:
+            with open(options["baseline_path"], encoding="utf-8") as f:
+                baseline = json.load(f)
+            if baseline.get("scenario") != options["scenario"]:
+                raise CommandError(f"{options['baseline_path']} is a {baseline.get('scenario')!r} baseline")
+
+        setup_test_environment()
+        with tempfile.TemporaryDirectory() as tmp:
+            if connection.vendor == "sqlite":
+                # A file, not the default in-memory DB, so pool threads can share it
+                connection.settings_dict["TEST"]["NAME"] = os.path.join(tmp, "benchmark.sqlite3")
+            old_name = connection.creation.create_test_db(verbosity=0)
+            try:
+                # The fakes aren't YouTube: no request pacing unless a scenario asks for it
+                with override_settings(YT_REQUESTS_PER_MINUTE=0):
+                    results = SCENARIOS[options["scenario"]](options["iterations"], options["latency"])
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        output = json.dumps({"scenario": options["scenario"], **results}, indent=2)
+        self.stdout.write(output)
+        if options["json_path"]:
+            with open(options["json_path"], "w", encoding="utf-8") as f:
+                f.write(output + "\n")
+
+        if baseline is not None:
+            self._report(compare(baseline, results, options["threshold"]), options)
+
+    def _report(self, rows, options):
+        if not rows:
+            self.stdout.write(f"No result moved by more than {options['threshold']}% from the baseline.")
+            return
+        for path, old, new, change, worse in rows:
+            if worse is None:
+                self.stdout.write(f"moved  {path}: {old} -> {new} ({change:+}%)")
+                continue
+            style = self.style.ERROR if worse else self.style.SUCCESS
+            self.stdout.write(style(f"{'worse ' if worse else 'better'} {path}: {old} -> {new} ({change:+}%)"))
+        regressed = sum(worse is True for *_, worse in rows)
+        if regressed and options["fail_on_regression"]:
+            raise CommandError(f"{regressed} result(s) regressed by more than {options['threshold']}%.")
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from blog_generator import batch, jobs
+
+
+class Command(BaseCommand):
+    help = "Generate articles for every video of a playlist URL and/or a list of links."
+
+    def add_arguments(self, parser):
+        parser.add_argument("sources", nargs="*", help="Playlist URLs and/or video links.")
+        parser.add_argument("--user", required=True, help="Username that will own the posts.")
+        parser.add_argument("--file", help="A file with one playlist URL or video link per line.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.BATCH_WORKERS,
+            help="Videos processed at once in this process.",
+        )
+        parser.add_argument(
+            "--regenerate",
+            action="store_true",
+            help="Write fresh articles even for videos already in the article cache.",
+        )
+        parser.add_argument(
+            "--queue",
+            action="store_true",
+            help="Queue the videos for run_blog_workers instead of generating them here.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}.")
+
+        sources = list(options["sources"])
+        if options["file"]:
+            with open(options["file"], encoding="utf-8") as f:
+                sources += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        try:
+            links = batch.expand(sources)
+        except batch.BatchError as e:
+            raise CommandError(str(e))
+
+        if options["queue"]:
+            queued = batch.enqueue_batch(
+                user, links, sources[0] if len(sources) == 1 else "", regenerate=options["regenerate"]
+            )
+            self.stdout.write(self.style.SUCCESS(f"Queued batch {queued.pk} with {len(links)} video(s)."))
+            return
+
+        self.stdout.write(f"Generating {len(links)} video(s) with {options['workers']} worker(s)...")
+
+        def report(item):
+            if item["state"] == jobs.State.SUCCEEDED:
+                self.stdout.write(f"  ok      {item['link']}  {item['title']}")
+            else:
+                self.stdout.write(self.style.ERROR(f"  failed  {item['link']}  {item['error']}"))
+
+        items = batch.generate_many(
+            user, links, options["workers"], on_item=report, regenerate=options["regenerate"]
+        )
+        saved = sum(item["state"] == jobs.State.SUCCEEDED for item in items)
+        style = self.style.SUCCESS if saved == len(items) else self.style.WARNING
+        self.stdout.write(style(f"Saved {saved} of {len(items)} post(s)."))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from blog_generator.models import BlogPost
+from blog_generator.rendering import RENDER_VERSION, RENDERED_FIELDS, render_post
+
+
+class Command(BaseCommand):
+    help = "Store sanitized HTML and excerpts for posts rendered under an older RENDER_VERSION."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Re-render every post, not only the stale ones.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Posts loaded and written per batch.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        stale = BlogPost.objects.all()
+        if not options["all"]:
+            stale = stale.filter(~Q(render_version=RENDER_VERSION))
+
+        done, last_pk = 0, 0
+        while True:
+            # Walk by primary key so updated rows never shift the next batch.
+            batch = list(
+                stale.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .only("pk", "generated_content")[:batch_size]
+            )
+            if not batch:
+                break
+            for post in batch:
+                render_post(post)
+            # bulk_update skips save(), so modified_at stays put.
+            BlogPost.objects.bulk_update(batch, RENDERED_FIELDS)
+            done += len(batch)
+            last_pk = batch[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f"Rendered {done} post(s) at version {RENDER_VERSION}."))
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog_generator import jobs, metrics, singleflight
+
+
+class Command(BaseCommand):
+    help = "Run background workers that process queued blog generation jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.BLOG_WORKERS,
+            help="Number of worker threads in this process.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds an idle worker waits before checking the queue again.",
+        )
+        parser.add_argument(
+            "--async-concurrency",
+            type=int,
+            default=settings.BLOG_ASYNC_CONCURRENCY,
+            help=(
+                "Run one asyncio worker keeping this many jobs in flight instead of "
+                "thread workers. 0 disables async mode."
+            ),
+        )
+        parser.add_argument(
+            "--executor-threads",
+            type=int,
+            default=settings.BLOG_WORKERS,
+            help="Async mode: threads for blocking yt-dlp/caption/AssemblyAI calls.",
+        )
+        parser.add_argument(
+            "--metrics-port",
+            type=int,
+            default=settings.METRICS_WORKER_PORT,
+            help="Serve this process's metrics at http://0.0.0.0:PORT/metrics. 0 disables it.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the queue and exit instead of waiting for new jobs.",
+        )
+
+    def handle(self, *args, **options):
+        requeued, failed = jobs.requeue_stale()
+        if requeued or failed:
+            self.stdout.write(f"Recovered stale jobs: {requeued} requeued, {failed} failed.")
+        singleflight.prune()
+        if options["metrics_port"]:
+            metrics.serve(options["metrics_port"])
+            self.stdout.write(f"Serving metrics on port {options['metrics_port']}.")
+
+        stop = threading.Event()
+        if options["async_concurrency"] > 0:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Started async blog worker ({options['async_concurrency']} jobs in flight, "
+                    f"{options['executor_threads']} extractor threads)."
+                )
+            )
+            try:
+                asyncio.run(
+                    jobs.awork(
+                        jobs.default_worker_name(),
+                        options["async_concurrency"],
+                        max(1, options["executor_threads"]),
+                        stop,
+                        poll_interval=options["poll_interval"],
+                        once=options["once"],
+                    )
+                )
+            except KeyboardInterrupt:
+                self.stdout.write("Stopped.")
+            return
+
+        threads = [
+            threading.Thread(
+                target=jobs.work,
+                args=(jobs.default_worker_name(i), stop),
+                kwargs={"poll_interval": options["poll_interval"], "once": options["once"]},
+                name=f"blog-worker-{i}",
+                daemon=True,
+            )
+            for i in range(max(1, options["workers"]))
+        ]
+        for t in threads:
+            t.start()
+        self.stdout.write(self.style.SUCCESS(f"Started {len(threads)} blog worker(s)."))
+
+        try:
+            for t in threads:
+                while t.is_alive():
+                    t.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping workers after their current job...")
+            stop.set()
+            for t in threads:
+                t.join()
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+from django.db.models.functions import Length
+
+from blog_generator import transcript_cache, transcripts
+from blog_generator.models import BlogPost, PostTranscript, TranscriptCacheEntry
+from blog_generator.pipeline import _youtube_video_id
+
+
+def _mib(n):
+    return f"{(n or 0) / (1 << 20):.2f} MiB"
+
+
+class Command(BaseCommand):
+    help = "Report how much space post transcripts take, compressed against raw."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--backfill",
+            action="store_true",
+            help="First store transcripts for posts without one, from the transcript cache.",
+        )
+
+    def handle(self, *args, **options):
+        if options["backfill"]:
+            self._backfill()
+
+        rows = (
+            PostTranscript.objects.values("codec")
+            .annotate(n=Count("pk"), raw=Sum("raw_bytes"), stored=Sum("stored_bytes"), segments=Sum("segment_count"))
+            .order_by("codec")
+        )
+        raw_total = stored_total = 0
+        for row in rows:
+            raw_total += row["raw"]
+            stored_total += row["stored"]
+            self.stdout.write(
+                f"{row['codec']:>5}: {row['n']} transcript(s), {row['segments']} segment(s), "
+                f"{_mib(row['raw'])} raw -> {_mib(row['stored'])} stored"
+            )
+        if raw_total:
+            saved = 100 * (1 - stored_total / raw_total)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Post transcripts: {_mib(raw_total)} raw, {_mib(stored_total)} stored ({saved:.1f}% saved)."
+                )
+            )
+        else:
+            self.stdout.write("No post transcripts stored yet.")
+
+        cache = TranscriptCacheEntry.objects.aggregate(n=Count("pk"), text=Sum(Length("text")))
+        self.stdout.write(f"Transcript cache: {cache['n']} entr(ies), {_mib(cache['text'])} of text.")
+        self.stdout.write(f"Codec for new transcripts: {transcripts.CODEC}.")
+
+    def _backfill(self):
+        done = 0
+        missing = BlogPost.objects.filter(transcript__isnull=True).only("pk", "youtube_link")
+        for post in missing.iterator():
+            cached = transcript_cache.get(_youtube_video_id(post.youtube_link))
+            if cached is not None:
+                transcripts.attach(post, cached.text, cached)
+                done += 1
+        self.stdout.write(f"Backfilled {done} transcript(s) from the transcript cache.")
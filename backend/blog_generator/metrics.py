@@ -0,0 +1,208 @@
+"""
+In-process metrics for the generation pipeline, in Prometheus text format.
+
+Pipeline code records into the module-level metrics below, mostly through
+`span(stage)`, which times a block into STAGE_SECONDS and counts any
+exception it lets through in ERRORS by stage and exception class. With
+METRICS_JSON_LOGS on, every span is also logged as one JSON line on the
+"blog_generator.metrics" logger.
+
+Each process keeps its own numbers: the web process serves them at
+/metrics, and `run_blog_workers --metrics-port` serves a worker's. Recording
+is a lock and a few additions, cheap enough to leave on everywhere.
+"""
+import bisect
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger("blog_generator.metrics")
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = [*key, *extra]
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(Counter):
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=SECONDS_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        entry = self._values.get(_label_key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        samples = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _format_value(float(bound))
+                samples.append((f"{self.name}_bucket", key + (("le", le),), cumulative))
+            samples.append((f"{self.name}_sum", key, total))
+            samples.append((f"{self.name}_count", key, cumulative))
+        return samples
+
+
+STAGE_SECONDS = Histogram("blog_stage_seconds", "Time spent in each pipeline stage.")
+ERRORS = Counter("blog_errors_total", "Exceptions raised out of a pipeline stage, by class.")
+CACHE_REQUESTS = Counter("blog_cache_requests_total", "Cache lookups by cache and result (hit/miss).")
+AUDIO_BYTES = Counter("blog_audio_bytes_total", "Audio bytes fetched from YouTube, by path (file/stream).")
+LLM_TOKENS = Counter("blog_llm_tokens_total", "Estimated LLM tokens, by purpose and direction (in/out).")
+JOBS = Counter("blog_jobs_total", "Finished generation jobs, by final state.")
+
+REGISTRY = [STAGE_SECONDS, ERRORS, CACHE_REQUESTS, AUDIO_BYTES, LLM_TOKENS, JOBS]
+
+# Callables returning [(name, kind, help, value)] for values read at scrape time
+_collectors = []
+
+
+def register_collector(collect):
+    _collectors.append(collect)
+    return collect
+
+
+def cache_result(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+@contextmanager
+def span(stage, **fields):
+    """
+    Time the block as `stage`. Extra `fields` only go to the JSON log.
+    """
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = type(e).__name__
+        ERRORS.inc(stage=stage, error=error)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if settings.METRICS_JSON_LOGS:
+            event = {"event": "span", "stage": stage, "seconds": round(elapsed, 4), "error": error, **fields}
+            logger.info(json.dumps(event, default=str))
+
+
+def render():
+    """
+    Every metric in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, key, value in metric.samples():
+            lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+    for collect in _collectors:
+        try:
+            collected = collect()
+        except Exception:
+            logger.exception("Metrics collector %r failed", collect)
+            continue
+        for name, kind, help, value in collected:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """
+    Zero every metric (tests).
+    """
+    for metric in REGISTRY:
+        metric.clear()
+
+
+def serve(port, host="0.0.0.0"):
+    """
+    Serve render() at http://host:port/metrics from a daemon thread, for
+    processes without a web server (the job workers).
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            try:
+                body = render().encode()
+            finally:
+                connections.close_all()  # collectors may read the DB from this thread
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_generator', '0002_generationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video_id', models.CharField(max_length=32, unique=True)),
+                ('text', models.TextField()),
+                ('source', models.CharField(choices=[('captions', 'Captions'), ('translated', 'Translated captions'), ('assemblyai', 'AssemblyAI')], max_length=16)),
+                ('language', models.CharField(blank=True, max_length=16)),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
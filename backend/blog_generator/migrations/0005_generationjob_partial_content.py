@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_generator', '0004_flight'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='partial_content',
+            field=models.TextField(blank=True),
+        ),
+    ]
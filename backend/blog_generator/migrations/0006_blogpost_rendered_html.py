@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_generator', '0005_generationjob_partial_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='render_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='rendered_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
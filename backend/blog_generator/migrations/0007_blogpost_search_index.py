@@ -0,0 +1,51 @@
+from django.db import migrations
+
+FTS_TABLE = "blog_generator_blogpost_fts"
+POST_TABLE = "blog_generator_blogpost"
+PG_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(youtube_title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(generated_content, '')), 'B')"
+)
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            "user_id UNINDEXED, title, body, "
+            "tokenize = 'porter unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, user_id, title, body) "
+            f"SELECT id, user_id, youtube_title, generated_content FROM {POST_TABLE}"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(f"ALTER TABLE {POST_TABLE} ADD COLUMN search_vector tsvector")
+        schema_editor.execute(f"UPDATE {POST_TABLE} SET search_vector = {PG_VECTOR}")
+        schema_editor.execute(
+            f"CREATE INDEX blogpost_search_vector_gin ON {POST_TABLE} USING GIN (search_vector)"
+        )
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == "postgresql":
+        schema_editor.execute(f"ALTER TABLE {POST_TABLE} DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text search index (see blog_generator/search.py). Not a model
+    field: the FTS5 table and the tsvector column are engine-specific.
+    """
+
+    dependencies = [
+        ('blog_generator', '0006_blogpost_rendered_html'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
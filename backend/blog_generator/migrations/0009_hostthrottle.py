@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_generator', '0008_blogpost_excerpt_list_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HostThrottle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('tokens', models.FloatField(default=0)),
+                ('refilled_at', models.FloatField(default=0)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('breaker_open_until', models.DateTimeField(blank=True, null=True)),
+                ('breaker_trips', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_generator', '0011_articlecacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTranscript',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='transcript', serialize=False, to='blog_generator.blogpost')),
+                ('source', models.CharField(blank=True, choices=[('captions', 'Captions'), ('translated', 'Translated captions'), ('assemblyai', 'AssemblyAI')], max_length=16)),
+                ('language', models.CharField(blank=True, max_length=16)),
+                ('codec', models.CharField(max_length=8)),
+                ('data', models.BinaryField()),
+                ('segment_count', models.PositiveIntegerField(default=0)),
+                ('raw_bytes', models.PositiveIntegerField(default=0)),
+                ('stored_bytes', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transcriptcacheentry',
+            name='codec',
+            field=models.CharField(blank=True, max_length=8),
+        ),
+        migrations.AddField(
+            model_name='transcriptcacheentry',
+            name='segments',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
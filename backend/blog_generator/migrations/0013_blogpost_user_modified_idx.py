@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_generator', '0012_posttranscript'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['user', 'modified_at'], name='blogpost_user_modified_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+from django.db.models import Q
+
+
+def render_existing_posts(apps, schema_editor):
+    """
+    Fill in rendered_html and excerpt (added in 0006 and 0008) for posts
+    saved before them, the same way `manage.py render_posts` does.
+    """
+    from blog_generator.rendering import RENDER_VERSION, RENDERED_FIELDS, render_post
+
+    BlogPost = apps.get_model("blog_generator", "BlogPost")
+    stale = BlogPost.objects.filter(~Q(render_version=RENDER_VERSION))
+    last_pk = 0
+    while True:
+        batch = list(stale.filter(pk__gt=last_pk).order_by("pk").only("pk", "generated_content")[:500])
+        if not batch:
+            break
+        for post in batch:
+            render_post(post)
+        # bulk_update skips save(), so modified_at stays put.
+        BlogPost.objects.bulk_update(batch, RENDERED_FIELDS)
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_generator', '0013_blogpost_user_modified_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(render_existing_posts, migrations.RunPython.noop),
+    ]
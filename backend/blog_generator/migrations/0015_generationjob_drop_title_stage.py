@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+def move_title_jobs(apps, schema_editor):
+    # Jobs that stopped in the old "title" stage; it now belongs to "transcript"
+    GenerationJob = apps.get_model("blog_generator", "GenerationJob")
+    GenerationJob.objects.filter(stage="title").update(stage="transcript")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_generator', '0014_backfill_rendered_posts'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_title_jobs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='generationjob',
+            name='stage',
+            field=models.CharField(choices=[('queued', 'Waiting for a worker'), ('transcript', 'Getting the transcript'), ('generate', 'Writing the article'), ('save', 'Saving'), ('done', 'Done')], default='queued', max_length=16),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_generator', '0015_generationjob_drop_title_stage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hostthrottle',
+            name='leases',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 # Create your models here.
 class BlogPost(models.Model):
@@ -9,6 +10,215 @@ class BlogPost(models.Model):
     generated_content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
+    # Sanitized HTML and list excerpt of generated_content, refreshed on save
+    # (see rendering.py)
+    rendered_html = models.TextField(blank=True, editable=False)
+    excerpt = models.CharField(max_length=200, blank=True, editable=False)
+    render_version = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Serves blog_list's per-user, newest-first keyset pagination
+            models.Index(fields=["user", "-created_at", "-id"], name="blogpost_user_created_idx"),
+            # Covers the read views' per-user change marker (page_cache.posts_version)
+            models.Index(fields=["user", "modified_at"], name="blogpost_user_modified_idx"),
+        ]
+
+    def __str__(self):
+        return self.youtube_title
+
+    def save(self, *args, **kwargs):
+        from .rendering import RENDERED_FIELDS, render_post
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "generated_content" in update_fields:
+            render_post(self)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, *RENDERED_FIELDS}
+        super().save(*args, **kwargs)
+
+class GenerationBatch(models.Model):
+    """
+    Jobs queued together from one playlist URL or list of links
+    (see batch.py).
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="generation_batches")
+    source = models.CharField(max_length=500, blank=True)  # the playlist URL, if there was one
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Batch {self.pk} ({self.source or 'links'})"
+
+
+class GenerationJob(models.Model):
+    """
+    A queued blog generation. Rows are claimed and run by the background
+    workers started with `python manage.py run_blog_workers`.
+    """
+
+    class State(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+
+    class Stage(models.TextChoices):
+        QUEUED = "queued", "Waiting for a worker"
+        TRANSCRIPT = "transcript", "Getting the transcript"
+        GENERATE = "generate", "Writing the article"
+        SAVE = "save", "Saving"
+        DONE = "done", "Done"
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="generation_jobs")
+    youtube_link = models.URLField()
+    state = models.CharField(max_length=16, choices=State.choices, default=State.QUEUED)
+    stage = models.CharField(max_length=16, choices=Stage.choices, default=Stage.QUEUED)
+    error = models.TextField(blank=True)
+    timings = models.JSONField(default=dict, blank=True)  # stage -> seconds
+    partial_content = models.TextField(blank=True)  # article so far, while streaming
+    blog_post = models.ForeignKey(BlogPost, on_delete=models.SET_NULL, null=True, blank=True)
+    regenerate = models.BooleanField(default=False)  # bypass the article cache
+    batch = models.ForeignKey(
+        GenerationBatch, on_delete=models.CASCADE, null=True, blank=True, related_name="jobs"
+    )
+    worker = models.CharField(max_length=100, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["state", "created_at"])]
+
+    @property
+    def is_finished(self):
+        return self.state in (self.State.SUCCEEDED, self.State.FAILED)
+
+    def __str__(self):
+        return f"Job {self.pk} ({self.state}) {self.youtube_link}"
+
+
+class TranscriptCacheEntry(models.Model):
+    """
+    Transcript of a YouTube video, keyed by its 11-char id, shared by every
+    user who generates from that video. See transcript_cache.py.
+    """
+
+    class Source(models.TextChoices):
+        CAPTIONS = "captions", "Captions"
+        TRANSLATED = "translated", "Translated captions"
+        ASSEMBLYAI = "assemblyai", "AssemblyAI"
+
+    video_id = models.CharField(max_length=32, unique=True)
+    text = models.TextField()
+    # Timed segments, compressed (see transcripts.py); empty for old entries
+    segments = models.BinaryField(null=True, blank=True)
+    codec = models.CharField(max_length=8, blank=True)
+    source = models.CharField(max_length=16, choices=Source.choices)
+    language = models.CharField(max_length=16, blank=True)
+    fetched_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.video_id} ({self.source})"
+
+
+class PostTranscriptManager(models.Manager):
+    def get_queryset(self):
+        # The compressed bytes load only when segments are asked for
+        return super().get_queryset().defer("data")
+
+
+class PostTranscript(models.Model):
+    """
+    The transcript a post was written from: compressed, timestamped
+    segments kept out of the BlogPost table (see transcripts.py).
+    """
+
+    post = models.OneToOneField(BlogPost, on_delete=models.CASCADE, primary_key=True, related_name="transcript")
+    source = models.CharField(max_length=16, choices=TranscriptCacheEntry.Source.choices, blank=True)
+    language = models.CharField(max_length=16, blank=True)
+    codec = models.CharField(max_length=8)
+    data = models.BinaryField()
+    segment_count = models.PositiveIntegerField(default=0)
+    raw_bytes = models.PositiveIntegerField(default=0)
+    stored_bytes = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = PostTranscriptManager()
+
+    def __str__(self):
+        return f"Transcript of post {self.post_id}"
+
+    def segments(self):
+        from .transcripts import decompress
+
+        return decompress(self.codec, self.data)
+
+    @property
+    def text(self):
+        from .transcripts import text_of
+
+        return text_of(self.segments())
+
+
+class ArticleCacheEntry(models.Model):
+    """
+    A generated article, keyed by a hash of the transcript, prompt version
+    and model, so the same content is only written once. See article_cache.py.
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    model = models.CharField(max_length=100)
+    content = models.TextField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.key[:12]} ({self.model})"
+
+
+class Flight(models.Model):
+    """
+    Cross-process lease for single-flight work (see singleflight.py). The
+    row for a key is owned by the one process doing the work; everyone else
+    waits for `result`.
+    """
+
+    class State(models.TextChoices):
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    key = models.CharField(max_length=100, unique=True)
+    owner = models.CharField(max_length=100)
+    state = models.CharField(max_length=16, choices=State.choices, default=State.RUNNING)
+    result = models.JSONField(null=True, blank=True)
+    started_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.key} ({self.state})"
+
+
+class HostThrottle(models.Model):
+    """
+    Shared request budget, concurrency leases and circuit breaker for one
+    upstream host, so every worker process paces itself against the same
+    numbers (see scheduler.py). `version` makes updates compare-and-swap.
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    tokens = models.FloatField(default=0)
+    refilled_at = models.FloatField(default=0)  # epoch seconds
+    version = models.PositiveBigIntegerField(default=0)
+    breaker_open_until = models.DateTimeField(null=True, blank=True)
+    breaker_trips = models.PositiveIntegerField(default=0)
+    leases = models.JSONField(default=dict, blank=True)  # lease id -> expiry (epoch seconds)
 
     def __str__(self):
-        return self.youtube_title
\ No newline at end of file
+        return self.key
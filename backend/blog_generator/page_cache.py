@@ -0,0 +1,118 @@
+"""
+Conditional GET and a per-user page cache for the read views.
+
+blog_details answers If-None-Match / If-Modified-Since with a 304 when the
+post hasn't changed: its ETag covers the owner, the post id, modified_at
+and RENDER_VERSION. blog_list pages are keyed by a per-user marker that
+moves whenever any of the user's posts is added, edited or deleted; the
+rendered HTML of each page is cached under it for BLOG_PAGE_CACHE_TTL, and
+the same marker makes the page's ETag. A repeat view is then a 304 or a
+cache hit, with no post queries and no template rendering.
+
+A marker is the user's post count with their latest modified_at, read off
+blogpost_user_modified_idx. Every process computes the same marker from the
+same rows. Worker processes save posts too, so the marker itself is only
+cached (for BLOG_VERSION_CACHE_TTL) when the cache is shared between
+processes. The count is listing's cached total, which the page shows
+anyway. Deletes (admin only) made in another process therefore show up
+when that total expires.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+
+from . import listing
+from .models import BlogPost
+from .rendering import RENDER_VERSION
+
+
+def _digest(*parts):
+    return hashlib.md5("|".join(map(str, parts)).encode()).hexdigest()
+
+
+def _cached(key, compute):
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        if settings.BLOG_VERSION_CACHE_TTL:
+            cache.set(key, value, settings.BLOG_VERSION_CACHE_TTL)
+    return value
+
+
+def _posts_key(user_id):
+    return f"blog-posts-version:{user_id}"
+
+
+def _post_key(pk):
+    return f"blog-post-version:{pk}"
+
+
+def posts_version(user):
+    """
+    A marker that changes whenever one of the user's posts is added, saved
+    or deleted.
+    """
+    def compute():
+        last = BlogPost.objects.filter(user=user).aggregate(last=Max("modified_at"))["last"]
+        return f"{listing.post_count(user)}.{last.timestamp() if last else 0}"
+
+    return _cached(_posts_key(user.pk), compute)
+
+
+def post_version(pk):
+    """
+    (owner id, modified_at) of a post, or None if there is no such post.
+    """
+    return _cached(
+        _post_key(pk), lambda: BlogPost.objects.filter(pk=pk).values_list("user_id", "modified_at").first()
+    )
+
+
+def forget(user_id, pk=None):
+    """
+    Drop the cached markers after a write to `pk` (or to posts of `user_id`
+    that didn't go through save(), e.g. bulk_create).
+    """
+    cache.delete(_posts_key(user_id))
+    if pk is not None:
+        cache.delete(_post_key(pk))
+
+
+def _list_version(request):
+    # Computed once per request: by the ETag check, then by the view
+    if not hasattr(request, "_posts_version"):
+        request._posts_version = posts_version(request.user)
+    return request._posts_version
+
+
+def list_etag(request):
+    user = request.user
+    return _digest("list", user.pk, user.username, _list_version(request), RENDER_VERSION, request.GET.urlencode())
+
+
+def detail_etag(request, pk):
+    version = post_version(pk)
+    if version is None or version[0] != request.user.pk:
+        return None  # let the view answer (with a 404)
+    return _digest("post", request.user.pk, request.user.username, pk, version[1].timestamp(), RENDER_VERSION)
+
+
+def detail_last_modified(request, pk):
+    version = post_version(pk)
+    return version[1] if version and version[0] == request.user.pk else None
+
+
+def cached_page(request, render):
+    """
+    The HTML of the current list page, from the cache or from `render()`.
+    """
+    if not settings.BLOG_PAGE_CACHE_TTL:
+        return render()
+    key = f"blog-page:{request.user.pk}:{list_etag(request)}"
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        cache.set(key, html, settings.BLOG_PAGE_CACHE_TTL)
+    return html
@@ -0,0 +1,537 @@
+"""
+Generation pipeline: video metadata, transcript acquisition and the LLM call.
+
+These functions are shared by the request views and the background job
+workers (see jobs.py), so they must not depend on a request object.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, parse_qs
+from . import (
+    article_cache, audio_stream, cookie_jars, lazy, llm, long_audio, metrics, scheduler, singleflight, summarize,
+    transcript_cache, transcripts,
+)
+
+# Imported on first use (see lazy.py)
+yt_dlp = lazy.module("yt_dlp")
+aai = lazy.module("assemblyai")
+youtube_transcript_api = lazy.module("youtube_transcript_api")
+
+Source = transcript_cache.Source
+
+AUDIO_TMP_PREFIX = "ytaudio-"
+
+# Bump when _blog_prompt's wording changes, so cached articles are rewritten
+ARTICLE_PROMPT_VERSION = 1
+
+# video id -> (resolved_at, full yt-dlp info), handed from resolve_video to download_audio
+_video_infos = transcript_cache.LRU(32)
+
+# Side work for acquire_video: metadata probes and speculative audio downloads
+_background = ThreadPoolExecutor(
+    max_workers=settings.PIPELINE_BACKGROUND_THREADS, thread_name_prefix="pipeline"
+)
+
+def _yt_dlp_opts_base(extra, cookie_file=None):
+    """
+    Common yt-dlp options: retries, polite pacing, mobile/web clients,
+    direct audio containers (no ffmpeg), and optional cookies.
+    """
+    # If we have cookies, we must use the WEB client (iOS/Android ignore cookies)
+    # If we don't have cookies, prefer iOS (tends to avoid SABR/PO issues)
+    player_clients = ["web"] if cookie_file else ["ios"]
+
+    opts = {
+        "quiet": True,
+        "noplaylist": True,
+        "retries": settings.YT_RETRIES,
+        "fragment_retries": settings.YT_RETRIES,
+        "concurrent_fragment_downloads": 1,
+        "sleep_requests": settings.YT_SLEEP_REQUESTS,
+        "geo_bypass": True,
+        "http_chunk_size": 1 << 20,  # 1 MiB chunks reduce memory spikes
+        "extractor_args": {"youtube": {"player_client": player_clients}},
+        # Keep formats simple; try small-ish audio to be fast and avoid timeouts
+        "format": (
+            "bestaudio[ext=m4a][abr<=128]/"
+            "bestaudio[ext=webm][abr<=128]/"
+            "bestaudio[abr<=128]/"
+            "bestaudio/best"
+        ),
+    }
+    
+    if cookie_file:
+        opts["cookiefile"] = cookie_file
+    if extra:
+        opts.update(extra)
+    return opts
+
+def with_youtube(extra, call):
+    """
+    call(ydl) on a YoutubeDL with _yt_dlp_opts_base(extra) options, within a
+    scheduler slot and with a cookie jar leased from the pool. When YouTube
+    turns the jar away and another is available, retry with that one; each
+    jar is tried at most once per call.
+    """
+    tried = set()
+    while True:
+        try:
+            with scheduler.youtube.slot(), cookie_jars.lease(tried) as cookie_file:
+                with yt_dlp.YoutubeDL(_yt_dlp_opts_base(extra, cookie_file)) as ydl:
+                    return call(ydl)
+        except cookie_jars.Rejected as e:
+            tried.add(e.jar)
+
+def _youtube_video_id(url):
+    """
+    Extract a YouTube 11-char video id from common URL shapes.
+    """
+    """
+    Extract a YouTube 11-char video id from common URL shapes.
+    """
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+
+    if host == "youtu.be":
+        vid = parsed.path.lstrip("/")
+        return vid if len(vid) == 11 else None
+    
+    if host in ("www.youtube.com", "youtube.com", "m.youtube.com"):
+        if parsed.path == "/watch":
+            q = parse_qs(parsed.query)
+            vid = (q.get("v") or [None])[0]
+            return vid if vid and len(vid) == 11 else None
+        if parsed.path.startswith(("/embed/", "/v/", "/shorts/")):
+            parts = parsed.path.split("/")
+            if len(parts) > 2 and len(parts[2]) == 11:
+                return parts[2]
+    return None
+
+def _video_meta(info):
+    """
+    The small, JSON-friendly subset of a yt-dlp info dict later stages use.
+    """
+    subtitles = info.get("subtitles") or {}
+    auto_captions = info.get("automatic_captions") or {}
+    return {
+        "id": info.get("id"),
+        "title": info.get("title") or "YouTube Video",
+        "duration": info.get("duration"),
+        "has_captions": bool(subtitles),
+        "has_auto_captions": bool(auto_captions),
+        "caption_languages": sorted(subtitles),
+        "audio_format": {
+            "format_id": info.get("format_id"),
+            "ext": info.get("ext"),
+            "abr": info.get("abr"),
+            "filesize": info.get("filesize") or info.get("filesize_approx"),
+        },
+    }
+
+def _meta_cache_key(vid):
+    return f"video-meta:{vid}"
+
+def _extract_video(link):
+    with metrics.span("video_probe"):
+        info = with_youtube({"skip_download": True}, lambda ydl: ydl.extract_info(link, download=False))
+    meta = _video_meta(info)
+    if meta["id"]:
+        # The full info (with resolved format URLs) lets download_audio skip
+        # a second extraction; it is process-local and short-lived.
+        _video_infos.set(meta["id"], (time.monotonic(), info))
+        cache.set(_meta_cache_key(meta["id"]), meta, settings.VIDEO_META_CACHE_TTL)
+    return meta
+
+def cached_video(vid):
+    """
+    Metadata from an earlier resolve_video() call, or None. Never hits the network.
+    """
+    return cache.get(_meta_cache_key(vid)) if vid else None
+
+def resolve_video(link):
+    """
+    One yt-dlp extraction for everything later stages need: id, title,
+    duration, caption availability and the audio format yt-dlp would pick.
+    Cached by video id; concurrent lookups of one video share the probe.
+    """
+    vid = _youtube_video_id(link)
+    if not vid:
+        return _extract_video(link)
+    meta = cached_video(vid)
+    metrics.cache_result("video_meta", meta is not None)
+    if meta:
+        return meta
+    return singleflight.do(f"video:{vid}", lambda: _extract_video(link))
+
+def _take_video_info(vid):
+    entry = _video_infos.pop(vid) if vid else None
+    if entry is None:
+        return None
+    resolved_at, info = entry
+    if time.monotonic() - resolved_at > settings.VIDEO_INFO_REUSE_SECONDS:
+        return None  # format URLs may have expired
+    return info
+
+def yt_title(link):
+    """
+    Fetch title via yt-dlp with cookie support. No download.
+    Uses the shared resolve_video() probe.
+    """
+    try:
+        return resolve_video(link)["title"]
+    except Exception:
+        return "YouTube Video"
+
+def _reusable_info(link):
+    """
+    resolve_video()'s full extraction for `link`, if it can still be used.
+    """
+    vid = _youtube_video_id(link)
+    info = _take_video_info(vid)
+    if info is None and vid and not cached_video(vid):
+        # Join (or run) the metadata probe so its extraction is reused
+        resolve_video(link)
+        info = _take_video_info(vid)
+    return info
+
+def _check_disk_space(info):
+    """
+    Refuse a download that would leave less than AUDIO_DISK_RESERVE_BYTES
+    free in the temp directory (or exceed AUDIO_MAX_BYTES).
+    """
+    expected = (info or {}).get("filesize") or (info or {}).get("filesize_approx") or 0
+    audio_stream.check_size(expected)
+    free = shutil.disk_usage(tempfile.gettempdir()).free
+    if free - expected < settings.AUDIO_DISK_RESERVE_BYTES:
+        raise audio_stream.AudioTooLarge("Not enough free disk space on the server to download the audio.")
+
+def _size_hook(progress):
+    # The size yt-dlp reported up front can be missing or wrong
+    audio_stream.check_size(progress.get("downloaded_bytes"))
+
+def download_audio(link: str, cancel=None) -> str:
+    """
+    Download best available audio as m4a/webm into a private temp directory
+    (so concurrent downloads of one video never share a file). Return file path.
+    Setting the optional `cancel` event aborts the download.
+    """
+    info = _reusable_info(link)
+    _check_disk_space(info)
+
+    workdir = tempfile.mkdtemp(prefix=AUDIO_TMP_PREFIX)
+    outtmpl = os.path.join(workdir, "%(id)s.%(ext)s")
+    hooks = [_size_hook] + ([_cancel_hook(cancel)] if cancel is not None else [])
+
+    def download(ydl):
+        if info is not None:
+            # Reuse resolve_video()'s extraction instead of probing again
+            return ydl.prepare_filename(ydl.process_ie_result(info, download=True))
+        return ydl.prepare_filename(ydl.extract_info(link, download=True))
+
+    try:
+        # A 429 with no cookie jar left trips the scheduler's breaker and raises CircuitOpen
+        with metrics.span("audio_download"):
+            # e.g., /tmp/ytaudio-xxxx/VIDEOID.m4a
+            file_path = with_youtube({"outtmpl": outtmpl, "progress_hooks": hooks}, download)
+        metrics.AUDIO_BYTES.inc(os.path.getsize(file_path), path="file")
+        return file_path
+    except Exception:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise
+
+ENGLISH_CAPTIONS = ("en", "en-US", "en-GB")
+
+def _pick_caption_track(transcripts):
+    """
+    Choose the best track from one transcript listing: manual English,
+    then auto-generated English, then any track YouTube can translate.
+    Returns (track, source) or (None, None).
+    """
+    tracks = list(transcripts)
+    for generated in (False, True):
+        for lang in ENGLISH_CAPTIONS:
+            for t in tracks:
+                if t.is_generated == generated and t.language_code == lang:
+                    return t, Source.CAPTIONS
+        for t in tracks:
+            if t.is_generated == generated and t.language_code.startswith("en"):
+                return t, Source.CAPTIONS
+    for t in tracks:
+        if t.is_translatable:
+            return t.translate("en"), Source.TRANSLATED
+    return None, None
+
+def get_transcript_via_captions(link: str):
+    """
+    Prefer captions (fast, avoids downloads). One listing call picks the
+    best English track, or translates another one to English.
+    Returns (text, source, language, segments) or None.
+    """
+    vid = _youtube_video_id(link)
+    if not vid:
+        return None
+
+    with metrics.span("captions"):
+        try:
+            available = youtube_transcript_api.YouTubeTranscriptApi().list(vid)
+            track, source = _pick_caption_track(available)
+            if track is None:
+                return None
+            snippets = track.fetch()
+            text = " ".join(c.text for c in snippets if c.text).strip()
+            if not text:
+                return None
+            return text, source, track.language_code, transcripts.caption_segments(snippets)
+        except (youtube_transcript_api.TranscriptsDisabled, youtube_transcript_api.NoTranscriptFound):
+            return None
+        except Exception as e:
+            # Falls through to the audio path, but keep count of why
+            metrics.ERRORS.inc(stage="captions", error=type(e).__name__)
+            return None
+
+def transcribe_via_assemblyai(audio_path: str, duration=None):
+    """
+    Send local audio file to AssemblyAI and return (text, timed segments).
+    Audio longer than TRANSCRIPT_SEGMENT_SECONDS (by `duration`, in seconds)
+    is transcribed in parallel windows (see long_audio.py).
+    Always cleans up the audio file after processing.
+    """
+    aai.settings.api_key = settings.ASSEMBLYAI_API_KEY
+    aai.settings.base_url = settings.ASSEMBLYAI_BASE_URL
+    config = aai.TranscriptionConfig(speech_model=aai.SpeechModel.best)
+    try:
+        with metrics.span("transcription", path="file"):
+            if long_audio.should_split(duration):
+                return long_audio.transcribe(aai.Transcriber().upload_file(audio_path), duration)
+            tr = aai.Transcriber(config=config).transcribe(audio_path)
+            if tr.status == "error":
+                raise RuntimeError(f"Transcription failed: {tr.error}")
+        return tr.text, transcripts.word_segments(tr.words)
+    finally:
+        # Clean up temp file (and the private directory download_audio made)
+        try:
+            if os.path.exists(audio_path):
+                os.remove(audio_path)
+            workdir = os.path.dirname(audio_path)
+            if os.path.basename(workdir).startswith(AUDIO_TMP_PREFIX):
+                shutil.rmtree(workdir, ignore_errors=True)
+        except Exception:
+            pass
+
+def _selected_format(link):
+    """
+    The info dict for `link` with the audio format chosen but not downloaded.
+    """
+    info = _reusable_info(link)
+    if info is not None:
+        return with_youtube({}, lambda ydl: ydl.process_ie_result(info, download=False))
+    return with_youtube({}, lambda ydl: ydl.extract_info(link, download=False))
+
+def transcribe_audio(link: str):
+    """
+    Audio → AssemblyAI, returning (text, timed segments). Streams the audio into the upload when the format
+    allows it (see audio_stream.py), otherwise goes through a temp file.
+    """
+    if settings.TRANSCRIPT_STREAM_AUDIO:
+        try:
+            return audio_stream.transcribe_stream(_selected_format(link))
+        except audio_stream.NotStreamable:
+            pass
+    return transcribe_via_assemblyai(download_audio(link), _duration(link))
+
+def _duration(link):
+    """
+    The video's length in seconds from resolve_video()'s metadata, or None.
+    """
+    return (cached_video(_youtube_video_id(link)) or {}).get("duration")
+
+def get_transcription(link: str):
+    """
+    Caption-first strategy, fallback to audio download + AssemblyAI.
+    Transcripts are cached by video id, so repeat videos skip all of it,
+    and concurrent requests for one video share a single fetch.
+    """
+    vid = _youtube_video_id(link)
+    cached = transcript_cache.get(vid)
+    metrics.cache_result("transcript", cached is not None)
+    if cached:
+        return cached.text
+    if not vid:
+        return _fetch_transcription(link, vid)
+    return singleflight.do(f"transcript:{vid}", lambda: _fetch_transcription(link, vid))
+
+def cached_transcript(link):
+    """
+    The transcript cache entry for `link`'s video, or None. No network.
+    """
+    return transcript_cache.get(_youtube_video_id(link))
+
+def _fetch_transcription(link, vid):
+    # A known captionless video goes straight to audio
+    meta = cached_video(vid)
+    no_captions = meta and not (meta["has_captions"] or meta["has_auto_captions"])
+    # While YouTube is rate-limiting us, don't queue downloads: captions only
+    captions_only = scheduler.youtube.is_open()
+    if no_captions and captions_only:
+        scheduler.youtube.check()
+
+    # Optionally start the audio download now, as a fallback that is thrown
+    # away if captions turn up
+    prefetch, cancel = None, threading.Event()
+    if settings.TRANSCRIPT_SPECULATIVE_AUDIO and not no_captions and not captions_only:
+        prefetch = _background.submit(_in_thread, download_audio, link, cancel)
+
+    # 1) Captions (no download, often works without cookies)
+    cap = None if no_captions else get_transcript_via_captions(link)
+    if cap:
+        if prefetch is not None:
+            cancel.set()
+            prefetch.add_done_callback(_discard_audio)
+        text, source, language, segments = cap
+    else:
+        # 2) Fallback: audio → AAI (English is AssemblyAI's default language)
+        if prefetch is not None:
+            text, segments = transcribe_via_assemblyai(prefetch.result(), _duration(link))
+        else:
+            scheduler.youtube.check()  # captions-only mode ends here
+            text, segments = transcribe_audio(link)
+        source, language = Source.ASSEMBLYAI, "en"
+
+    if vid and text:
+        transcript_cache.put(vid, text, source, language, segments)
+    return text
+
+def acquire_video(link, timings=None):
+    """
+    Title and transcript for `link`. The metadata probe runs alongside the
+    transcript lookup, so this takes about as long as the slower of the two.
+    Per-step durations (seconds) are added to `timings` if given.
+    """
+    timings = {} if timings is None else timings
+
+    def timed(name, fn):
+        started = time.perf_counter()
+        try:
+            return fn(link)
+        finally:
+            timings[name] = round(time.perf_counter() - started, 3)
+
+    title = _background.submit(_in_thread, timed, "title_probe", yt_title)
+    transcription = timed("transcript_fetch", get_transcription)
+    return title.result(), transcription
+
+def _in_thread(fn, *args):
+    """
+    Run fn in a pool thread and release that thread's DB connections after.
+    """
+    try:
+        return fn(*args)
+    finally:
+        connections.close_all()
+
+def _cancel_hook(cancel):
+    def hook(progress):
+        if cancel.is_set():
+            raise yt_dlp.utils.DownloadCancelled("Audio no longer needed")
+    return hook
+
+def _discard_audio(future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    shutil.rmtree(os.path.dirname(future.result()), ignore_errors=True)
+
+def _blog_prompt(transcription):
+    """
+    Final article prompt. Long transcripts are first condensed into notes
+    (see summarize.py) so the prompt fits the model's context window.
+    """
+    backend = llm.get_backend()
+    notes = summarize.condense(transcription, backend.complete, backend.model)
+    if notes is transcription:
+        return (
+            "Based on the following transcript from a YouTube video, write a comprehensive blog article. "
+            "Make it look like a proper blog post, not a transcript or a video summary.\n\n"
+            f"{transcription}"
+        )
+    return (
+        "Based on the following notes, taken in order from a long YouTube video, write a comprehensive "
+        "blog article. Make it look like a proper blog post, not a list of notes or a video summary.\n\n"
+        f"{notes}"
+    )
+
+def _count_tokens(prompt, output):
+    metrics.LLM_TOKENS.inc(summarize.estimate_tokens(prompt), purpose="article", direction="in")
+    metrics.LLM_TOKENS.inc(summarize.estimate_tokens(output), purpose="article", direction="out")
+
+def _cached_article(transcription, regenerate=False):
+    """
+    (cache key, cached article or None). `regenerate` skips the lookup; the
+    new article still replaces the cached one.
+    """
+    key = article_cache.make_key(transcription, ARTICLE_PROMPT_VERSION, llm.get_backend().model)
+    if regenerate:
+        return key, None
+    article = article_cache.get(key)
+    metrics.cache_result("article", article is not None)
+    return key, article
+
+def _store_article(key, article):
+    if article:
+        article_cache.put(key, llm.get_backend().model, article)
+
+def generate_blog_from_transcription(transcription, regenerate=False):
+    key, article = _cached_article(transcription, regenerate)
+    if article is not None:
+        return article
+    prompt = _blog_prompt(transcription)
+    with metrics.span("llm_generate"):
+        article = llm.get_backend().complete(prompt).strip()
+    _count_tokens(prompt, article)
+    _store_article(key, article)
+    return article
+
+def stream_blog_from_transcription(transcription, regenerate=False):
+    """
+    Like generate_blog_from_transcription, but yields the article's text
+    deltas as the model produces them. A cached article comes as one delta.
+    """
+    key, article = _cached_article(transcription, regenerate)
+    if article is not None:
+        yield article
+        return
+    prompt = _blog_prompt(transcription)
+    parts = []
+    with metrics.span("llm_generate"):
+        for delta in llm.get_backend().stream(prompt):
+            parts.append(delta)
+            yield delta
+    _count_tokens(prompt, "".join(parts))
+    _store_article(key, "".join(parts).strip())
+
+async def astream_blog_from_transcription(transcription, executor=None, regenerate=False):
+    """
+    Async twin of stream_blog_from_transcription using the backend's async
+    client. Prompt building (which may summarize chunks) runs on `executor`.
+    """
+    loop = asyncio.get_running_loop()
+    key, article = await sync_to_async(_cached_article)(transcription, regenerate)
+    if article is not None:
+        yield article
+        return
+    prompt = await loop.run_in_executor(executor, _in_thread, _blog_prompt, transcription)
+    parts = []
+    with metrics.span("llm_generate"):
+        async for delta in llm.get_backend().astream(prompt):
+            parts.append(delta)
+            yield delta
+    _count_tokens(prompt, "".join(parts))
+    await sync_to_async(_store_article)(key, "".join(parts).strip())
@@ -0,0 +1,72 @@
+"""
+Markdown to sanitized HTML for blog posts.
+
+Rendering is done once when a post is saved and stored on the row, along
+with the plain-text excerpt `blog_list` shows, so neither view renders
+Markdown per request. Bump RENDER_VERSION whenever the
+Markdown extensions or the allowed-tag policy change; posts rendered under an
+older version are re-rendered lazily on view, or in bulk with
+`python manage.py render_posts`.
+"""
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+from . import lazy
+
+bleach = lazy.module("bleach")
+markdown = lazy.module("markdown")
+
+# 2: posts also store an excerpt
+RENDER_VERSION = 2
+EXCERPT_CHARS = 160
+
+ALLOWED_TAGS = [
+    "p", "pre", "h1", "h2", "h3", "h4", "h5", "h6",
+    "ul", "ol", "li", "strong", "em", "code", "blockquote",
+    "hr", "br", "a",
+]
+ALLOWED_ATTRS = {"a": ["href", "title", "target", "rel"]}
+
+
+def render_markdown(text):
+    """
+    Convert Markdown to HTML that is safe to output with |safe.
+    """
+    html = markdown.markdown(text or "")
+    return bleach.clean(html, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRS, strip=True)
+
+
+def make_excerpt(html):
+    return Truncator(" ".join(strip_tags(html).split())).chars(EXCERPT_CHARS)
+
+
+def render_post(post):
+    """
+    Fill in the post's derived fields from generated_content (not saved).
+    """
+    post.rendered_html = render_markdown(post.generated_content)
+    post.excerpt = make_excerpt(post.rendered_html)
+    post.render_version = RENDER_VERSION
+
+
+RENDERED_FIELDS = ["rendered_html", "excerpt", "render_version"]
+
+
+def is_stale(post):
+    return post.render_version != RENDER_VERSION
+
+
+def ensure_rendered(post):
+    """
+    Return the post's sanitized HTML, re-rendering and storing it first if it
+    was rendered under an older RENDER_VERSION (or never, e.g. bulk_create).
+    """
+    if is_stale(post):
+        render_post(post)
+        # update() rather than save(): re-rendering is not a content edit, so
+        # modified_at must not move. Matching on modified_at keeps us from
+        # overwriting HTML a concurrent edit has just stored.
+        type(post).objects.filter(pk=post.pk, modified_at=post.modified_at).update(
+            **{field: getattr(post, field) for field in RENDERED_FIELDS}
+        )
+    return post.rendered_html
@@ -0,0 +1,262 @@
+"""
+Admission control for yt-dlp work against YouTube.
+
+Every extraction and download goes through `youtube.slot()`, which
+
+- caps concurrent yt-dlp operations in this process (YT_MAX_CONCURRENT),
+  and across all processes (YT_MAX_CONCURRENT_TOTAL) with leases kept in a
+  HostThrottle row. A lease expires after YT_SLOT_LEASE_SECONDS, so a
+  process that dies mid-download doesn't keep its slot,
+- takes a token from a request budget shared by all processes through a
+  HostThrottle row (YT_REQUESTS_PER_MINUTE, bursts of YT_REQUEST_BURST),
+- fails fast with CircuitOpen while the breaker is open. A 429 from YouTube
+  opens it for YT_BREAKER_COOLDOWN seconds in every process, so workers
+  back off together instead of each finding out on its own.
+
+While the breaker is open, transcript acquisition runs in captions-only
+mode (see pipeline._fetch_transcription). `youtube.metrics()` reports the
+breaker state and queue depth, which /metrics also exports.
+"""
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from . import lazy, metrics
+from .models import HostThrottle
+
+yt_dlp = lazy.module("yt_dlp")
+
+
+class CircuitOpen(RuntimeError):
+    """YouTube is rate-limiting this server; the message is user-safe."""
+
+
+# The HTTP status only: "429" also turns up in video ids, URLs and sizes
+_RATE_LIMITED = re.compile(r"HTTP Error 429\b|Too Many Requests", re.I)
+
+
+def is_rate_limited(exc):
+    return _RATE_LIMITED.search(str(exc)) is not None
+
+
+class HostScheduler:
+    # How long a breaker reading is trusted before the row is read again
+    BREAKER_CHECK_SECONDS = 1.0
+
+    def __init__(self, key):
+        self.key = key
+        self._slots = None
+        self._lock = threading.Lock()
+        self._breaker_checked_at = float("-inf")
+        self._breaker_open_until = None
+        self.counters = {
+            "queued": 0,
+            "in_flight": 0,
+            "granted_total": 0,
+            "rejected_total": 0,
+            "trips_total": 0,
+            "wait_seconds_total": 0.0,
+        }
+
+    def _count(self, name, delta=1):
+        with self._lock:
+            self.counters[name] += delta
+
+    def _semaphore(self):
+        with self._lock:
+            if self._slots is None:
+                self._slots = threading.BoundedSemaphore(settings.YT_MAX_CONCURRENT)
+            return self._slots
+
+    def _row(self):
+        row = HostThrottle.objects.filter(key=self.key).first()
+        if row is None:
+            row, _ = HostThrottle.objects.get_or_create(
+                key=self.key,
+                defaults={"tokens": settings.YT_REQUEST_BURST, "refilled_at": time.time()},
+            )
+        return row
+
+    # Circuit breaker -----------------------------------------------------------
+
+    def open_until(self):
+        """
+        When the breaker closes again, or None if it is closed.
+        """
+        now = time.monotonic()
+        if now - self._breaker_checked_at >= self.BREAKER_CHECK_SECONDS:
+            self._breaker_open_until = (
+                HostThrottle.objects.filter(key=self.key)
+                .values_list("breaker_open_until", flat=True)
+                .first()
+            )
+            self._breaker_checked_at = now
+        until = self._breaker_open_until
+        return until if until and until > timezone.now() else None
+
+    def is_open(self):
+        return self.open_until() is not None
+
+    def trip(self):
+        until = timezone.now() + timedelta(seconds=settings.YT_BREAKER_COOLDOWN)
+        self._row()
+        HostThrottle.objects.filter(key=self.key).update(
+            breaker_open_until=until, breaker_trips=F("breaker_trips") + 1
+        )
+        self._breaker_open_until, self._breaker_checked_at = until, time.monotonic()
+        self._count("trips_total")
+
+    def reset(self):
+        HostThrottle.objects.filter(key=self.key).update(breaker_open_until=None)
+        self._breaker_open_until, self._breaker_checked_at = None, float("-inf")
+
+    def check(self):
+        """
+        Raise CircuitOpen if the breaker is open.
+        """
+        until = self.open_until()
+        if until is not None:
+            self._count("rejected_total")
+            minutes = max(1, round((until - timezone.now()).total_seconds() / 60))
+            raise CircuitOpen(
+                "YouTube is rate-limiting this server. Only videos with captions can be "
+                f"processed right now; try again in about {minutes} minute(s)."
+            )
+
+    # Shared token bucket -------------------------------------------------------
+
+    def _reserve_token(self):
+        """
+        Take one token from the shared bucket; return how long to wait
+        before using it. The conditional UPDATE on `version` makes the
+        read-modify-write safe across processes.
+        """
+        rate = settings.YT_REQUESTS_PER_MINUTE / 60
+        if rate <= 0:
+            return 0.0
+        for _ in range(10):
+            row = self._row()
+            now = time.time()
+            tokens = min(settings.YT_REQUEST_BURST, row.tokens + (now - row.refilled_at) * rate) - 1
+            swapped = HostThrottle.objects.filter(key=self.key, version=row.version).update(
+                tokens=tokens, refilled_at=now, version=row.version + 1
+            )
+            if swapped:
+                return 0.0 if tokens >= 0 else -tokens / rate
+        return 1 / rate  # heavy contention: wait one interval rather than spin
+
+    # Shared concurrency leases ---------------------------------------------------
+
+    def _try_lease(self):
+        """
+        Take one of the YT_MAX_CONCURRENT_TOTAL slots shared by all
+        processes; return its id, or None if they are all taken.
+        """
+        lease = uuid.uuid4().hex
+        for _ in range(10):
+            row = self._row()
+            now = time.time()
+            leases = {key: until for key, until in row.leases.items() if until > now}
+            if len(leases) >= settings.YT_MAX_CONCURRENT_TOTAL:
+                return None
+            leases[lease] = now + settings.YT_SLOT_LEASE_SECONDS
+            if HostThrottle.objects.filter(key=self.key, version=row.version).update(
+                leases=leases, version=row.version + 1
+            ):
+                return lease
+        return None  # heavy contention: count it as full and wait
+
+    def _acquire_lease(self):
+        if settings.YT_MAX_CONCURRENT_TOTAL <= 0:
+            return None
+        delay = 0.05
+        while True:
+            lease = self._try_lease()
+            if lease is not None:
+                return lease
+            time.sleep(delay)
+            delay = min(2 * delay, 1.0)
+
+    def _release_lease(self, lease):
+        for _ in range(10):
+            row = self._row()
+            leases = dict(row.leases)
+            if leases.pop(lease, None) is None:
+                return
+            if HostThrottle.objects.filter(key=self.key, version=row.version).update(
+                leases=leases, version=row.version + 1
+            ):
+                return
+        # Still contended: the lease expires on its own
+
+    # Admission -----------------------------------------------------------------
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold one yt-dlp operation's worth of capacity. A 429 raised inside
+        trips the breaker and surfaces as CircuitOpen.
+        """
+        self.check()
+        slots = self._semaphore()
+        started = time.perf_counter()
+        self._count("queued")
+        try:
+            slots.acquire()
+        finally:
+            self._count("queued", -1)
+        lease = None
+        try:
+            lease = self._acquire_lease()
+            time.sleep(self._reserve_token())
+            self.check()  # it may have tripped while we queued
+            self._count("wait_seconds_total", time.perf_counter() - started)
+            self._count("granted_total")
+            self._count("in_flight")
+            try:
+                yield
+            except yt_dlp.utils.DownloadError as e:
+                if not is_rate_limited(e):
+                    raise
+                self.trip()
+                raise CircuitOpen(
+                    "YouTube rate-limited this server (HTTP 429). Try again later or use a video with captions."
+                ) from e
+            finally:
+                self._count("in_flight", -1)
+        finally:
+            if lease is not None:
+                self._release_lease(lease)
+            slots.release()
+
+    def metrics(self):
+        until = self.open_until()
+        with self._lock:
+            metrics = dict(self.counters)
+        metrics["wait_seconds_total"] = round(metrics["wait_seconds_total"], 3)
+        metrics["breaker_open"] = int(until is not None)
+        metrics["breaker_remaining_seconds"] = (
+            round((until - timezone.now()).total_seconds(), 1) if until else 0.0
+        )
+        return metrics
+
+
+youtube = HostScheduler("youtube")
+
+
+_GAUGES = {"queued", "in_flight", "breaker_open", "breaker_remaining_seconds"}
+
+
+@metrics.register_collector
+def _youtube_metrics():
+    return [
+        (f"blog_youtube_{name}", "gauge" if name in _GAUGES else "counter", f"yt-dlp scheduler {name}.", value)
+        for name, value in youtube.metrics().items()
+    ]
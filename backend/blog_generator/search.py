@@ -0,0 +1,190 @@
+"""
+Full-text search over blog posts.
+
+On SQLite the posts are mirrored into an FTS5 table (FTS_TABLE); on
+PostgreSQL the post row carries a weighted `search_vector` tsvector column
+with a GIN index. Both are created by migration 0007 and kept in sync by
+the save/delete signals in signals.py. Writes that skip signals
+(`bulk_create`, `QuerySet.update`) need a `rebuild()` afterwards.
+
+`search(user, q)` returns ranked posts, each with a `search_snippet` of
+escaped HTML in which matched terms are wrapped in <mark>. Other databases
+fall back to an icontains scan.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+
+from .listing import LIST_FIELDS
+from .models import BlogPost
+
+FTS_TABLE = "blog_generator_blogpost_fts"
+POST_TABLE = BlogPost._meta.db_table
+
+# Title matches count 10x body matches, in both engines.
+TITLE_WEIGHT = 10.0
+SNIPPET_WORDS = 24
+
+# Control characters can't occur in the stored text, so they are safe
+# highlight markers to put in before HTML-escaping the snippet.
+_MARK_START, _MARK_END = "\x02", "\x03"
+_MARKDOWN_NOISE = re.compile(r"[#*`]+")
+_TERM = re.compile(r"\w+")
+
+_PG_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(youtube_title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(generated_content, '')), 'B')"
+)
+
+
+def engine():
+    """
+    "sqlite", "postgresql", or None when only the icontains fallback exists.
+    """
+    return connection.vendor if connection.vendor in ("sqlite", "postgresql") else None
+
+
+def index_post(post):
+    if engine() == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, user_id, title, body) VALUES (%s, %s, %s, %s)",
+                [post.pk, post.user_id, post.youtube_title, post.generated_content],
+            )
+    elif engine() == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {POST_TABLE} SET search_vector = {_PG_VECTOR} WHERE id = %s", [post.pk])
+
+
+def unindex_post(pk):
+    # On PostgreSQL the vector goes away with the row itself.
+    if engine() == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [pk])
+
+
+def rebuild():
+    """
+    Re-index every post, e.g. after a bulk import.
+    """
+    with connection.cursor() as cursor:
+        if engine() == "sqlite":
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, user_id, title, body) "
+                f"SELECT id, user_id, youtube_title, generated_content FROM {POST_TABLE}"
+            )
+        elif engine() == "postgresql":
+            cursor.execute(f"UPDATE {POST_TABLE} SET search_vector = {_PG_VECTOR}")
+
+
+def _fts_query(q):
+    """
+    Turn free text into a safe FTS5 query: every word must match, and the
+    last one may be a prefix (search-as-you-type).
+    """
+    terms = _TERM.findall(q)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms) + "*"
+
+
+def highlight(snippet):
+    text = escape(_MARKDOWN_NOISE.sub("", snippet or ""))
+    return text.replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+
+class SearchResults:
+    """
+    Lazy, sliceable result list, so Paginator runs one COUNT and one ranked
+    page query instead of materializing every match.
+    """
+
+    def __init__(self, user, q):
+        self.user_id = user.pk
+        self.q = q
+        self._count = None
+
+    def _sql(self):
+        if engine() == "sqlite":
+            query = _fts_query(self.q)
+            where = f"{FTS_TABLE} MATCH %s AND user_id = %s"
+            rank = f"bm25({FTS_TABLE}, 0, {TITLE_WEIGHT}, 1.0)"
+            return (
+                f"SELECT count(*) FROM {FTS_TABLE} WHERE {where}",
+                f"SELECT rowid, -{rank}, "
+                f"snippet({FTS_TABLE}, 2, '{_MARK_START}', '{_MARK_END}', '…', {SNIPPET_WORDS}) "
+                f"FROM {FTS_TABLE} WHERE {where} ORDER BY {rank}, rowid DESC LIMIT %s OFFSET %s",
+                [query, self.user_id] if query else None,
+            )
+        query = "websearch_to_tsquery('english', %s)"
+        headline = (
+            f"StartSel={_MARK_START}, StopSel={_MARK_END}, "
+            f"MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}"
+        )
+        where = f"user_id = %s AND search_vector @@ {query}"
+        return (
+            f"SELECT count(*) FROM {POST_TABLE} WHERE {where}",
+            # ts_rank's weights are listed {D, C, B, A}; title is A, body B.
+            f"SELECT id, ts_rank('{{0, 0, {1 / TITLE_WEIGHT}, 1.0}}', search_vector, {query}), "
+            f"ts_headline('english', generated_content, {query}, '{headline}') "
+            f"FROM {POST_TABLE} WHERE {where} ORDER BY 2 DESC, id DESC LIMIT %s OFFSET %s",
+            [self.user_id, self.q],
+        )
+
+    def count(self):
+        if self._count is None:
+            count_sql, _, params = self._sql()
+            if params is None:
+                self._count = 0
+            else:
+                with connection.cursor() as cursor:
+                    cursor.execute(count_sql, params)
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        if stop is None:
+            stop = self.count()
+        _, page_sql, params = self._sql()
+        if params is None or stop <= start:
+            return []
+        with connection.cursor() as cursor:
+            if engine() == "sqlite":
+                cursor.execute(page_sql, [*params, stop - start, start])
+            else:
+                # the query text appears in the SELECT list and the WHERE clause
+                cursor.execute(page_sql, [self.q, self.q, *params, stop - start, start])
+            rows = cursor.fetchall()
+        posts = BlogPost.objects.only(*LIST_FIELDS).in_bulk([pk for pk, _, _ in rows])
+        results = []
+        for pk, rank, snippet in rows:
+            post = posts.get(pk)
+            if post is not None:  # deleted since the index was read
+                post.search_rank = rank
+                post.search_snippet = highlight(snippet)
+                results.append(post)
+        return results
+
+
+def search(user, q):
+    """
+    The user's posts matching `q`, best match first.
+    """
+    if engine() is None:
+        return (
+            BlogPost.objects.filter(user=user)
+            .only(*LIST_FIELDS)
+            .filter(Q(youtube_title__icontains=q) | Q(generated_content__icontains=q))
+            .order_by("-created_at")
+        )
+    return SearchResults(user, q)
@@ -0,0 +1,25 @@
+"""
+Keeps the full-text search index, the cached per-user post counts and the
+read views' cache markers in step with BlogPost writes.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import listing, page_cache, search
+from .models import BlogPost
+
+
+@receiver(post_save, sender=BlogPost)
+def index_blog_post(sender, instance, created=False, update_fields=None, **kwargs):
+    if created:
+        listing.forget_post_count(instance.user_id)
+    page_cache.forget(instance.user_id, instance.pk)
+    if update_fields is None or {"youtube_title", "generated_content"} & set(update_fields):
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=BlogPost)
+def unindex_blog_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+    listing.forget_post_count(instance.user_id)
+    page_cache.forget(instance.user_id, instance.pk)
@@ -0,0 +1,182 @@
+"""
+Single-flight execution: concurrent callers asking for the same key share
+one run of the work instead of each doing it.
+
+Threads in one process wait on an in-memory event. Across processes the
+leader holds a lease row in the Flight table and publishes its result
+there; followers poll the row and reuse the result. The result must be
+JSON-serializable. While the work runs, a side thread keeps renewing the
+leader's lease, so slow work (long audio, a slow upload) doesn't look
+abandoned to other processes. Workers prune old rows periodically (see
+jobs.requeue_stale_periodically).
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Flight
+
+logger = logging.getLogger(__name__)
+
+State = Flight.State
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+
+def _owner():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def do(key, fn):
+    """
+    Return fn() for `key`, running it at most once across all concurrent
+    callers. Followers get the leader's result, or its exception.
+    """
+    with _calls_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = _run_across_processes(key, fn)
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _calls_lock:
+            _calls.pop(key, None)
+        call.done.set()
+
+
+def _acquire(key, owner):
+    """
+    Take the lease for `key` if nobody holds a live one and there is no
+    fresh result to reuse.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.SINGLEFLIGHT_LEASE)
+    try:
+        with transaction.atomic():
+            Flight.objects.create(key=key, owner=owner, started_at=now, expires_at=expires_at)
+        return True
+    except IntegrityError:
+        pass
+
+    stale_result = now - timedelta(seconds=settings.SINGLEFLIGHT_RESULT_TTL)
+    taken = (
+        Flight.objects.filter(key=key)
+        .filter(
+            Q(state=State.FAILED)
+            | Q(state=State.RUNNING, expires_at__lt=now)
+            | Q(state=State.DONE, finished_at__lt=stale_result)
+        )
+        .update(
+            owner=owner,
+            state=State.RUNNING,
+            result=None,
+            started_at=now,
+            expires_at=expires_at,
+            finished_at=None,
+        )
+    )
+    return bool(taken)
+
+
+def _renew(key, owner):
+    Flight.objects.filter(key=key, owner=owner, state=State.RUNNING).update(
+        expires_at=timezone.now() + timedelta(seconds=settings.SINGLEFLIGHT_LEASE)
+    )
+
+
+@contextmanager
+def _renewing(key, owner):
+    """
+    Extend the lease by SINGLEFLIGHT_LEASE every third of a lease from a
+    side thread while the block runs (like jobs._heartbeat for jobs).
+    """
+    stop = threading.Event()
+
+    def renew():
+        try:
+            while not stop.wait(settings.SINGLEFLIGHT_LEASE / 3):
+                try:
+                    _renew(key, owner)
+                except Exception:
+                    logger.warning("Renewing the lease on %s failed", key, exc_info=True)
+        finally:
+            connections.close_all()  # this thread's connections only
+
+    thread = threading.Thread(target=renew, name=f"lease-{key}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _release(key, owner, state, result=None):
+    Flight.objects.filter(key=key, owner=owner).update(
+        state=state, result=result, finished_at=timezone.now()
+    )
+
+
+def _run_across_processes(key, fn):
+    owner = _owner()
+    deadline = time.monotonic() + settings.SINGLEFLIGHT_WAIT
+    while True:
+        if _acquire(key, owner):
+            try:
+                with _renewing(key, owner):
+                    result = fn()
+            except Exception:
+                _release(key, owner, State.FAILED)
+                raise
+            _release(key, owner, State.DONE, result)
+            return result
+
+        flight = Flight.objects.filter(key=key).only("state", "result").first()
+        if flight is not None and flight.state == State.DONE:
+            return flight.result
+
+        if time.monotonic() >= deadline:
+            # The leader is taking too long; don't keep the caller hostage.
+            return fn()
+        time.sleep(settings.SINGLEFLIGHT_POLL)
+
+
+def prune():
+    """
+    Delete finished flights whose results are too old to be reused.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.SINGLEFLIGHT_RESULT_TTL)
+    return Flight.objects.filter(
+        Q(finished_at__lt=cutoff) | Q(state=State.RUNNING, expires_at__lt=timezone.now())
+    ).delete()[0]
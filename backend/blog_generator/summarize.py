@@ -0,0 +1,120 @@
+"""
+Map-reduce condensing of long transcripts.
+
+A transcript that would not fit the model's context comfortably is split at
+sentence boundaries into chunks of about SUMMARY_CHUNK_TOKENS, the chunks
+are summarized concurrently (at most SUMMARY_MAX_PARALLEL at a time), and
+the joined notes replace the transcript in the final article prompt. Chunk
+summaries are cached by a hash of the chunk's text (with PROMPT_VERSION and
+the model), not its position, so re-runs and edits only pay for chunks whose
+text changed, even when chunks are added, removed or shifted.
+"""
+import hashlib
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+
+# Bump when the chunk prompt changes so old summaries are not reused
+# 2: the prompt no longer names the chunk's position
+PROMPT_VERSION = 2
+
+CHUNK_PROMPT = (
+    "The following is an excerpt of a YouTube video transcript. "
+    "Write detailed notes on it: keep every key fact, argument, example, name and number, "
+    "in the order they appear. Do not add an introduction or conclusion.\n\n{text}"
+)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate (~4 characters per token for English), good enough
+    for budgeting without shipping a tokenizer.
+    """
+    return math.ceil(len(text) / 4)
+
+
+def split_sentences(text):
+    return [s for s in _SENTENCE_END.split(text.strip()) if s]
+
+
+def _split_long(sentence, max_tokens):
+    # Auto captions often have no punctuation at all; fall back to words.
+    words, piece = sentence.split(), []
+    for word in words:
+        piece.append(word)
+        if estimate_tokens(" ".join(piece)) >= max_tokens:
+            yield " ".join(piece)
+            piece = []
+    if piece:
+        yield " ".join(piece)
+
+
+def chunk_transcript(text, max_tokens=None):
+    """
+    Pack whole sentences into chunks of at most `max_tokens` (estimated).
+    """
+    max_tokens = max_tokens or settings.SUMMARY_CHUNK_TOKENS
+    chunks, current, size = [], [], 0
+    for sentence in split_sentences(text):
+        pieces = [sentence] if estimate_tokens(sentence) <= max_tokens else _split_long(sentence, max_tokens)
+        for piece in pieces:
+            tokens = estimate_tokens(piece) + 1
+            if current and size + tokens > max_tokens:
+                chunks.append(" ".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _cache_key(text, model):
+    digest = hashlib.sha256(text.encode()).hexdigest()
+    return f"chunk-summary:{PROMPT_VERSION}:{model}:{digest}"
+
+
+def summarize_chunk(complete, text, model):
+    """
+    Summarize one chunk with `complete(prompt) -> str`, through the cache.
+    """
+    prompt = CHUNK_PROMPT.format(text=text)
+    key = _cache_key(text, model)
+    summary = cache.get(key)
+    metrics.cache_result("chunk_summary", summary is not None)
+    if summary is None:
+        with metrics.span("llm_summarize"):
+            summary = complete(prompt).strip()
+        metrics.LLM_TOKENS.inc(estimate_tokens(prompt), purpose="summary", direction="in")
+        metrics.LLM_TOKENS.inc(estimate_tokens(summary), purpose="summary", direction="out")
+        cache.set(key, summary, settings.SUMMARY_CACHE_TTL)
+    return summary
+
+
+def condense(text, complete, model):
+    """
+    Return `text` unchanged if it fits SUMMARY_DIRECT_MAX_TOKENS, otherwise
+    notes produced by summarizing its chunks in parallel. Repeats on the
+    notes until they fit, for at most SUMMARY_MAX_ROUNDS rounds, and stops
+    early when a round didn't make the notes any shorter.
+    """
+    for _ in range(settings.SUMMARY_MAX_ROUNDS):
+        if estimate_tokens(text) <= settings.SUMMARY_DIRECT_MAX_TOKENS:
+            break
+        chunks = chunk_transcript(text)
+        if len(chunks) < 2:
+            break  # summarizing one chunk cannot shrink it further usefully
+        with ThreadPoolExecutor(max_workers=settings.SUMMARY_MAX_PARALLEL) as pool:
+            summaries = list(pool.map(lambda chunk: summarize_chunk(complete, chunk, model), chunks))
+        notes = "\n\n".join(summaries)
+        if estimate_tokens(notes) >= estimate_tokens(text):
+            break  # the model isn't condensing; more rounds would only cost calls
+        text = notes
+    return text
@@ -1,3 +1,1398 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+import assemblyai as aai
+from asgiref.sync import async_to_sync
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ai_blog_app import database
+
+from . import article_cache, audio_stream, auth, batch, cookie_jars, benchmarks, jobs, lazy, listing, llm, long_audio, metrics, pipeline, rendering, scheduler, search, singleflight, summarize, transcript_cache, transcripts
+from .fakes import FakeAsyncGroq, FakeGroq, FakeTranscriptApi, FakeTranscriptionServer, FakeYoutubeDL, spoken_words
+from .models import (
+    ArticleCacheEntry, BlogPost, Flight, GenerationJob, HostThrottle, PostTranscript, TranscriptCacheEntry,
+)
 
 # Create your tests here.
+
+
+def fake_groq(**attrs):
+    """
+    A GroqBackend talking to the local fake Groq clients, without rate limiting.
+    """
+    return llm.GroqBackend(
+        "fake-model",
+        client=FakeGroq.configured(**attrs)(),
+        async_client=FakeAsyncGroq.configured(**attrs)(),
+        rate_per_minute=0,
+    )
+
+
+def read_events(response, limit=None):
+    """
+    Collect chunks of a (sync or async) streaming response from sync test code.
+    """
+    if not response.is_async:
+        chunks = []
+        for chunk in response.streaming_content:
+            chunks.append(chunk.decode())
+            if limit and len(chunks) >= limit:
+                break
+        return chunks
+
+    async def collect():
+        chunks = []
+        async for chunk in response.streaming_content:
+            chunks.append(chunk.decode())
+            if limit and len(chunks) >= limit:
+                break
+        return chunks
+
+    return async_to_sync(collect)()
+
+
+class GenerationJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alex", password="pw-12345")
+        self.client.force_login(self.user)
+
+    def test_generate_blog_enqueues_job(self):
+        response = self.client.post(
+            reverse("generate-blog"),
+            data=json.dumps({"link": "https://youtu.be/dQw4w9WgXcQ"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 202)
+        job = GenerationJob.objects.get(pk=response.json()["job_id"])
+        self.assertEqual(job.state, GenerationJob.State.QUEUED)
+        self.assertEqual(job.user, self.user)
+
+    def test_generate_blog_requires_login(self):
+        self.client.logout()
+        response = self.client.post(
+            reverse("generate-blog"),
+            data=json.dumps({"link": "https://youtu.be/dQw4w9WgXcQ"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 401)
+
+    @mock.patch.object(llm, "_backend", fake_groq(reply="# Article"))
+    @mock.patch("blog_generator.pipeline.get_transcription", return_value="hello world")
+    @mock.patch("blog_generator.pipeline.yt_title", return_value="A video")
+    def test_worker_runs_job_to_completion(self, *_):
+        job = jobs.enqueue(self.user, "https://youtu.be/dQw4w9WgXcQ")
+        jobs.work("test-worker", once=True)
+
+        job.refresh_from_db()
+        self.assertEqual(job.state, GenerationJob.State.SUCCEEDED)
+        self.assertEqual(job.stage, GenerationJob.Stage.DONE)
+        self.assertEqual(
+            set(job.timings),
+            {"title_probe", "transcript_fetch", "transcript", "generate", "save"},
+        )
+        self.assertEqual(job.blog_post.generated_content, "# Article")
+
+        status = self.client.get(reverse("generation-status", args=[job.pk])).json()
+        self.assertEqual(status["content"], "# Article")
+
+    @mock.patch("blog_generator.pipeline.get_transcription", return_value=None)
+    @mock.patch("blog_generator.pipeline.yt_title", return_value="A video")
+    def test_failed_job_records_error(self, *_):
+        job = jobs.enqueue(self.user, "https://youtu.be/dQw4w9WgXcQ")
+        jobs.run_job(jobs.claim_next("test-worker"))
+
+        job.refresh_from_db()
+        self.assertEqual(job.state, GenerationJob.State.FAILED)
+        self.assertIn("Failed to get transcript", job.error)
+        self.assertFalse(BlogPost.objects.exists())
+
+    @override_settings(BLOG_JOB_HEARTBEAT_SECONDS=0.02)
+    @mock.patch.object(llm, "_backend", fake_groq(reply="# Article"))
+    def test_heartbeat_is_refreshed_during_a_long_stage(self):
+        job = jobs.enqueue(self.user, "https://youtu.be/dQw4w9WgXcQ")
+
+        def slow_acquire(link, timings=None):
+            time.sleep(0.2)
+            return "A video", "hello world"
+
+        # The heartbeat thread's own writes are checked by test_touch_only_while_owned
+        with mock.patch.object(pipeline, "acquire_video", slow_acquire), mock.patch.object(jobs, "_touch") as touch:
+            jobs.work("test-worker", once=True)
+        self.assertGreaterEqual(touch.call_count, 3)
+        job.refresh_from_db()
+        self.assertEqual(job.state, GenerationJob.State.SUCCEEDED)
+
+    def test_touch_only_while_owned(self):
+        jobs.enqueue(self.user, "https://youtu.be/dQw4w9WgXcQ")
+        job = jobs.claim_next("a")
+        old = timezone.now() - timedelta(hours=1)
+        GenerationJob.objects.filter(pk=job.pk).update(heartbeat_at=old)
+        jobs._touch(job)
+        job.refresh_from_db()
+        self.assertGreater(job.heartbeat_at, old)
+
+        GenerationJob.objects.filter(pk=job.pk).update(worker="b", heartbeat_at=old)
+        jobs._touch(job)
+        job.refresh_from_db()
+        self.assertEqual(job.heartbeat_at, old)
+
+    @override_settings(BLOG_JOB_STALE_SECONDS=60)
+    def test_late_outcome_of_a_taken_over_job_is_dropped(self):
+        jobs.enqueue(self.user, "https://youtu.be/dQw4w9WgXcQ")
+        first = jobs.claim_next("w")
+        GenerationJob.objects.filter(pk=first.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        jobs.requeue_stale()
+        second = jobs.claim_next("w")  # same worker name, next attempt
+
+        jobs._finish(second, GenerationJob.State.SUCCEEDED)
+        jobs._finish(first, GenerationJob.State.FAILED, "Unexpected server error")
+        job = GenerationJob.objects.get(pk=first.pk)
+        self.assertEqual((job.state, job.error), (GenerationJob.State.SUCCEEDED, ""))
+
+    @mock.patch.object(llm, "_backend", fake_groq(reply="# Article"))
+    @mock.patch("blog_generator.pipeline.acquire_video", return_value=("A video", "hello world"))
+    def test_worker_loop_recovers_stale_jobs(self, *_):
+        jobs.enqueue(self.user, "https://youtu.be/dQw4w9WgXcQ")
+        job = jobs.claim_next("dead-worker")
+        GenerationJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+
+        with mock.patch.object(jobs, "_requeued_at", float("-inf")):
+            jobs.work("live-worker", once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.state, job.worker, job.attempts), (GenerationJob.State.SUCCEEDED, "live-worker", 2))
+
+    def test_claim_is_exclusive(self):
+        jobs.enqueue(self.user, "https://youtu.be/dQw4w9WgXcQ")
+        self.assertIsNotNone(jobs.claim_next("a"))
+        self.assertIsNone(jobs.claim_next("b"))
+
+    @override_settings(BLOG_JOB_EVENTS_POLL=0)
+    @mock.patch.object(llm, "_backend", fake_groq(reply="# Article"))
+    @mock.patch("blog_generator.pipeline.get_transcription", return_value="hello world")
+    @mock.patch("blog_generator.pipeline.yt_title", return_value="A video")
+    def test_events_stream_ends_with_finished_job(self, *_):
+        job = jobs.enqueue(self.user, "https://youtu.be/dQw4w9WgXcQ")
+        jobs.work("test-worker", once=True)
+
+        response = self.client.get(reverse("generation-events", args=[job.pk]))
+        body = "".join(read_events(response))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertIn('"state": "succeeded"', body)
+
+    @override_settings(BLOG_STREAM_FLUSH_SECONDS=0)
+    @mock.patch("blog_generator.pipeline.get_transcription", return_value="hello world")
+    @mock.patch("blog_generator.pipeline.yt_title", return_value="A video")
+    def test_streamed_text_is_flushed_to_job(self, *_):
+        job = jobs.enqueue(self.user, "https://youtu.be/dQw4w9WgXcQ")
+        seen = []
+
+        def deltas(transcription, regenerate=False):
+            for token in ("# Stream", "ed ", "article"):
+                yield token
+                seen.append(GenerationJob.objects.get(pk=job.pk).partial_content)
+
+        with mock.patch.object(pipeline, "stream_blog_from_transcription", deltas):
+            jobs.work("test-worker", once=True)
+
+        job.refresh_from_db()
+        self.assertEqual(seen, ["# Stream", "# Streamed ", "# Streamed article"])
+        self.assertEqual(job.blog_post.generated_content, "# Streamed article")
+        self.assertEqual(job.partial_content, "")
+
+    def test_events_stream_forwards_deltas(self):
+        job = jobs.enqueue(self.user, "https://youtu.be/dQw4w9WgXcQ")
+        GenerationJob.objects.filter(pk=job.pk).update(
+            state=GenerationJob.State.RUNNING,
+            stage=GenerationJob.Stage.GENERATE,
+            partial_content="# Hello",
+        )
+
+        response = self.client.get(reverse("generation-events", args=[job.pk]))
+        first = read_events(response, limit=1)[0]
+        self.assertEqual(first, 'event: delta\ndata: {"text": "# Hello"}\n\n')
+
+    @override_settings(BLOG_JOB_EVENTS_POLL=0, BLOG_JOB_EVENTS_WSGI_TIMEOUT=0)
+    def test_events_stream_is_sync_under_wsgi_and_async_under_asgi(self):
+        job = jobs.enqueue(self.user, "https://youtu.be/dQw4w9WgXcQ")
+
+        # WSGI: frames go out as they are produced, and the stream ends early
+        response = self.client.get(reverse("generation-events", args=[job.pk]))
+        self.assertFalse(response.is_async)
+        self.assertEqual(read_events(response), ["event: timeout\ndata: {}\n\n"])
+
+        self.async_client.force_login(self.user)
+        response = async_to_sync(self.async_client.get)(reverse("generation-events", args=[job.pk]))
+        self.assertTrue(response.is_async)
+        self.assertIn('"state": "queued"', read_events(response, limit=1)[0])
+
+    @mock.patch.object(llm, "_backend", fake_groq(reply="# Async", latency=0.2))
+    @mock.patch("blog_generator.pipeline.acquire_video", return_value=("A video", "hello world"))
+    def test_async_worker_overlaps_jobs(self, *_):
+        for _ in range(3):
+            jobs.enqueue(self.user, "https://youtu.be/dQw4w9WgXcQ")
+
+        started = time.perf_counter()
+        async_to_sync(jobs.awork)("async-worker", concurrency=3, executor_threads=1, once=True)
+        elapsed = time.perf_counter() - started
+
+        self.assertLess(elapsed, 0.55)  # three 0.2s LLM calls in flight together
+        self.assertEqual(
+            list(GenerationJob.objects.values_list("state", flat=True)),
+            [GenerationJob.State.SUCCEEDED] * 3,
+        )
+        self.assertEqual(
+            set(BlogPost.objects.values_list("generated_content", flat=True)), {"# Async"}
+        )
+
+    def test_fake_groq_stream_matches_full_reply(self):
+        with mock.patch.object(llm, "_backend", fake_groq()):
+            streamed = "".join(pipeline.stream_blog_from_transcription("transcript"))
+            full = pipeline.generate_blog_from_transcription("transcript")
+        self.assertEqual(streamed.strip(), full)
+
+
+class TranscriptCacheTests(TestCase):
+    link = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+    def setUp(self):
+        transcript_cache.clear_memory()
+
+    @mock.patch("blog_generator.pipeline.download_audio")
+    @mock.patch(
+        "blog_generator.pipeline.get_transcript_via_captions",
+        return_value=("never gonna give you up", transcript_cache.Source.CAPTIONS, "en", []),
+    )
+    def test_repeat_video_skips_network(self, captions, download):
+        self.assertEqual(pipeline.get_transcription(self.link), "never gonna give you up")
+        transcript_cache.clear_memory()  # force the DB tier
+        self.assertEqual(pipeline.get_transcription(self.link), "never gonna give you up")
+
+        self.assertEqual(captions.call_count, 1)
+        download.assert_not_called()
+        entry = TranscriptCacheEntry.objects.get(video_id="dQw4w9WgXcQ")
+        self.assertEqual((entry.source, entry.language), ("captions", "en"))
+
+    @override_settings(TRANSCRIPT_CACHE_TTL=60)
+    def test_expired_entries_are_ignored(self):
+        transcript_cache.put("dQw4w9WgXcQ", "old", transcript_cache.Source.CAPTIONS)
+        TranscriptCacheEntry.objects.update(fetched_at=timezone.now() - timedelta(minutes=5))
+        transcript_cache.clear_memory()
+        self.assertIsNone(transcript_cache.get("dQw4w9WgXcQ"))
+
+    @override_settings(TRANSCRIPT_CACHE_MAX_ENTRIES=2)
+    def test_size_limit_evicts_least_recently_used(self):
+        for vid in ("aaaaaaaaaaa", "bbbbbbbbbbb"):
+            transcript_cache.put(vid, vid, transcript_cache.Source.CAPTIONS)
+        TranscriptCacheEntry.objects.filter(video_id="bbbbbbbbbbb").update(
+            last_used_at=timezone.now() - timedelta(hours=1)
+        )
+        transcript_cache.put("ccccccccccc", "c", transcript_cache.Source.ASSEMBLYAI)
+        self.assertEqual(
+            set(TranscriptCacheEntry.objects.values_list("video_id", flat=True)),
+            {"aaaaaaaaaaa", "ccccccccccc"},
+        )
+
+
+class SingleFlightTests(TestCase):
+    def test_followers_in_process_share_one_run(self):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow(key, fn):
+            calls.append(key)
+            started.set()
+            release.wait(5)
+            return fn()
+
+        results = []
+        with mock.patch.object(singleflight, "_run_across_processes", side_effect=slow):
+            threads = [
+                threading.Thread(target=lambda: results.append(singleflight.do("k", lambda: "shared")))
+                for _ in range(5)
+            ]
+            threads[0].start()
+            started.wait(5)  # leader is inside the work
+            for t in threads[1:]:
+                t.start()
+            time.sleep(0.2)  # let the followers block on the leader
+            release.set()
+            for t in threads:
+                t.join()
+
+        self.assertEqual(calls, ["k"])
+        self.assertEqual(results, ["shared"] * 5)
+
+    def test_follower_reuses_result_published_by_another_process(self):
+        Flight.objects.create(
+            key="title:dQw4w9WgXcQ",
+            owner="other-host:1",
+            state=Flight.State.DONE,
+            result="Leader's title",
+            expires_at=timezone.now() + timedelta(minutes=5),
+            finished_at=timezone.now(),
+        )
+        fn = mock.Mock(return_value="mine")
+        self.assertEqual(singleflight.do("title:dQw4w9WgXcQ", fn), "Leader's title")
+        fn.assert_not_called()
+
+    def test_expired_lease_is_taken_over(self):
+        Flight.objects.create(
+            key="transcript:dQw4w9WgXcQ",
+            owner="dead-host:1",
+            expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertEqual(singleflight.do("transcript:dQw4w9WgXcQ", lambda: "fresh"), "fresh")
+        flight = Flight.objects.get(key="transcript:dQw4w9WgXcQ")
+        self.assertEqual((flight.state, flight.result), (Flight.State.DONE, "fresh"))
+
+
+class SingleFlightLeaseTests(TransactionTestCase):
+    """The lease is renewed from a side thread, so these tests commit."""
+
+    @override_settings(SINGLEFLIGHT_LEASE=0.3)
+    def test_leader_keeps_its_lease_while_it_works(self):
+        def slow():
+            time.sleep(0.6)  # twice the lease
+            flight = Flight.objects.get(key="transcript:dQw4w9WgXcQ")
+            self.assertGreater(flight.expires_at, timezone.now())
+            self.assertFalse(singleflight._acquire("transcript:dQw4w9WgXcQ", "other-host:1"))
+            return "mine"
+
+        self.assertEqual(singleflight.do("transcript:dQw4w9WgXcQ", slow), "mine")
+
+    def test_workers_prune_old_flights_periodically(self):
+        long_ago = timezone.now() - timedelta(days=1)
+        Flight.objects.create(
+            key="video:dQw4w9WgXcQ", owner="old-host:1", state=Flight.State.DONE,
+            expires_at=long_ago, finished_at=long_ago,
+        )
+        with mock.patch.object(jobs, "_requeued_at", float("-inf")):
+            jobs.requeue_stale_periodically()
+        self.assertFalse(Flight.objects.exists())
+
+
+class ResolveVideoTests(TestCase):
+    link = "https://youtu.be/dQw4w9WgXcQ"
+
+    def setUp(self):
+        cache.clear()
+        pipeline._video_infos.clear()
+        self.ydl = FakeYoutubeDL.configured()
+        patcher = mock.patch("yt_dlp.YoutubeDL", self.ydl)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_title_and_download_share_one_extraction(self):
+        self.assertEqual(pipeline.yt_title(self.link), "Video dQw4w9WgXcQ")
+        path = pipeline.download_audio(self.link)
+        self.addCleanup(shutil.rmtree, os.path.dirname(path), True)
+
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(self.ydl.calls["extract_info"], 1)
+        self.assertEqual(self.ydl.calls["download"], 1)
+
+    def test_metadata_is_cached_by_video_id(self):
+        meta = pipeline.resolve_video(self.link)
+        pipeline.resolve_video("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+        self.assertEqual(self.ydl.calls["extract_info"], 1)
+        self.assertEqual(meta["audio_format"]["ext"], "m4a")
+        self.assertTrue(meta["has_captions"])
+
+
+class TranscriptAcquisitionTests(TestCase):
+    link = "https://youtu.be/dQw4w9WgXcQ"
+
+    def captions_with(self, tracks):
+        api = FakeTranscriptApi.configured(tracks=tracks, words=3)
+        with mock.patch.object(pipeline.youtube_transcript_api, "YouTubeTranscriptApi", api):
+            return pipeline.get_transcript_via_captions(self.link), api
+
+    def test_one_listing_picks_english_track(self):
+        (text, source, language, segments), api = self.captions_with((("de", False), ("en", True)))
+        self.assertEqual((source, language), (transcript_cache.Source.CAPTIONS, "en"))
+        self.assertTrue(text.startswith("word0 in en."))
+        self.assertEqual(segments[1], [0.5, 1.0, "word1 in en."])
+        self.assertEqual((api.calls["list"], api.calls["fetch"]), (1, 1))
+
+    def test_non_english_track_is_translated(self):
+        (_, source, language, _), _ = self.captions_with((("de", False),))
+        self.assertEqual((source, language), (transcript_cache.Source.TRANSLATED, "en"))
+
+    def test_captions_disabled(self):
+        self.assertIsNone(self.captions_with(())[0])
+
+    def test_probe_runs_alongside_transcript(self):
+        def slow(value):
+            def fn(link):
+                time.sleep(0.2)
+                return value
+            return fn
+
+        timings = {}
+        with mock.patch.object(pipeline, "yt_title", slow("Title")), mock.patch.object(
+            pipeline, "get_transcription", slow("text")
+        ):
+            started = time.perf_counter()
+            result = pipeline.acquire_video(self.link, timings)
+            elapsed = time.perf_counter() - started
+
+        self.assertEqual(result, ("Title", "text"))
+        self.assertLess(elapsed, 0.35)
+        self.assertEqual(set(timings), {"title_probe", "transcript_fetch"})
+
+
+@override_settings(ASSEMBLYAI_API_KEY="test", AUDIO_STREAM_CHUNK_BYTES=256 * 1024, AUDIO_STREAM_BUFFER_CHUNKS=2)
+class AudioStreamTests(TestCase):
+    link = "https://youtu.be/dQw4w9WgXcQ"
+
+    def setUp(self):
+        cache.clear()
+        pipeline._video_infos.clear()
+
+    def transcribe(self, server, **ydl_attrs):
+        ydl = FakeYoutubeDL.configured(media_url=server.media_url, audio_bytes=server.audio_bytes, **ydl_attrs)
+        with override_settings(ASSEMBLYAI_BASE_URL=server.base_url), mock.patch.object(
+            pipeline.yt_dlp, "YoutubeDL", ydl
+        ):
+            return pipeline.transcribe_audio(self.link)[0], ydl
+
+    def test_audio_is_piped_into_the_upload(self):
+        with FakeTranscriptionServer(
+            audio_bytes=2 << 20, media_seconds_per_mib=0.1, upload_seconds_per_mib=0.1
+        ) as server:
+            text, ydl = self.transcribe(server)
+
+        self.assertEqual(text, server.text)
+        self.assertEqual(list(server.uploads.values()), [2 << 20])
+        self.assertEqual(ydl.calls["download"], 0)  # nothing written to disk
+        first_upload = min(t for t, event in server.log if event == "upload")
+        last_media = max(t for t, event in server.log if event == "media")
+        self.assertLess(first_upload, last_media)  # download and upload overlapped
+
+    def test_pipe_holds_a_bounded_number_of_chunks(self):
+        produced, buffered = [], []
+
+        def source():
+            for i in range(20):
+                produced.append(i)
+                yield b"x"
+
+        consumed = 0
+        for _ in audio_stream.ChunkPipe(source(), maxsize=2):
+            time.sleep(0.01)
+            consumed += 1
+            buffered.append(len(produced) - consumed)
+        self.assertEqual(consumed, 20)
+        self.assertLessEqual(max(buffered), 3)  # queue + the one being put
+
+    @override_settings(AUDIO_MAX_BYTES=1 << 20)
+    def test_oversized_audio_is_refused(self):
+        with FakeTranscriptionServer(audio_bytes=2 << 20) as server:
+            with self.assertRaises(audio_stream.AudioTooLarge):
+                self.transcribe(server)
+            self.assertEqual(server.uploads, {})
+
+    @override_settings(TRANSCRIPT_STREAM_AUDIO=False, AUDIO_DISK_RESERVE_BYTES=1 << 60)
+    def test_download_refused_without_disk_space(self):
+        with FakeTranscriptionServer() as server, mock.patch.object(pipeline.tempfile, "mkdtemp") as mkdtemp:
+            with self.assertRaises(audio_stream.AudioTooLarge):
+                self.transcribe(server)
+        mkdtemp.assert_not_called()
+
+
+class StartupTests(TestCase):
+    def test_web_worker_boots_without_the_generation_stack(self):
+        profile = benchmarks.startup_profile("lazy")
+        self.assertEqual(profile["heavy"], [])
+        self.assertNotIn("yt_dlp", profile["slowest_imports_ms"])
+
+    def test_lazy_module_imports_on_first_use_and_can_be_patched(self):
+        loaded = mock.Mock(return_value=json)
+        with mock.patch.object(lazy.importlib, "import_module", loaded):
+            module = lazy.module("json")
+            loaded.assert_not_called()
+            self.assertIs(module.dumps, json.dumps)
+        loaded.assert_called_once_with("json")
+        with mock.patch.object(rendering.markdown, "markdown", return_value="<p>patched</p>"):
+            self.assertEqual(rendering.render_markdown("# x"), "<p>patched</p>")
+
+
+@override_settings(
+    ASSEMBLYAI_API_KEY="test", TRANSCRIPT_SEGMENT_SECONDS=600, TRANSCRIPT_SEGMENT_OVERLAP=15,
+    TRANSCRIPT_SEGMENT_PARALLELISM=3,
+)
+class LongAudioTests(TestCase):
+    link = "https://youtu.be/dQw4w9WgXcQ"
+
+    def setUp(self):
+        cache.clear()
+        pipeline._video_infos.clear()
+
+    def test_plan_caps_an_overlap_as_long_as_the_window(self):
+        # An overlap >= the window would never move the next window forward
+        self.assertEqual(long_audio.plan(25000, 10000, 10000), [(0, 10000), (5000, 15000), (10000, 20000), (15000, 25000)])
+        self.assertEqual(long_audio.plan(3, 1, 5), [(0, 1), (1, 2), (2, 3)])
+
+    def test_windows_run_in_parallel_and_stitch_without_duplicates(self):
+        self.assertEqual(long_audio.plan(25000, 10000, 2000), [(0, 10000), (8000, 18000), (16000, 25000)])
+        running, peak, lock = [0], [0], threading.Lock()
+
+        def window(url, start_ms, end_ms):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return [long_audio.Word(w["text"], w["start"], w["end"]) for w in spoken_words(3000, start_ms, end_ms)]
+
+        text, segments = long_audio.transcribe("upload", 3000, window=window)
+        self.assertEqual(text, " ".join(f"w{i}" for i in range(3000)))
+        self.assertEqual(peak[0], 3)
+        self.assertEqual(segments[70][:2], [2800.0, 2839.6])  # timestamps survive the stitch
+
+    def test_long_stream_is_uploaded_once_and_transcribed_in_windows(self):
+        with FakeTranscriptionServer(speech_seconds=1500, transcript_seconds=0.3) as server, mock.patch.object(
+            aai.settings, "polling_interval", 0.05
+        ):
+            ydl = FakeYoutubeDL.configured(media_url=server.media_url, audio_bytes=server.audio_bytes, duration=1500)
+            with override_settings(ASSEMBLYAI_BASE_URL=server.base_url), mock.patch.object(
+                pipeline.yt_dlp, "YoutubeDL", ydl
+            ):
+                text, _ = pipeline.transcribe_audio(self.link)
+
+        self.assertEqual(text, " ".join(f"w{i}" for i in range(1500)))
+        self.assertEqual(len(server.uploads), 1)
+        windows = sorted((r["audio_start_from"], r["audio_end_at"]) for r, _ in server.jobs.values())
+        self.assertEqual(windows, [(0, 600000), (585000, 1185000), (1170000, 1500000)])
+        submitted = [t for _, t in server.jobs.values()]
+        self.assertLess(max(submitted) - min(submitted), 0.3)  # all submitted before the first finished
+
+
+@override_settings(YT_REQUESTS_PER_MINUTE=0, YT_MAX_CONCURRENT=2, YT_BREAKER_COOLDOWN=60)
+class SchedulerTests(TestCase):
+    link = "https://youtu.be/dQw4w9WgXcQ"
+
+    def setUp(self):
+        cache.clear()
+        pipeline._video_infos.clear()
+        self.gate = scheduler.HostScheduler("youtube")
+        patcher = mock.patch.object(scheduler, "youtube", self.gate)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_429_opens_breaker_and_later_calls_fail_fast(self):
+        import yt_dlp
+
+        class RateLimited(FakeYoutubeDL):
+            def extract_info(self, url, download=True, process=True):
+                self._count("extract_info")
+                raise yt_dlp.utils.DownloadError("HTTP Error 429: Too Many Requests")
+
+        ydl = RateLimited.configured()
+        with mock.patch.object(pipeline.yt_dlp, "YoutubeDL", ydl):
+            with self.assertRaises(scheduler.CircuitOpen):
+                pipeline.resolve_video(self.link)
+            with self.assertRaises(scheduler.CircuitOpen):
+                pipeline.resolve_video("https://youtu.be/aaaaaaaaaaa")
+        self.assertEqual(ydl.calls["extract_info"], 1)
+        metrics = self.gate.metrics()
+        self.assertEqual((metrics["breaker_open"], metrics["trips_total"], metrics["rejected_total"]), (1, 1, 1))
+
+        # Other processes see the same breaker through the database
+        self.assertTrue(scheduler.HostScheduler("youtube").is_open())
+
+    def test_only_http_429_counts_as_rate_limiting(self):
+        import yt_dlp
+
+        self.assertTrue(scheduler.is_rate_limited(yt_dlp.utils.DownloadError("HTTP Error 429: Too Many Requests")))
+        for message in (
+            "[youtube] a429bcdefgh: Video unavailable",
+            "Unable to download https://rr1---sn-429.googlevideo.com/videoplayback: HTTP Error 403: Forbidden",
+            "Got 4290 bytes, expected 8192",
+        ):
+            self.assertFalse(scheduler.is_rate_limited(yt_dlp.utils.DownloadError(message)), message)
+
+    def test_open_breaker_means_captions_only(self):
+        self.gate.trip()
+        api = FakeTranscriptApi.configured(words=3)
+        with mock.patch.object(pipeline.youtube_transcript_api, "YouTubeTranscriptApi", api):
+            self.assertTrue(pipeline.get_transcription(self.link).startswith("word0"))
+        with mock.patch.object(
+            pipeline.youtube_transcript_api, "YouTubeTranscriptApi", FakeTranscriptApi.configured(tracks=())
+        ):
+            with mock.patch.object(pipeline, "download_audio") as download:
+                with self.assertRaises(scheduler.CircuitOpen):
+                    pipeline.get_transcription("https://youtu.be/bbbbbbbbbbb")
+        download.assert_not_called()
+
+    def test_caps_concurrency_and_paces_requests(self):
+        peak, lock = [0], threading.Lock()
+
+        def hold():
+            with self.gate.slot():
+                with lock:
+                    peak[0] = max(peak[0], self.gate.counters["in_flight"])
+                time.sleep(0.05)
+
+        threads = [threading.Thread(target=hold) for _ in range(6)]
+        # Keep the pool threads off the test transaction's database (shared leases are tested below)
+        with mock.patch.object(self.gate, "open_until", return_value=None), mock.patch.object(
+            self.gate, "_acquire_lease", return_value=None
+        ):
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(peak[0], 2)
+        self.assertEqual(self.gate.metrics()["granted_total"], 6)
+
+        with override_settings(YT_REQUESTS_PER_MINUTE=600, YT_REQUEST_BURST=1):
+            started = time.perf_counter()
+            for _ in range(3):
+                with self.gate.slot():
+                    pass
+            self.assertGreaterEqual(time.perf_counter() - started, 0.15)
+
+    @override_settings(YT_MAX_CONCURRENT_TOTAL=2, YT_SLOT_LEASE_SECONDS=60)
+    def test_slots_are_capped_across_processes(self):
+        # Two schedulers on one row stand in for two worker processes
+        other = scheduler.HostScheduler("youtube")
+        first, second = self.gate._try_lease(), other._try_lease()
+        self.assertTrue(first and second)
+        self.assertIsNone(other._try_lease())
+
+        self.gate._release_lease(first)
+        self.assertIsNotNone(other._try_lease())
+
+        # A lease whose process died expires
+        HostThrottle.objects.filter(key="youtube").update(leases={"dead": time.time() - 1, second: time.time() + 60})
+        self.assertIsNotNone(self.gate._try_lease())
+
+
+JAR = "# Netscape HTTP Cookie File\n.youtube.com\tTRUE\t/\tTRUE\t0\tSID\t{}"
+
+
+@override_settings(YT_COOKIE_RELOAD_SECONDS=0, YT_COOKIE_QUARANTINE=60)
+class CookieJarTests(TestCase):
+    link = "https://youtu.be/dQw4w9WgXcQ"
+
+    def setUp(self):
+        cache.clear()
+        pipeline._video_infos.clear()
+        self.pool = cookie_jars.CookiePool(env={f"YTDLP_COOKIES_{i}": JAR.format(name) for i, name in enumerate("ab")})
+        self.gate = scheduler.HostScheduler("youtube")
+        for patcher in (mock.patch.object(cookie_jars, "pool", self.pool), mock.patch.object(scheduler, "youtube", self.gate)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_concurrent_leases_get_private_copies_of_different_jars(self):
+        with self.pool.lease() as first, self.pool.lease() as second:
+            contents = {open(path).read().split()[-1] for path in (first, second)}
+            self.assertEqual(contents, {"a", "b"})
+            self.assertEqual(os.stat(first).st_mode & 0o777, 0o600)
+        self.assertFalse(os.path.exists(first) or os.path.exists(second))
+
+    def test_429_quarantines_the_jar_and_retries_with_another(self):
+        ydl = FakeYoutubeDL.configured(rate_limited={"a"})
+        with mock.patch.object(pipeline.yt_dlp, "YoutubeDL", ydl):
+            self.assertEqual(pipeline.resolve_video(self.link)["id"], "dQw4w9WgXcQ")
+            pipeline.resolve_video("https://youtu.be/aaaaaaaaaaa")
+        self.assertEqual((ydl.calls["as:a"], ydl.calls["as:b"]), (1, 2))
+        self.assertFalse(self.gate.is_open())
+        metrics = self.pool.metrics()
+        self.assertEqual((metrics["jars_available"], metrics["rejected_total"]), (1, 1))
+
+        # Other processes skip the jar too, through the cache
+        other = cookie_jars.CookiePool(env=self.pool._env)
+        with other.lease() as path:
+            self.assertTrue(open(path).read().endswith("b\n"))
+
+    def test_bot_check_moves_the_call_to_the_next_jar(self):
+        ydl = FakeYoutubeDL.configured(bot_checked={"a"})
+        with mock.patch.object(pipeline.yt_dlp, "YoutubeDL", ydl):
+            self.assertEqual(pipeline.resolve_video(self.link)["id"], "dQw4w9WgXcQ")
+        self.assertEqual((ydl.calls["as:a"], ydl.calls["as:b"]), (1, 1))
+        metrics = self.pool.metrics()
+        self.assertEqual((metrics["jars_available"], metrics["rejected_total"]), (2, 1))  # one failure: not quarantined
+
+    def test_bot_check_on_every_jar_fails_after_trying_each_once(self):
+        ydl = FakeYoutubeDL.configured(bot_checked={"a", "b"})
+        with mock.patch.object(pipeline.yt_dlp, "YoutubeDL", ydl):
+            with self.assertRaises(pipeline.yt_dlp.utils.DownloadError):
+                pipeline.resolve_video(self.link)
+        self.assertEqual((ydl.calls["as:a"], ydl.calls["as:b"]), (1, 1))
+
+    def test_breaker_trips_only_when_every_jar_is_rate_limited(self):
+        ydl = FakeYoutubeDL.configured(rate_limited={"a", "b"})
+        with mock.patch.object(pipeline.yt_dlp, "YoutubeDL", ydl):
+            with self.assertRaises(scheduler.CircuitOpen):
+                pipeline.resolve_video(self.link)
+        self.assertEqual(ydl.calls["extract_info"], 2)
+        self.assertTrue(self.gate.is_open())
+
+        # With every jar out, calls go out without cookies
+        with self.pool.lease() as path:
+            self.assertIsNone(path)
+
+    def test_jars_are_reloaded_from_the_directory(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(os.path.join(directory, "one.txt"), "w") as f:
+            f.write(JAR.format("one"))
+        pool = cookie_jars.CookiePool(env={}, directory=directory)
+        self.assertEqual([jar.name for jar in pool.jars()], ["one.txt"])
+
+        with open(os.path.join(directory, "two.txt"), "w") as f:
+            f.write(JAR.format("two"))
+        self.assertEqual([jar.name for jar in pool.jars()], ["one.txt", "two.txt"])
+
+
+@override_settings(SUMMARY_DIRECT_MAX_TOKENS=50, SUMMARY_CHUNK_TOKENS=30, SUMMARY_MAX_PARALLEL=3)
+class SummarizeTests(TestCase):
+    transcript = " ".join(f"Sentence number {i} says something useful." for i in range(20))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_chunks_end_on_sentence_boundaries(self):
+        chunks = summarize.chunk_transcript(self.transcript)
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(c.endswith("useful.") for c in chunks))
+        self.assertEqual(" ".join(chunks), self.transcript)
+
+    def test_unpunctuated_text_is_split_on_words(self):
+        chunks = summarize.chunk_transcript("word " * 200)
+        self.assertTrue(all(summarize.estimate_tokens(c) <= 30 for c in chunks))
+
+    def test_short_transcript_is_used_directly(self):
+        complete = mock.Mock()
+        self.assertIs(summarize.condense("Short.", complete, "m"), "Short.")
+        complete.assert_not_called()
+
+    def test_chunk_summaries_are_cached(self):
+        complete = mock.Mock(return_value="note.")
+        notes = summarize.condense(self.transcript, complete, "m")
+        calls = complete.call_count
+        self.assertGreater(calls, 1)
+        self.assertTrue(notes.startswith("note."))
+
+        summarize.condense(self.transcript, complete, "m")
+        self.assertEqual(complete.call_count, calls)
+
+    def test_edits_only_pay_for_changed_chunks(self):
+        complete = mock.Mock(return_value="note.")
+        chunks = summarize.chunk_transcript(self.transcript)
+        summarize.condense(self.transcript, complete, "m")
+        calls = complete.call_count
+
+        # More text adds a chunk, which changes every chunk's "i of n" but not its text
+        longer = self.transcript + " A closing sentence adds one more chunk at the end."
+        self.assertEqual(len(summarize.chunk_transcript(longer)), len(chunks) + 1)
+        summarize.condense(longer, complete, "m")
+        self.assertLessEqual(complete.call_count - calls, 2)  # the new chunk (and notes rounds)
+
+    def test_notes_that_do_not_shrink_stop_after_one_round(self):
+        complete = mock.Mock(side_effect=lambda prompt: prompt.rsplit("\n\n", 1)[1] + " And more.")
+        notes = summarize.condense(self.transcript, complete, "m")
+        self.assertEqual(notes, self.transcript)
+        self.assertEqual(complete.call_count, len(summarize.chunk_transcript(self.transcript)))
+
+    @override_settings(SUMMARY_MAX_ROUNDS=1)
+    def test_rounds_are_capped(self):
+        # Notes that shrink only a little would take many rounds to fit
+        complete = mock.Mock(side_effect=lambda prompt: prompt.rsplit("\n\n", 1)[1][:-8])
+        notes = summarize.condense(self.transcript, complete, "m")
+        self.assertGreater(summarize.estimate_tokens(notes), 50)
+        self.assertEqual(complete.call_count, len(summarize.chunk_transcript(self.transcript)))
+
+
+class LLMBackendTests(TestCase):
+    def rate_limited(self):
+        import groq
+        import httpx
+
+        request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+        response = httpx.Response(429, headers={"retry-after": "0"}, request=request)
+        return groq.RateLimitError("rate limited", response=response, body=None)
+
+    @override_settings(LLM_MAX_RETRIES=3)
+    def test_retries_rate_limited_calls(self):
+        backend = fake_groq(reply="ok")
+        create = backend.client.chat.completions.create
+        backend.client.chat.completions.create = mock.Mock(
+            side_effect=[self.rate_limited(), self.rate_limited(), create(model="m", messages=[])]
+        )
+        self.assertEqual(backend.complete("prompt"), "ok")
+        self.assertEqual(backend.client.chat.completions.create.call_count, 3)
+
+    @override_settings(LLM_MAX_RETRIES=1)
+    def test_gives_up_after_max_retries(self):
+        import groq
+
+        backend = fake_groq()
+        backend.client.chat.completions.create = mock.Mock(side_effect=self.rate_limited())
+        with self.assertRaises(groq.RateLimitError):
+            backend.complete("prompt")
+        self.assertEqual(backend.client.chat.completions.create.call_count, 2)
+
+    def test_token_bucket_spaces_out_calls(self):
+        bucket = llm.TokenBucket(rate=20, capacity=1)
+        started = time.perf_counter()
+        for _ in range(3):
+            bucket.acquire()
+        self.assertGreaterEqual(time.perf_counter() - started, 0.09)
+
+    @override_settings(LLM_BACKEND="stub")
+    def test_stub_backend_is_deterministic(self):
+        llm.set_backend(None)
+        self.addCleanup(llm.set_backend, None)
+        backend = llm.get_backend()
+        self.assertIsInstance(backend, llm.StubBackend)
+        self.assertEqual(backend.complete("same prompt"), backend.complete("same prompt"))
+        self.assertEqual("".join(backend.stream("same prompt")).strip(), backend.complete("same prompt"))
+
+
+class RenderingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alex", password="pw-12345")
+        self.client.force_login(self.user)
+
+    def make_post(self, content):
+        return BlogPost.objects.create(
+            user=self.user, youtube_title="T", youtube_link="https://youtu.be/x", generated_content=content
+        )
+
+    def test_save_stores_sanitized_html(self):
+        post = self.make_post("# Title\n\n<script>alert(1)</script>**bold**")
+        self.assertIn("<h1>Title</h1>", post.rendered_html)
+        self.assertIn("<strong>bold</strong>", post.rendered_html)
+        self.assertNotIn("<script>", post.rendered_html)
+        self.assertEqual(post.render_version, rendering.RENDER_VERSION)
+
+        post.generated_content = "changed"
+        post.save(update_fields=["generated_content"])
+        post.refresh_from_db()
+        self.assertEqual(post.rendered_html, "<p>changed</p>")
+
+    def test_migration_backfills_posts_saved_before_rendering(self):
+        import importlib
+
+        from django.apps import apps
+
+        backfill = importlib.import_module("blog_generator.migrations.0014_backfill_rendered_posts")
+        post = self.make_post("Some **old** words")
+        BlogPost.objects.filter(pk=post.pk).update(rendered_html="", excerpt="", render_version=0)
+        modified_at = BlogPost.objects.get(pk=post.pk).modified_at
+
+        backfill.render_existing_posts(apps, None)
+        post = BlogPost.objects.get(pk=post.pk)
+        self.assertEqual((post.excerpt, post.render_version), ("Some old words", rendering.RENDER_VERSION))
+        self.assertEqual(post.modified_at, modified_at)
+
+    def test_details_rerenders_stale_posts_without_touching_modified_at(self):
+        post = self.make_post("*old*")
+        BlogPost.objects.filter(pk=post.pk).update(rendered_html="", render_version=0)
+        with mock.patch.object(rendering, "render_markdown", wraps=rendering.render_markdown) as render:
+            for _ in range(2):
+                response = self.client.get(reverse("blog-details", args=[post.pk]))
+                self.assertContains(response, "<em>old</em>")
+        self.assertEqual(render.call_count, 1)
+        fresh = BlogPost.objects.get(pk=post.pk)
+        self.assertEqual(fresh.render_version, rendering.RENDER_VERSION)
+        self.assertEqual(fresh.modified_at, post.modified_at)
+
+    def test_render_posts_command_backfills_stale_posts(self):
+        posts = [self.make_post(f"post {i}") for i in range(3)]
+        BlogPost.objects.filter(pk__in=[p.pk for p in posts[:2]]).update(rendered_html="", render_version=0)
+        call_command("render_posts", batch_size=1, stdout=io.StringIO())
+        self.assertFalse(BlogPost.objects.exclude(render_version=rendering.RENDER_VERSION).exists())
+        self.assertEqual(BlogPost.objects.get(pk=posts[0].pk).rendered_html, "<p>post 0</p>")
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alex", password="pw-12345")
+        self.client.force_login(self.user)
+
+    def make_post(self, title, content, user=None):
+        return BlogPost.objects.create(
+            user=user or self.user, youtube_title=title, youtube_link="https://youtu.be/x", generated_content=content
+        )
+
+    def test_ranks_title_matches_first_and_highlights(self):
+        body_hit = self.make_post("Cooking", "We talk about <b>sourdough</b> starters at length.")
+        title_hit = self.make_post("Sourdough basics", "Flour, water and salt.")
+        self.make_post("Unrelated", "Nothing to see here.")
+
+        results = search.search(self.user, "sourdough")
+        self.assertEqual(results.count(), 2)
+        self.assertEqual([p.pk for p in results[0:10]], [title_hit.pk, body_hit.pk])
+        snippet = results[0:10][1].search_snippet
+        self.assertIn("<mark>sourdough</mark>", snippet)
+        self.assertIn("&lt;b&gt;", snippet)
+
+    def test_index_follows_saves_and_deletes(self):
+        post = self.make_post("Guitar", "Chord shapes for beginners.")
+        self.assertEqual(search.search(self.user, "chord").count(), 1)
+
+        post.generated_content = "Scales for beginners."
+        post.save()
+        self.assertEqual(search.search(self.user, "chord").count(), 0)
+        self.assertEqual(search.search(self.user, "scale").count(), 1)  # stemmed
+
+        post.delete()
+        self.assertEqual(search.search(self.user, "scales").count(), 0)
+
+    def test_only_searches_own_posts_and_tolerates_syntax(self):
+        other = User.objects.create_user(username="sam", password="pw-12345")
+        self.make_post("Rust", "Ownership explained.", user=other)
+        self.assertEqual(search.search(self.user, "ownership").count(), 0)
+        self.assertEqual(search.search(self.user, '"AND (*').count(), 0)
+
+    def test_blog_list_paginates_search_results(self):
+        for i in range(12):
+            self.make_post(f"Python tip {i}", "Use virtual environments.")
+        response = self.client.get(reverse("blog-list"), {"q": "virtual", "page": 2})
+        self.assertEqual(response.context["total"], 12)
+        self.assertEqual(len(response.context["page_obj"].object_list), 2)
+        self.assertContains(response, "<mark>")
+
+
+class ListingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="alex", password="pw-12345")
+        self.client.force_login(self.user)
+        same_time = timezone.now()
+        self.posts = [
+            BlogPost.objects.create(
+                user=self.user, youtube_title=f"Post {i}", youtube_link="https://youtu.be/x",
+                generated_content=f"# Heading\n\nBody of **post {i}**. " + "word " * 100,
+            )
+            for i in range(25)
+        ]
+        # Ties on created_at must still page deterministically (by id)
+        BlogPost.objects.filter(pk__in=[p.pk for p in self.posts[10:15]]).update(created_at=same_time)
+
+    def test_stores_plain_text_excerpt(self):
+        excerpt = self.posts[0].excerpt
+        self.assertTrue(excerpt.startswith("Heading Body of post 0."))
+        self.assertLessEqual(len(excerpt), rendering.EXCERPT_CHARS)
+
+    def test_keyset_pages_walk_every_post_both_ways(self):
+        expected = list(
+            BlogPost.objects.filter(user=self.user).order_by("-created_at", "-id").values_list("pk", flat=True)
+        )
+        seen, pages, page = [], [], listing.keyset_page(self.user, per_page=10)
+        while True:
+            pages.append(page)
+            seen += [p.pk for p in page.object_list]
+            if not page.has_next:
+                break
+            page = listing.keyset_page(self.user, after=page.next_cursor, per_page=10)
+        self.assertEqual(seen, expected)
+        self.assertFalse(pages[0].has_previous)
+
+        back = listing.keyset_page(self.user, before=pages[-1].previous_cursor, per_page=10)
+        self.assertEqual([p.pk for p in back.object_list], [p.pk for p in pages[-2].object_list])
+        self.assertTrue(back.has_previous)
+        self.assertEqual(listing.keyset_page(self.user, after="garbage!").object_list[0].pk, expected[0])
+
+    def test_blog_list_uses_projection_and_cached_count(self):
+        response = self.client.get(reverse("blog-list"))
+        self.assertEqual(response.context["total"], 25)
+        article = response.context["page_obj"].object_list[0]
+        self.assertIn("generated_content", article.get_deferred_fields())
+        self.assertContains(response, "?after=")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(listing.post_count(self.user), 25)
+        self.posts[0].delete()
+        self.assertEqual(listing.post_count(self.user), 24)
+
+
+@override_settings(BLOG_PAGE_CACHE_TTL=300, BLOG_VERSION_CACHE_TTL=300)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="alex", password="pw-12345")
+        self.client.force_login(self.user)
+        self.post = BlogPost.objects.create(
+            user=self.user, youtube_title="First", youtube_link="https://youtu.be/x", generated_content="# Hi"
+        )
+
+    def post_queries(self, url, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, headers=headers)
+        return response, [q for q in queries if "blog_generator_blogpost" in q["sql"]]
+
+    def test_details_answer_304_until_the_post_changes(self):
+        url = reverse("blog-details", args=[self.post.pk])
+        first = self.client.get(url)
+        self.assertEqual(first["Cache-Control"], "private, no-cache")
+        self.assertTrue(first.has_header("Last-Modified"))
+
+        again, queries = self.post_queries(url, if_none_match=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(queries, [])
+
+        self.post.generated_content = "# Edited"
+        self.post.save()
+        self.assertEqual(self.client.get(url, headers={"if-none-match": first["ETag"]}).status_code, 200)
+
+        other = User.objects.create_user(username="sam", password="pw-12345")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url, headers={"if-none-match": first["ETag"]}).status_code, 404)
+
+    def test_list_pages_are_cached_per_user_until_a_post_is_saved(self):
+        url = reverse("blog-list")
+        first = self.client.get(url)
+        self.assertContains(first, "First")
+
+        cached, queries = self.post_queries(url)
+        self.assertEqual(queries, [])
+        self.assertEqual(cached.content, first.content)
+        self.assertEqual(self.post_queries(url, if_none_match=first["ETag"])[0].status_code, 304)
+
+        BlogPost.objects.create(
+            user=self.user, youtube_title="Second", youtube_link="https://youtu.be/y", generated_content="# Yo"
+        )
+        fresh = self.client.get(url, headers={"if-none-match": first["ETag"]})
+        self.assertContains(fresh, "Second")
+        self.assertNotEqual(fresh["ETag"], first["ETag"])
+
+    @override_settings(BLOG_VERSION_CACHE_TTL=0)
+    def test_markers_come_from_the_rows_without_a_shared_cache(self):
+        url = reverse("blog-list")
+        etag = self.client.get(url)["ETag"]
+        # A write this process's signals never saw, like one from a worker process
+        BlogPost.objects.filter(pk=self.post.pk).update(modified_at=timezone.now())
+        self.assertEqual(self.client.get(url, headers={"if-none-match": etag}).status_code, 200)
+
+
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"], AUTH_LOGIN_USER_LIMIT=2,
+    AUTH_LOGIN_IP_LIMIT=100, AUTH_HASH_WORKERS=1, AUTH_HASH_QUEUE=0,
+)
+class AuthTests(TestCase):
+    def setUp(self):
+        caches["auth"].clear()
+        self.addCleanup(caches["auth"].clear)
+        for name in ("_pool", "_slots"):  # a pool sized by these settings
+            patcher = mock.patch.object(auth, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username="alex", password="pw-12345")
+
+    def login(self, password):
+        return self.client.post(reverse("login"), {"username": "alex", "password": password})
+
+    def test_sessions_come_from_the_cache(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse("blog-list")).status_code, 200)
+        self.assertFalse([q for q in queries if "django_session" in q["sql"]])
+
+    def test_failed_logins_are_throttled_before_hashing(self):
+        self.assertContains(self.login("wrong"), "Invalid username or password")
+        self.assertContains(self.login("wrong"), "Invalid username or password")
+        with mock.patch.object(auth, "hashing") as hashing:
+            self.assertEqual(self.login("pw-12345").status_code, 429)
+        hashing.assert_not_called()
+
+        caches["auth"].delete("login-user:alex")
+        self.assertRedirects(self.login("pw-12345"), "/", fetch_redirect_response=False)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("md5$"))  # upgraded to the preferred hasher
+
+    def test_full_hashing_pool_answers_busy(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_hash():
+            started.set()
+            release.wait(5)
+
+        holder = threading.Thread(target=auth.hashing, args=(slow_hash,))
+        holder.start()
+        started.wait(5)
+        try:
+            self.assertEqual(self.login("pw-12345").status_code, 503)
+            # Other authenticate() callers, like the admin's login form, see a failed login
+            self.assertIsNone(authenticate(None, username="alex", password="pw-12345"))
+        finally:
+            release.set()
+            holder.join()
+        self.assertEqual(self.login("pw-12345").status_code, 302)
+
+    def test_signup_hashes_on_the_pool_and_logs_in(self):
+        response = self.client.post(reverse("signup"), {
+            "username": "sam", "email": "sam@EXAMPLE.com", "password": "pw-1", "repeatPassword": "pw-1",
+        })
+        self.assertRedirects(response, "/", fetch_redirect_response=False)
+        sam = User.objects.get(username="sam")
+        self.assertEqual(sam.email, "sam@example.com")
+        self.assertTrue(sam.check_password("pw-1"))
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.user = User.objects.create_user(username="alex", password="pw-12345")
+
+    @mock.patch.object(llm, "_backend", fake_groq(reply="# Article"))
+    @mock.patch("blog_generator.pipeline.acquire_video", return_value=("A video", "hello world"))
+    def test_job_records_stages_tokens_and_state(self, *_):
+        jobs.enqueue(self.user, "https://youtu.be/dQw4w9WgXcQ")
+        jobs.work("test-worker", once=True)
+
+        for stage in ("job_transcript", "job_generate", "job_save", "llm_generate"):
+            self.assertEqual(metrics.STAGE_SECONDS.count(stage=stage), 1, stage)
+        self.assertGreater(metrics.LLM_TOKENS.value(purpose="article", direction="out"), 0)
+        self.assertEqual(metrics.JOBS.value(state="succeeded"), 1)
+
+    def test_span_counts_errors_by_class_and_logs_json(self):
+        with self.settings(METRICS_JSON_LOGS=True), self.assertLogs("blog_generator.metrics") as logs:
+            with self.assertRaises(ValueError):
+                with metrics.span("captions", video="abc"):
+                    raise ValueError("boom")
+        self.assertEqual(metrics.ERRORS.value(stage="captions", error="ValueError"), 1)
+        event = json.loads(logs.records[0].getMessage())
+        self.assertEqual((event["stage"], event["error"], event["video"]), ("captions", "ValueError", "abc"))
+
+    def test_metrics_endpoint_renders_prometheus_text(self):
+        metrics.cache_result("transcript", hit=True)
+        with metrics.span("video_probe"):
+            pass
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 404)  # no token, no DEBUG
+        with self.settings(DEBUG=True):
+            response = self.client.get(reverse("metrics"))
+        body = response.content.decode()
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+        self.assertIn('blog_cache_requests_total{cache="transcript",result="hit"} 1', body)
+        self.assertIn('blog_stage_seconds_bucket{stage="video_probe",le="+Inf"} 1', body)
+        self.assertIn("blog_youtube_breaker_open 0", body)
+
+        with self.settings(METRICS_TOKEN="s3cret"):
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+            response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer s3cret")
+            self.assertEqual(response.status_code, 200)
+
+
+class BenchmarkCompareTests(TestCase):
+    def test_flags_moves_past_threshold_in_the_right_direction(self):
+        baseline = {"scenario": "e2e", "generate": {"p95": 100.0, "requests_per_second": 10.0, "count": 24}}
+        current = {"generate": {"p95": 105.0, "requests_per_second": 5.0, "count": 24}, "new": 1}
+        self.assertEqual(
+            benchmarks.compare(baseline, current, threshold=10),
+            [("generate.requests_per_second", 10.0, 5.0, -50.0, True)],
+        )
+        rows = benchmarks.compare(baseline, {"generate": {"p95": 50.0}}, threshold=10)
+        self.assertEqual(rows, [("generate.p95", 100.0, 50.0, -50.0, False)])
+
+    def test_directions_come_from_the_table(self):
+        baseline = {
+            "metadata": {"saved_per_request_ms": 40.0, "extractions_per_request": 2.0},
+            "long_audio": {"60": {"speedup": 2.0, "windows": 6}},
+            "auth": {"pool": {"background_work_pct": 50.0, "wall_ms": 100.0}},
+            "e2e": {"stages_mean_ms": {"job_save": 100.0}},
+        }
+        current = {
+            "metadata": {"saved_per_request_ms": 60.0, "extractions_per_request": 1.0},
+            "long_audio": {"60": {"speedup": 3.0, "windows": 12}},
+            "auth": {"pool": {"background_work_pct": 25.0, "wall_ms": 150.0}},
+            "e2e": {"stages_mean_ms": {"job_save": 50.0}},
+        }
+        regressed = {path: worse for path, *_, worse in benchmarks.compare(baseline, current)}
+        self.assertEqual(
+            regressed,
+            {
+                "metadata.saved_per_request_ms": False,
+                "metadata.extractions_per_request": False,
+                "long_audio.60.speedup": False,
+                "long_audio.60.windows": None,  # workload size: no direction
+                "auth.pool.background_work_pct": True,
+                "auth.pool.wall_ms": True,
+                "e2e.stages_mean_ms.job_save": False,
+            },
+        )
+
+
+class BatchTests(TestCase):
+    playlist = "https://www.youtube.com/playlist?list=PLabcdefgh"
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="alex", password="pw-12345")
+        self.client.force_login(self.user)
+
+    def test_playlist_expands_with_one_flat_extraction(self):
+        ydl = FakeYoutubeDL.configured(playlist_size=3)
+        with mock.patch.object(pipeline.yt_dlp, "YoutubeDL", ydl):
+            links = batch.expand([self.playlist, "https://youtu.be/dQw4w9WgXcQ", "https://youtu.be/dQw4w9WgXcQ"])
+        self.assertEqual(len(links), 4)
+        self.assertEqual(links[0], "https://www.youtube.com/watch?v=PLabc000000")
+        self.assertEqual(ydl.calls["extract_info"], 1)
+        self.assertFalse(batch.is_playlist("https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PLabcdefgh"))
+
+    @mock.patch.object(llm, "_backend", fake_groq(reply="# Batch article about gardening"))
+    def test_generate_many_bulk_saves_posts_with_item_status(self):
+        def acquire(link, timings=None):
+            return ("A video", None) if link.endswith("bad") else ("A video", "hello world")
+
+        links = ["https://youtu.be/aaaaaaaaaaa", "https://youtu.be/bad", "https://youtu.be/bbbbbbbbbbb"]
+        # Keep the pool threads off the test transaction's database
+        with mock.patch.object(pipeline, "acquire_video", acquire), mock.patch.object(
+            pipeline, "_cached_article", return_value=("key", None)
+        ), mock.patch.object(pipeline, "_store_article"):
+            items = batch.generate_many(self.user, links, workers=2)
+
+        self.assertEqual([item["state"] for item in items], ["succeeded", "failed", "succeeded"])
+        self.assertEqual(items[1]["error"], jobs.NO_TRANSCRIPT)
+        post = BlogPost.objects.get(pk=items[0]["post_id"])
+        self.assertIn("<h1>", post.rendered_html)
+        self.assertEqual(listing.post_count(self.user), 2)
+        self.assertEqual(len(search.search(self.user, "gardening")), 2)
+
+
+@mock.patch.object(llm, "_backend", fake_groq(reply="# Batch article"))
+@mock.patch("blog_generator.pipeline.acquire_video", return_value=("A video", "hello world"))
+class BatchEndpointTests(TransactionTestCase):
+    """
+    Playlist expansion runs on its own thread against the real scheduler, so
+    these tests commit instead of running inside one transaction.
+    """
+
+    playlist = BatchTests.playlist
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="alex", password="pw-12345")
+        self.client.force_login(self.user)
+
+    def test_batch_endpoint_queues_jobs_and_reports_items(self, *_):
+        with mock.patch.object(pipeline.yt_dlp, "YoutubeDL", FakeYoutubeDL.configured(playlist_size=3)):
+            response = self.client.post(
+                reverse("generate-batch"), data=json.dumps({"playlist": self.playlist}), content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 202)
+        status_url = response.json()["status_url"]
+        self.assertEqual(self.client.get(status_url).json()["counts"]["queued"], 3)
+
+        jobs.work("test-worker", once=True)
+        status = self.client.get(status_url).json()
+        self.assertTrue(status["finished"])
+        self.assertEqual(status["counts"]["succeeded"], 3)
+        self.assertTrue(all(item["post_id"] for item in status["items"]))
+
+        response = self.client.post(
+            reverse("generate-batch"), data=json.dumps({"links": []}), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@mock.patch("blog_generator.pipeline.acquire_video", return_value=("A video", "the same transcript"))
+class ArticleCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alex", password="pw-12345")
+        self.backend = fake_groq(reply="# Cached article")
+        patcher = mock.patch.object(llm, "_backend", self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_same_transcript_is_generated_once(self, _):
+        jobs.enqueue(self.user, "https://youtu.be/aaaaaaaaaaa")
+        first = jobs.run_job(jobs.claim_next("w"))
+        other = User.objects.create_user(username="sam", password="pw-12345")
+        jobs.enqueue(other, "https://youtu.be/aaaaaaaaaaa")
+        second = jobs.run_job(jobs.claim_next("w"))
+
+        self.assertEqual(self.backend.client.calls["create"], 1)
+        self.assertEqual(second.blog_post.generated_content, first.blog_post.generated_content)
+        self.assertEqual(ArticleCacheEntry.objects.get().hits, 1)
+
+        jobs.enqueue(self.user, "https://youtu.be/aaaaaaaaaaa", regenerate=True)
+        jobs.run_job(jobs.claim_next("w"))
+        self.assertEqual(self.backend.client.calls["create"], 2)
+
+    @override_settings(ARTICLE_CACHE_MAX_ENTRIES=2)
+    def test_prune_drops_least_recently_used(self, _):
+        for key in ("a", "b", "c"):
+            article_cache.put(key, "m", f"article {key}")
+            if key == "b":
+                self.assertEqual(article_cache.get("a"), "article a")
+        self.assertEqual(sorted(ArticleCacheEntry.objects.values_list("key", flat=True)), ["a", "c"])
+        with override_settings(ARTICLE_CACHE_TTL=1):
+            ArticleCacheEntry.objects.update(created_at=timezone.now() - timedelta(seconds=5))
+            self.assertIsNone(article_cache.get("a"))
+
+
+class DatabaseTuningTests(TestCase):
+    def test_sqlite_gets_wal_busy_timeout_and_immediate_transactions(self):
+        db = database.tune({"ENGINE": "django.db.backends.sqlite3", "NAME": "x"}, sqlite_busy_timeout=7)
+        self.assertEqual(db["OPTIONS"]["timeout"], 7)
+        self.assertEqual(db["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+        self.assertIn("PRAGMA journal_mode=WAL", db["OPTIONS"]["init_command"])
+
+    def test_postgres_gets_health_checks_and_pool_when_available(self):
+        url_config = {"ENGINE": "django.db.backends.postgresql", "CONN_MAX_AGE": 600}
+        with mock.patch.object(database, "pool_available", return_value=True):
+            db = database.tune(dict(url_config), pool_min_size=1, pool_max_size=5)
+        self.assertTrue(db["CONN_HEALTH_CHECKS"])
+        self.assertEqual((db["CONN_MAX_AGE"], db["OPTIONS"]["pool"]["max_size"]), (0, 5))
+
+        with mock.patch.object(database, "pool_available", return_value=False):
+            db = database.tune(dict(url_config))
+        self.assertEqual((db["CONN_MAX_AGE"], "pool" in db["OPTIONS"]), (600, False))
+
+
+class PostTranscriptTests(TestCase):
+    link = "https://youtu.be/dQw4w9WgXcQ"
+
+    def setUp(self):
+        transcript_cache.clear_memory()
+        self.addCleanup(transcript_cache.clear_memory)
+        self.user = User.objects.create_user(username="alex", password="pw-12345")
+        self.client.force_login(self.user)
+
+    @mock.patch.object(llm, "_backend", fake_groq(reply="# Article"))
+    @mock.patch("blog_generator.pipeline.yt_title", return_value="A video")
+    def test_job_keeps_compressed_timed_transcript_out_of_post_queries(self, _):
+        api = FakeTranscriptApi.configured(words=400)
+        with mock.patch.object(pipeline.youtube_transcript_api, "YouTubeTranscriptApi", api):
+            jobs.enqueue(self.user, self.link)
+            job = jobs.run_job(jobs.claim_next("w"))
+
+        transcript = PostTranscript.objects.get(post=job.blog_post)
+        self.assertIn("data", transcript.get_deferred_fields())
+        self.assertEqual(transcript.segment_count, 400)
+        self.assertEqual(transcript.segments()[2], [1.0, 1.5, "word2 in en."])
+        self.assertTrue(transcript.text.startswith("word0 in en. word1 in en."))
+        self.assertLess(transcript.stored_bytes, transcript.raw_bytes / 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("blog-list"))
+            self.client.get(reverse("blog-details", args=[job.blog_post_id]))
+        self.assertFalse([q for q in queries if "posttranscript" in q["sql"]])
+
+    def test_untimed_text_and_storage_report(self):
+        post = BlogPost.objects.create(user=self.user, youtube_title="T", youtube_link=self.link, generated_content="x")
+        transcript_cache.put("dQw4w9WgXcQ", "some words " * 500, transcript_cache.Source.ASSEMBLYAI)
+        out = io.StringIO()
+        call_command("transcript_storage", "--backfill", stdout=out)
+        self.assertEqual(PostTranscript.objects.get(post=post).segments(), [[None, None, "some words " * 500]])
+        self.assertIn("Backfilled 1 transcript(s)", out.getvalue())
+        self.assertIn(f"{transcripts.CODEC}: 1 transcript(s)", out.getvalue())
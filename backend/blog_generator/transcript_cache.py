@@ -0,0 +1,142 @@
+"""
+Persistent transcript store keyed by YouTube video id.
+
+Lookups go through a small in-process LRU first, then the
+TranscriptCacheEntry table. Entries expire after TRANSCRIPT_CACHE_TTL
+seconds and the table is trimmed to TRANSCRIPT_CACHE_MAX_ENTRIES, dropping
+the least recently used videos first.
+"""
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import transcripts
+from .models import TranscriptCacheEntry
+
+Source = TranscriptCacheEntry.Source
+
+
+class LRU:
+    """
+    Thread-safe least-recently-used dict with a fixed capacity.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def set(self, key, value):
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            return self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+_memory = LRU(settings.TRANSCRIPT_CACHE_LRU_SIZE)
+
+
+def _is_fresh(entry):
+    ttl = settings.TRANSCRIPT_CACHE_TTL
+    return not ttl or entry.fetched_at >= timezone.now() - timedelta(seconds=ttl)
+
+
+def get(video_id):
+    """
+    Return the cached TranscriptCacheEntry for `video_id`, or None.
+    """
+    if not video_id:
+        return None
+
+    entry = _memory.get(video_id)
+    if entry is not None:
+        if _is_fresh(entry):
+            return entry
+        _memory.pop(video_id)
+
+    entry = TranscriptCacheEntry.objects.filter(video_id=video_id).first()
+    if entry is None:
+        return None
+    if not _is_fresh(entry):
+        entry.delete()
+        return None
+
+    # Only DB hits bump last_used_at; memory hits would cost a write each.
+    entry.last_used_at = timezone.now()
+    TranscriptCacheEntry.objects.filter(pk=entry.pk).update(last_used_at=entry.last_used_at)
+    _memory.set(video_id, entry)
+    return entry
+
+
+def put(video_id, text, source, language="", segments=None):
+    """
+    Store a transcript for `video_id`, replacing any previous one.
+    `segments` are its timed [start, end, text] segments, if known.
+    """
+    now = timezone.now()
+    codec, data = (transcripts.compress(segments)[:2]) if segments else ("", None)
+    entry, _ = TranscriptCacheEntry.objects.update_or_create(
+        video_id=video_id,
+        defaults={
+            "text": text,
+            "segments": data,
+            "codec": codec,
+            "source": source,
+            "language": language or "",
+            "fetched_at": now,
+            "last_used_at": now,
+        },
+    )
+    _memory.set(video_id, entry)
+    prune()
+    return entry
+
+
+def prune():
+    """
+    Drop expired entries and trim the table to TRANSCRIPT_CACHE_MAX_ENTRIES.
+    Returns the number of rows deleted.
+    """
+    deleted = 0
+    ttl = settings.TRANSCRIPT_CACHE_TTL
+    if ttl:
+        cutoff = timezone.now() - timedelta(seconds=ttl)
+        deleted += TranscriptCacheEntry.objects.filter(fetched_at__lt=cutoff).delete()[0]
+
+    limit = settings.TRANSCRIPT_CACHE_MAX_ENTRIES
+    if limit:
+        overflow = list(
+            TranscriptCacheEntry.objects.order_by("-last_used_at", "-pk")
+            .values_list("pk", flat=True)[limit:]
+        )
+        if overflow:
+            deleted += TranscriptCacheEntry.objects.filter(pk__in=overflow).delete()[0]
+    return deleted
+
+
+def clear_memory():
+    _memory.clear()
@@ -0,0 +1,106 @@
+"""
+Compressed, timestamped transcripts kept with each post.
+
+A transcript is a list of [start, end, text] segments (seconds; None when
+the source had no timings) serialized as JSON and compressed with zstd when
+the optional `zstandard` package is installed, zlib otherwise. The bytes go
+in PostTranscript, a separate table linked one-to-one to BlogPost, so
+blog_list and blog_details never read them; PostTranscript's own default
+queryset defers `data` until segments are asked for.
+"""
+import json
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional: better ratio and speed, zlib is always there
+    zstandard = None
+
+from .models import PostTranscript
+
+CODEC = "zstd" if zstandard else "zlib"
+ZLIB_LEVEL = 9
+ZSTD_LEVEL = 10
+SEGMENT_WORDS = 40  # audio transcripts are cut into segments of at most this many words
+
+
+def compress(segments, codec=CODEC):
+    """
+    (codec, compressed bytes, raw size) for a list of segments.
+    """
+    raw = json.dumps(segments, separators=(",", ":"), ensure_ascii=False).encode()
+    if codec == "zstd":
+        data = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    else:
+        data = zlib.compress(raw, ZLIB_LEVEL)
+    return codec, data, len(raw)
+
+
+def decompress(codec, data):
+    data = bytes(data)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This transcript is zstd-compressed; install the zstandard package to read it.")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        raw = zlib.decompress(data)
+    return json.loads(raw)
+
+
+def caption_segments(snippets):
+    return [
+        [round(s.start, 2), round(s.start + s.duration, 2), s.text] for s in snippets if s.text
+    ]
+
+
+def word_segments(words):
+    """
+    Group AssemblyAI words (times in ms) into sentence-sized segments.
+    """
+    segments, current = [], []
+    for word in words or ():
+        current.append(word)
+        if len(current) >= SEGMENT_WORDS or word.text.endswith((".", "?", "!")):
+            segments.append(_word_segment(current))
+            current = []
+    if current:
+        segments.append(_word_segment(current))
+    return segments
+
+
+def _word_segment(words):
+    return [words[0].start / 1000, words[-1].end / 1000, " ".join(w.text for w in words)]
+
+
+def text_of(segments):
+    return " ".join(text for _, _, text in segments)
+
+
+def build(post, transcription, cached=None):
+    """
+    An unsaved PostTranscript of `transcription` for `post`, with the timed
+    segments of the transcript cache entry `cached` when it holds the same
+    text, or else the text as one untimed segment.
+    """
+    if cached is not None and cached.segments and cached.text == transcription:
+        segments = decompress(cached.codec, cached.segments)
+        source, language = cached.source, cached.language
+    else:
+        segments, source, language = [[None, None, transcription]], "", ""
+    codec, data, raw_bytes = compress(segments)
+    return PostTranscript(
+        post=post,
+        source=source,
+        language=language,
+        codec=codec,
+        data=data,
+        segment_count=len(segments),
+        raw_bytes=raw_bytes,
+        stored_bytes=len(data),
+    )
+
+
+def attach(post, transcription, cached=None):
+    transcript = build(post, transcription, cached)
+    transcript.save()
+    return transcript
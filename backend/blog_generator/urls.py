@@ -8,7 +8,12 @@ urlpatterns = [
     path('signup', views.user_signup, name='signup'),
     path('logout', views.user_logout, name='logout'),
     path('generate-blog', views.generate_blog, name='generate-blog'),
+    path('generate-blog/<int:job_id>/', views.generation_status, name='generation-status'),
+    path('generate-blog/<int:job_id>/events', views.generation_events, name='generation-events'),
+    path('generate-batch', views.generate_batch, name='generate-batch'),
+    path('generate-batch/<int:batch_id>/', views.batch_status, name='batch-status'),
     path('blog-list', views.blog_list, name='blog-list'),
     path('blog-details/<int:pk>/', views.blog_details, name='blog-details'),
+    path("metrics", views.metrics_view, name="metrics"),
     path("site.webmanifest", views.site_manifest, name="site_manifest"),
 ]
\ No newline at end of file
@@ -1,34 +1,27 @@
-from django.shortcuts import get_object_or_404, render
+from django.shortcuts import aget_object_or_404, get_object_or_404, render
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
 from django.db import IntegrityError
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET, require_POST
 from django.views.decorators.csrf import csrf_protect, ensure_csrf_cookie
-from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
 from django.core.paginator import Paginator
 from django.utils.safestring import mark_safe
 from django.templatetags.static import static
+from asgiref.sync import sync_to_async
+import asyncio
 import json
-import os
-import yt_dlp
 import re
-import bleach
-import assemblyai as aai
-from groq import Groq
-from .models import BlogPost
-from markdown import markdown
-from urllib.parse import urlparse, parse_qs
-from youtube_transcript_api import (
-    YouTubeTranscriptApi,
-    TranscriptsDisabled,
-    NoTranscriptFound,
-)
-
-client = Groq(api_key=settings.GROQ_API_KEY)
+import time
+from . import auth, batch, jobs, listing, metrics, page_cache, pipeline, rendering, scheduler, search
+from .models import BlogPost, GenerationBatch, GenerationJob
 
 # Create your views here.
 @login_required
@@ -49,262 +42,167 @@ def site_manifest(request):
         "display": "standalone",
     })
 
-def _ensure_cookiefile_from_env():
+@require_GET
+def metrics_view(request):
     """
-    If YTDLP_COOKIES env var exists (Netscape cookies.txt content), write it to /tmp and return the path.
+    This process's pipeline metrics for Prometheus. Scrapers don't log in,
+    so it takes a bearer METRICS_TOKEN; without one it only exists with DEBUG.
     """
-    cookie_str = os.environ.get("YTDLP_COOKIES", "").strip()
-    if not cookie_str:
-        return None
-    path = "/tmp/yt_cookies.txt"
-    if not os.path.exists(path):
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(cookie_str)
-    return path
-
-def _yt_dlp_opts_base(extra):
-    """
-    Common yt-dlp options: retries, polite pacing, mobile/web clients,
-    direct audio containers (no ffmpeg), and optional cookies.
-    """
-    cookie_file = _ensure_cookiefile_from_env()
-
-    # If we have cookies, we must use the WEB client (iOS/Android ignore cookies)
-    # If we don't have cookies, prefer iOS (tends to avoid SABR/PO issues)
-    player_clients = ["web"] if cookie_file else ["ios"]
-
-    opts = {
-        "quiet": True,
-        "noplaylist": True,
-        "retries": 5,
-        "fragment_retries": 5,
-        "concurrent_fragment_downloads": 1,
-        "sleep_requests": 1.0,
-        "geo_bypass": True,
-        "http_chunk_size": 1 << 20,  # 1 MiB chunks reduce memory spikes
-        "extractor_args": {"youtube": {"player_client": player_clients}},
-        # Keep formats simple; try small-ish audio to be fast and avoid timeouts
-        "format": (
-            "bestaudio[ext=m4a][abr<=128]/"
-            "bestaudio[ext=webm][abr<=128]/"
-            "bestaudio[abr<=128]/"
-            "bestaudio/best"
-        ),
-    }
-    
-    if cookie_file:
-        opts["cookiefile"] = cookie_file
-    if extra:
-        opts.update(extra)
-    return opts
+    if not settings.METRICS_TOKEN:
+        if not settings.DEBUG:
+            raise Http404()
+    elif request.headers.get("Authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
-def _youtube_video_id(url):
-    """
-    Extract a YouTube 11-char video id from common URL shapes.
-    """
-    """
-    Extract a YouTube 11-char video id from common URL shapes.
-    """
-    parsed = urlparse(url)
-    host = (parsed.hostname or "").lower()
+@csrf_protect
+@require_POST
+async def generate_blog(request):
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request method"}, status=405)
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({"error": "Please log in to generate articles"}, status=401)
 
-    if host == "youtu.be":
-        vid = parsed.path.lstrip("/")
-        return vid if len(vid) == 11 else None
-    
-    if host in ("www.youtube.com", "youtube.com", "m.youtube.com"):
-        if parsed.path == "/watch":
-            q = parse_qs(parsed.query)
-            vid = (q.get("v") or [None])[0]
-            return vid if vid and len(vid) == 11 else None
-        if parsed.path.startswith(("/embed/", "/v/", "/shorts/")):
-            parts = parsed.path.split("/")
-            if len(parts) > 2 and len(parts[2]) == 11:
-                return parts[2]
-    return None
-
-def yt_title(link):
-    """
-    Fetch title via yt-dlp with cookie support. No download.
-    """
-    ydl_opts = _yt_dlp_opts_base({"skip_download": True})
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(link, download=False)
-            return info.get("title", "YouTube Video")
-    except Exception:
-        return "YouTube Video"
+        data = json.loads(request.body)          # 1) parse JSON body
+        yt_link = data["link"]                   # 2) extract the youtube link
+        regenerate = bool(data.get("regenerate"))  # skip the generated-article cache
+    except (KeyError, AttributeError, json.JSONDecodeError):
+        return JsonResponse({"error": "Invalid data sent"}, status=400)
 
-def download_audio(link: str) -> str:
-    """
-    Download best available audio directly to /tmp as m4a/webm. Return file path.
-    """
-    outtmpl = "/tmp/%(id)s.%(ext)s"
-    ydl_opts = _yt_dlp_opts_base({"outtmpl": outtmpl})
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        try:
-            info = ydl.extract_info(link, download=True)
-            file_path = ydl.prepare_filename(info)  # e.g., /tmp/VIDEOID.m4a
-            return file_path
-        except yt_dlp.utils.DownloadError as e:
-            # If it's a 429 or SABR/PO situation, bubble up clearly
-            msg = str(e)
-            if "429" in msg or "Too Many Requests" in msg:
-                raise RuntimeError("YouTube rate-limited this server (HTTP 429). Try again later or use a video with captions.") from e
-            raise
-
-def get_transcript_via_captions(link: str):
-    """
-    Prefer captions (fast, avoids downloads). Try English;
-    if unavailable, try any transcript and translate to English.
-    """
-    vid = _youtube_video_id(link)
-    if not vid:
-        return None
+    # 3) queue the work; a background worker (run_blog_workers) picks it up
+    job = await jobs.aenqueue(user, yt_link, regenerate)
 
-    # 1) Try English variants directly
-    for lang in ["en", "en-US", "en-GB"]:
-        try:
-            s = YouTubeTranscriptApi.get_transcript(vid, languages=[lang])
-            text = " ".join(c["text"] for c in s if c.get("text"))
-            if text.strip():
-                return text
-        except Exception:
-            pass
-
-    # 2) Try any transcript, then translate to English
-    try:
-        transcripts = YouTubeTranscriptApi.list_transcripts(vid)
-        try:
-            # Prefer an English transcript if available
-            t = transcripts.find_transcript(["en"])
-        except Exception:
-            # Otherwise, pick the first available transcript
-            t = next(iter(transcripts))
-        # Translate to English if needed
-        if not t.language_code.startswith("en"):
-            t = t.translate("en")
-        s = t.fetch()
-        text = " ".join(c["text"] for c in s if c.get("text"))
-        return text.strip() or None
-    except (TranscriptsDisabled, NoTranscriptFound, StopIteration):
-        return None
-    except Exception:
-        return None
-
-def transcribe_via_assemblyai(audio_path: str) -> str:
+    # 4) hand the client everything it needs to follow the job
+    return JsonResponse(
+        {
+            "job_id": job.pk,
+            "status_url": reverse("generation-status", args=[job.pk]),
+            "events_url": reverse("generation-events", args=[job.pk]),
+        },
+        status=202,
+    )
+
+def _user_jobs(user):
+    return GenerationJob.objects.select_related("blog_post").filter(user=user)
+
+@login_required
+@require_GET
+async def generation_status(request, job_id):
+    job = await aget_object_or_404(_user_jobs(await request.auser()), pk=job_id)
+    return JsonResponse(jobs.job_payload(job))
+
+def _job_events(job, seen):
     """
-    Send local audio file to AssemblyAI and return text.
-    Always cleans up the audio file after processing.
+    The SSE frames for one look at `job`; `seen` carries (last state/stage,
+    characters of partial_content already sent) between looks.
     """
-    aai.settings.api_key = settings.ASSEMBLYAI_API_KEY
-    config = aai.TranscriptionConfig(speech_model=aai.SpeechModel.best)
-    try:
-        tr = aai.Transcriber(config=config).transcribe(audio_path)
-        if tr.status == "error":
-            raise RuntimeError(f"Transcription failed: {tr.error}")
-        return tr.text
-    finally:
-        # Clean up temp file
-        try:
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
-        except Exception:
-            pass
+    payload = jobs.job_payload(job)
+    payload.pop("partial_content", None)  # sent incrementally as deltas
+    frames = []
+    if len(job.partial_content) > seen["sent"]:
+        frames.append(f"event: delta\ndata: {json.dumps({'text': job.partial_content[seen['sent']:]})}\n\n")
+        seen["sent"] = len(job.partial_content)
+    marker = (job.state, job.stage)
+    if marker != seen["last"]:
+        seen["last"] = marker
+        frames.append(f"event: progress\ndata: {json.dumps(payload)}\n\n")
+    return frames or [": keep-alive\n\n"]
 
-def get_transcription(link: str):
+@login_required
+@require_GET
+async def generation_events(request, job_id):
     """
-    Caption-first strategy, fallback to audio download + AssemblyAI.
+    Server-sent events stream of a job's progress. Emits a `progress` event
+    whenever state/stage change, `delta` events with new article text while
+    the model is writing, and closes once the job is finished.
+
+    Under ASGI the stream is async, so an open stream costs no thread while
+    it waits. Under WSGI (runserver, gunicorn's sync workers) it is a plain
+    generator, since Django would read an async one to the end before
+    sending anything, and it ends after BLOG_JOB_EVENTS_WSGI_TIMEOUT so it
+    only holds a worker briefly; the page then polls generation_status.
     """
-    # 1) Captions (no download, often works without cookies)
-
-    cap = get_transcript_via_captions(link)
-    if cap:
-        return cap
-
-    # 2) Fallback: audio → AAI
-    audio_file = download_audio(link)
-    return transcribe_via_assemblyai(audio_file)
+    user_jobs = _user_jobs(await request.auser())
+    job = await aget_object_or_404(user_jobs, pk=job_id)
+    seen = {"last": None, "sent": 0}
+
+    async def astream():
+        deadline = time.monotonic() + settings.BLOG_JOB_EVENTS_TIMEOUT
+        while time.monotonic() < deadline:
+            current = await user_jobs.aget(pk=job.pk)
+            for frame in _job_events(current, seen):
+                yield frame
+            if current.is_finished:
+                return
+            await asyncio.sleep(settings.BLOG_JOB_EVENTS_POLL)
+        yield "event: timeout\ndata: {}\n\n"
+
+    def stream():
+        deadline = time.monotonic() + settings.BLOG_JOB_EVENTS_WSGI_TIMEOUT
+        while time.monotonic() < deadline:
+            current = user_jobs.get(pk=job.pk)
+            yield from _job_events(current, seen)
+            if current.is_finished:
+                return
+            time.sleep(settings.BLOG_JOB_EVENTS_POLL)
+        yield "event: timeout\ndata: {}\n\n"
+
+    events = astream() if isinstance(request, ASGIRequest) else stream()
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+    return response
 
 @csrf_protect
 @require_POST
-def generate_blog(request):
-    if request.method != "POST":
-        return JsonResponse({"error": "Invalid request method"}, status=405)
+async def generate_batch(request):
+    """
+    Queue one job per video of a playlist ({"playlist": url}) or a list of
+    links ({"links": [...]}). Progress is at the returned status_url.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({"error": "Please log in to generate articles"}, status=401)
 
     try:
-        data = json.loads(request.body)          # 1) parse JSON body
-        yt_link = data["link"]                   # 2) extract the youtube link
-    except (KeyError, json.JSONDecodeError):
+        data = json.loads(request.body)
+        source = data.get("playlist") or data["links"]
+    except (KeyError, AttributeError, json.JSONDecodeError):
+        return JsonResponse({"error": "Invalid data sent"}, status=400)
+    if not isinstance(source, (str, list)):
         return JsonResponse({"error": "Invalid data sent"}, status=400)
 
     try:
-        # 3) fetch a human title for the video (fast metadata call; no download)
-        title = yt_title(yt_link)
-
-        # 4) get the transcript (captions fast-path → audio+AAI fallback)
-        transcription = get_transcription(yt_link)
-        if not transcription:
-            return JsonResponse(
-                {
-                    "error": (
-                        "Failed to get transcript. The video may not have captions "
-                        "and the audio path was blocked or failed."
-                    )
-                },
-                status=502,
-            )
-
-        # 5) make the article with your LLM
-        blog_content = generate_blog_from_transcription(transcription)
-        if not blog_content:
-            return JsonResponse({"error": "Failed to generate blog article"}, status=500)
-
-        # 6) persist to DB (works even if user isn’t logged in)
-        BlogPost.objects.create(
-            user=request.user if request.user.is_authenticated else None,
-            youtube_title=title,
-            youtube_link=yt_link,
-            generated_content=blog_content,
-        )
+        links = await sync_to_async(pipeline._in_thread, thread_sensitive=False)(batch.expand, source)
+    except batch.BatchError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except scheduler.CircuitOpen as e:
+        return JsonResponse({"error": str(e)}, status=503)
+
+    queued = await sync_to_async(batch.enqueue_batch)(
+        user, links, data.get("playlist") or "", regenerate=bool(data.get("regenerate"))
+    )
+    return JsonResponse(
+        {
+            "batch_id": queued.pk,
+            "total": len(links),
+            "status_url": reverse("batch-status", args=[queued.pk]),
+        },
+        status=202,
+    )
 
-        # 7) return the content to the frontend
-        return JsonResponse({"content": blog_content})
-
-    except yt_dlp.utils.DownloadError:
-        # This is the common “YouTube challenged the request” case
-        return JsonResponse(
-            {
-                "error": (
-                    "YouTube blocked the request. If the video has no captions, "
-                    "set YTDLP_COOKIES in your server environment and try again."
-                )
-            },
-            status=502,
-        )
-    except Exception:
-        # Keep error details out of responses; log server-side if needed
-        return JsonResponse({"error": "Unexpected server error"}, status=500)
+@login_required
+@require_GET
+async def batch_status(request, batch_id):
+    queued = await aget_object_or_404(GenerationBatch.objects.filter(user=await request.auser()), pk=batch_id)
+    return JsonResponse(await sync_to_async(batch.batch_payload)(queued))
 
 def sanitize_filename(title):
     return re.sub(r'[\\/*?:"<>|]', '', title)
 
-def generate_blog_from_transcription(transcription):
-    prompt = (
-        "Based on the following transcript from a YouTube video, write a comprehensive blog article. "
-        "Make it look like a proper blog post, not a transcript or a video summary.\n\n"
-        f"{transcription}"
-    )
-
-    chat_completion = client.chat.completions.create(
-        model="llama3-8b-8192",
-        messages=[
-            {"role": "user", "content": prompt}
-        ],
-    )
-
-    return chat_completion.choices[0].message.content.strip()
-
 def user_login(request):    
     if request.user.is_authenticated:
         return redirect('/') 
@@ -317,12 +215,21 @@ def user_login(request):
         if not username or not password:
             error_message = 'All fields are required.'
             return render(request, 'login.html', {'error_message': error_message})
-        
+
+        # Throttled before any password hashing (see auth.py)
+        if not auth.login_allowed(request, username):
+            error_message = 'Too many sign-in attempts. Please wait a few minutes and try again.'
+            return render(request, 'login.html', {'error_message': error_message}, status=429)
         user = authenticate(request,username=username, password=password)
+        if auth.was_busy(request):
+            error_message = 'The server is busy signing other people in. Please try again in a moment.'
+            return render(request, 'login.html', {'error_message': error_message}, status=503)
         if user is not None:
+            auth.login_succeeded(username)
             login(request, user)
             return redirect('/')
         else:
+            auth.login_failed(username)
             error_message = "Invalid username or password"
             return render(request, 'login.html', {'error_message':error_message})
     return render(request, 'login.html')
@@ -345,11 +252,21 @@ def user_signup(request):
         if password != repeatPassword:
             error_message = 'Passwords do not match.'
             return render(request, 'signup.html', {'error_message': error_message})
+        if not auth.signup_allowed(request):
+            error_message = 'Too many sign-ups from your network. Please try again later.'
+            return render(request, 'signup.html', {'error_message': error_message}, status=429)
         try:
-            user = User.objects.create_user(username=username, email=email, password=password)
-            user.save()
+            # create_user() would hash on this thread; hash on the bounded pool instead
+            user = User.objects.create(
+                username=User.normalize_username(username),
+                email=User.objects.normalize_email(email),
+                password=auth.hash_password(password),
+            )
             login(request, user)
             return redirect('/')
+        except auth.Busy:
+            error_message = 'The server is busy. Please try again in a moment.'
+            return render(request, 'signup.html', {'error_message': error_message}, status=503)
         except IntegrityError:
             error_message = 'Username or email already exists.'
             return render(request, 'signup.html', {'error_message': error_message})
@@ -363,37 +280,43 @@ def user_logout(request):
    logout(request)
    return redirect('/')
     
+# Browsers keep these pages but revalidate them each time: a 304 when the
+# ETag still matches, otherwise the page (often from the per-user page cache)
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=page_cache.list_etag)
 def blog_list(request):
-    qs = BlogPost.objects.filter(user=request.user).order_by("-created_at")
+    return HttpResponse(page_cache.cached_page(request, lambda: _render_blog_list(request)))
+
+def _render_blog_list(request):
     q = request.GET.get("q", "").strip()
     if q:
-        qs = qs.filter(Q(youtube_title__icontains=q) | Q(generated_content__icontains=q))
-
-    paginator = Paginator(qs, 10)  # 10 per page
-    page_obj = paginator.get_page(request.GET.get("page"))
-    return render(
-        request,
+        # Ranked full-text search; results carry a highlighted search_snippet
+        paginator = Paginator(search.search(request.user, q), 10)  # 10 per page
+        page_obj = paginator.get_page(request.GET.get("page"))
+        total = paginator.count
+    else:
+        # Browsing: cursor pages over the light list projection
+        page_obj = listing.keyset_page(
+            request.user, after=request.GET.get("after"), before=request.GET.get("before")
+        )
+        total = listing.post_count(request.user)
+    return render_to_string(
         "all-blogs.html",
-        {"page_obj": page_obj, "q": q, "total": qs.count()},
+        {"page_obj": page_obj, "q": q, "total": total},
+        request,
     )
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=page_cache.detail_etag, last_modified_func=page_cache.detail_last_modified)
 def blog_details(request, pk):
     # Owner-only + 404 if not found or not owner (safer than redirecting)
     article = get_object_or_404(BlogPost, id=pk, user=request.user)
 
-    # Convert Markdown to HTML
-    html = markdown(article.generated_content or "")
-
-    # Sanitize the HTML so we can safely render with |safe
-    allowed_tags = [
-        "p","pre","h1","h2","h3","h4","h5","h6",
-        "ul","ol","li","strong","em","code","blockquote",
-        "hr","br","a"
-    ]
-    allowed_attrs = {"a": ["href","title","target","rel"]}
-    safe_html = bleach.clean(html, tags=allowed_tags, attributes=allowed_attrs, strip=True)
+    # Sanitized HTML is stored on the post at save time; this only renders
+    # again if the rendering policy changed since.
+    safe_html = rendering.ensure_rendered(article)
 
     return render(
         request,
@@ -0,0 +1,27 @@
+"""
+gunicorn settings, read automatically when gunicorn starts in this directory
+(`gunicorn ai_blog_app.wsgi`).
+
+With GUNICORN_PRELOAD=True the master loads the app and imports the heavy
+generation dependencies once, before forking (see blog_generator/lazy.py).
+Workers then share that memory copy-on-write and are ready as soon as they
+fork. Without it, each worker imports only what its requests use, which
+keeps workers that never generate anything small.
+"""
+import os
+
+preload_app = os.getenv("GUNICORN_PRELOAD") == "True"
+
+
+def when_ready(server):
+    if preload_app:
+        from blog_generator import lazy
+
+        lazy.warm_up()
+
+
+def post_fork(server, worker):
+    # Never share a database connection opened in the master
+    from django.db import connections
+
+    connections.close_all()